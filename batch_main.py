@@ -0,0 +1,207 @@
+"""
+Analyzes a whole dump of recipes: reads them from a directory of .txt files or a
+JSONL file ({"id": ..., "recipe": "..."} per line) and streams one JSON result per
+recipe to an output JSONL file.
+
+Parsing and the nutrition lookups run as separate pipeline stages joined by bounded
+queues, so the model parses the next recipes while earlier ones wait on the network.
+The output file doubles as the checkpoint: rerunning the same command skips every
+recipe that already has a successful result, so a crashed run picks up where it
+stopped, and tries the failed ones again, replacing their error records. Results
+are written in completion order, one line per recipe.
+
+Run from the repository root:
+    python batch_main.py test/recipe --output results.jsonl
+    python batch_main.py recipes.jsonl --output results.jsonl --nutrition-workers 8
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from llm.parse_cache import CachedParser
+from llm.scheduler import MicroBatchScheduler
+from recipe_analyzer import RecipeAnalyzer
+
+def read_recipes(source):
+    """Yields (id, recipe text) from a directory of .txt files or a JSONL file."""
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith(".txt"):
+                with open(os.path.join(source, filename), "r", encoding="utf-8") as f:
+                    yield filename, f.read()
+        return
+
+    with open(source, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield str(record.get("id", line_number)), record["recipe"]
+            except (ValueError, KeyError, AttributeError):
+                print(f"Warning: skipping malformed input on line {line_number}.")
+
+def load_checkpoint(output_path):
+    """
+    Returns the ids that already have a successful result in `output_path`. Failed
+    results, repeated ids and a line torn by a crash mid-write are dropped from the
+    file, so the failed recipes can be run again without leaving two lines for an id.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb") as f:
+        data = f.read()
+    complete = data[:data.rfind(b"\n") + 1]
+    if len(complete) < len(data):
+        print("Warning: discarding a partially written result at the end of the output.")
+
+    lines = complete.decode("utf-8").splitlines()
+    kept = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if "error" not in record and record["id"] not in done:
+            done.add(record["id"])
+            kept.append(line + "\n")
+    if len(kept) < len(lines) or len(complete) < len(data):
+        # Rewrite through a temporary file, so a crash here leaves the old output intact.
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, output_path)
+    return done
+
+class Stage:
+    """
+    A pool of worker threads that takes records from `inbox`, applies `func` and
+    puts the results on `outbox`. Records that already failed upstream pass through
+    untouched. Counts items and busy time for the throughput report.
+    """
+    def __init__(self, name, func, inbox, outbox, workers=1):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def finish(self):
+        """Stops the workers once the inbox is drained. Call after the upstream stage has finished."""
+        for _ in self._threads:
+            self.inbox.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            record = self.inbox.get()
+            if record is None:
+                return
+            start = time.perf_counter()
+            if "error" not in record:
+                try:
+                    self.func(record)
+                except Exception as e:
+                    record["error"] = f"{self.name}: {e}"
+            with self._lock:
+                self.busy += time.perf_counter() - start
+                self.items += 1
+            self.outbox.put(record)
+
+    @property
+    def workers(self):
+        return len(self._threads)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="A directory of .txt recipes or a JSONL file.")
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument("--queue-size", type=int, default=64, help="Capacity of each queue between stages.")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Most prompts merged into one generate call.")
+    parser.add_argument("--nutrition-workers", type=int, default=4)
+    parser.add_argument("--requests-per-second", type=float, default=None)
+    parser.add_argument("--api-key", default=os.environ.get("SPOONACULAR_API_KEY"))
+    parser.add_argument("--api-root", default="https://api.spoonacular.com")
+    parser.add_argument("--stub-llm", action="store_true", help="Use the weight-free stub LLM (for local testing).")
+    args = parser.parse_args()
+
+    if args.stub_llm:
+        from llm.stub import StubLLM
+        llm = StubLLM()
+    else:
+        from llm import LLM
+        llm = LLM.Gemma_2B_LLM()
+    # The parse workers share the model; the scheduler merges their prompts into batches.
+    recipe_parser = CachedParser(MicroBatchScheduler(llm, max_batch_size=args.max_batch_size), fast_path=True)
+    analyzer = RecipeAnalyzer(api_key=args.api_key, api_root=args.api_root,
+                              requests_per_second=args.requests_per_second)
+
+    def parse(record):
+        record["ingredients"] = recipe_parser.parse(record.pop("recipe"))
+        if not isinstance(record["ingredients"], list):
+            raise ValueError("the model did not return an ingredient list")
+
+    def analyze(record):
+        record.update(analyzer.analyze_recipe(record["ingredients"]))
+
+    done = load_checkpoint(args.output)
+    if done:
+        print(f"Resuming: {len(done)} recipes already analyzed in {args.output}.")
+
+    to_parse = queue.Queue(maxsize=args.queue_size)
+    to_analyze = queue.Queue(maxsize=args.queue_size)
+    to_write = queue.Queue(maxsize=args.queue_size)
+    stages = [
+        Stage("parse", parse, to_parse, to_analyze, workers=args.max_batch_size).start(),
+        Stage("nutrition", analyze, to_analyze, to_write, workers=args.nutrition_workers).start(),
+    ]
+
+    written = {"ok": 0, "failed": 0}
+    def write_results():
+        with open(args.output, "a", encoding="utf-8") as out:
+            while True:
+                record = to_write.get()
+                if record is None:
+                    return
+                out.write(json.dumps(record) + "\n")
+                # Flush every result so the checkpoint is never more than one line behind.
+                out.flush()
+                written["failed" if "error" in record else "ok"] += 1
+    writer = threading.Thread(target=write_results)
+    writer.start()
+
+    start = time.perf_counter()
+    skipped = 0
+    for recipe_id, text in read_recipes(args.source):
+        if recipe_id in done:
+            skipped += 1
+            continue
+        to_parse.put({"id": recipe_id, "recipe": text})
+    for stage in stages:
+        stage.finish()
+    to_write.put(None)
+    writer.join()
+    wall = time.perf_counter() - start
+
+    print(f"{written['ok']} analyzed, {written['failed']} failed, {skipped} skipped (already done) "
+          f"in {wall:.1f} s -> {args.output}")
+    print(f"{'stage':<10} {'workers':>7} {'items':>6} {'items/s':>8} {'busy':>6}")
+    for stage in stages:
+        # Busy is the share of the stage's worker time spent working rather than waiting.
+        utilization = stage.busy / (wall * stage.workers) if wall else 0.0
+        print(f"{stage.name:<10} {stage.workers:>7} {stage.items:>6} {stage.items / wall if wall else 0:>8.1f} {utilization:>6.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmarks nutrient aggregation over many synthetic recipes:
+
+    loop       the dict-based loop analyze_recipe used before, formatting every recipe
+    per-recipe RecipeNutrition.from_infos + format for each recipe (today's analyze_recipe)
+    batch      every distinct response stored once in a NutrientTable and all recipes
+               totalled in one NutritionBatch; formatting is left to display time
+
+It also checks that the formatted output of the new path matches the old loop.
+Half of the synthetic responses report integer amounts, which the old loop kept
+as ints ("100 kcal", not "100.0 kcal").
+
+Run from the repository root:
+    python -m benchmarks.bench_aggregation --recipes 10000
+"""
+import argparse
+import random
+import time
+
+from nutrition.aggregate import NutrientTable, NutrientVocabulary, RecipeNutrition
+
+NUTRIENT_NAMES = [
+    ("Calories", "kcal"), ("Protein", "g"), ("Fat", "g"), ("Carbohydrates", "g"), ("Sugar", "g"),
+    ("Sodium", "mg"), ("Fiber", "g"), ("Cholesterol", "mg"), ("Saturated Fat", "g"), ("Net Carbohydrates", "g"),
+    ("Potassium", "mg"), ("Calcium", "mg"), ("Iron", "mg"), ("Magnesium", "mg"), ("Phosphorus", "mg"),
+    ("Zinc", "mg"), ("Copper", "mg"), ("Manganese", "mg"), ("Selenium", "µg"), ("Vitamin A", "IU"),
+    ("Vitamin B1", "mg"), ("Vitamin B2", "mg"), ("Vitamin B3", "mg"), ("Vitamin B5", "mg"), ("Vitamin B6", "mg"),
+    ("Vitamin B12", "µg"), ("Vitamin C", "mg"), ("Vitamin D", "µg"), ("Vitamin E", "mg"), ("Vitamin K", "µg"),
+    ("Folate", "µg"), ("Choline", "mg"), ("Caffeine", "mg"), ("Alcohol", "g"), ("Fluoride", "mg"),
+]
+
+def synthetic_info(ingredient_id, rng, integer=False):
+    """A Spoonacular-shaped information response reporting a random subset of nutrients."""
+    nutrients = rng.sample(NUTRIENT_NAMES, rng.randint(20, len(NUTRIENT_NAMES)))
+    amount = (lambda: rng.randint(0, 200)) if integer else (lambda: round(rng.uniform(0, 200), 2))
+    return {
+        "id": ingredient_id,
+        "estimatedCost": {"value": round(rng.uniform(5, 500), 2), "unit": "US Cents"},
+        "nutrition": {"nutrients": [
+            {"name": name, "amount": amount(), "unit": unit} for name, unit in nutrients
+        ]},
+    }
+
+def loop_aggregate(infos):
+    """The aggregation loop analyze_recipe used before the numeric engine."""
+    summary_nutrients = {"Calories": 0.0, "Protein": 0.0, "Fat": 0.0, "Carbohydrates": 0.0}
+    all_nutrients = {}
+    total_price_cents = 0
+    for info_data in infos:
+        total_price_cents += info_data.get("estimatedCost", {}).get("value", 0)
+        if "nutrition" in info_data and "nutrients" in info_data["nutrition"]:
+            for nutrient in info_data["nutrition"]["nutrients"]:
+                name, amount, unit = nutrient.get("name"), nutrient.get("amount", 0), nutrient.get("unit", "")
+                if name in summary_nutrients:
+                    summary_nutrients[name] += amount
+                if name in all_nutrients:
+                    all_nutrients[name]["amount"] += amount
+                else:
+                    all_nutrients[name] = {"amount": amount, "unit": unit}
+    return {
+        "summary": {name: f"{round(amount)}" for name, amount in summary_nutrients.items()},
+        "price": f"${total_price_cents / 100:.2f}",
+        "full_data": {name: f"{round(data['amount'], 2)} {data['unit']}" for name, data in sorted(all_nutrients.items())},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--ingredients", type=int, default=500, help="Distinct ingredient responses to draw from.")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    pool = [synthetic_info(i, rng, integer=i % 2 == 0) for i in range(args.ingredients)]
+    recipes = [rng.sample(range(args.ingredients), rng.randint(5, 15)) for _ in range(args.recipes)]
+    print(f"{args.recipes} recipes, {sum(map(len, recipes))} ingredient lines, {args.ingredients} distinct responses")
+
+    start = time.perf_counter()
+    loop_results = [loop_aggregate([pool[i] for i in recipe]) for recipe in recipes]
+    loop_time = time.perf_counter() - start
+
+    vocabulary = NutrientVocabulary()
+    start = time.perf_counter()
+    per_recipe_results = [RecipeNutrition.from_infos([pool[i] for i in recipe], vocabulary).format() for recipe in recipes]
+    per_recipe_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = NutrientTable(vocabulary)
+    table.add(pool)
+    batch = table.totals(recipes)
+    batch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch_results = [batch[i].format() for i in range(len(batch))]
+    format_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_serving = batch.per_serving([rng.randint(1, 8) for _ in recipes])
+    best = per_serving.column("Protein").argmax()
+    compare_time = time.perf_counter() - start
+
+    print(f"{'path':<28} {'total ms':>9} {'us/recipe':>10}")
+    for label, elapsed in (
+        ("loop (aggregate + format)", loop_time),
+        ("per-recipe (+ format)", per_recipe_time),
+        ("batch (aggregate only)", batch_time),
+        ("batch formatting, all", format_time),
+        ("per serving + argmax", compare_time),
+    ):
+        print(f"{label:<28} {elapsed * 1000:>9.1f} {elapsed / args.recipes * 1e6:>10.2f}")
+    print(f"Most protein per serving: recipe {best}")
+
+    # Recipes drawing only on integer responses must print integer totals, like the loop.
+    integer_recipes = [[i for i in range(0, args.ingredients, 2)][j:j + 8] for j in range(0, 40, 8)]
+    integer_batch = table.totals(integer_recipes)
+    integer_mismatches = 0
+    for k, recipe in enumerate(integer_recipes):
+        expected = loop_aggregate([pool[i] for i in recipe])
+        per_recipe = RecipeNutrition.from_infos([pool[i] for i in recipe], vocabulary).format()
+        integer_mismatches += per_recipe != expected or integer_batch[k].format() != expected
+    print(f"Integer-only recipes differing from the loop: {integer_mismatches}/{len(integer_recipes)}")
+    mismatches = sum(a != b for a, b in zip(loop_results, per_recipe_results))
+    batch_mismatches = sum(a != b for a, b in zip(loop_results, batch_results))
+    print(f"Formatted results differing from the loop: per-recipe {mismatches}, batch {batch_mismatches}")
+    # The batch sums in a different order, so a total landing on a rounding tie
+    # (x.5 or x.xx5) can round the other way; the numbers themselves agree.
+    per_recipe_totals = [RecipeNutrition.from_infos([pool[i] for i in recipe], vocabulary) for recipe in recipes[:1000]]
+    drift = max(abs(batch[i].totals[:len(r.totals)] - r.totals).max() for i, r in enumerate(per_recipe_totals))
+    print(f"Largest batch vs per-recipe difference in any total: {drift:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares decoding alone with assisted (speculative) decoding, where a small draft
+model proposes tokens and the target model checks them in one forward pass, on the
+test/recipe prompts. Greedy decoding, one prompt at a time.
+
+For each mode it reports tokens per second, target forward passes per generated
+token, and for assisted decoding the draft acceptance rate (draft tokens the target
+kept / draft tokens proposed). It also checks that both modes produce identical
+outputs.
+
+The defaults run on the CPU with tiny stand-in models. The same tiny model as its
+own draft gives the upper bound (every draft token is accepted); --draft-layers
+keeps only the first N decoder layers of the draft, a cheaper draft that agrees
+less often. For real numbers, pair Llama 3.2 3B with 1B:
+    python -m benchmarks.bench_assisted --target meta-llama/Llama-3.2-3B-Instruct --draft meta-llama/Llama-3.2-1B-Instruct
+
+Run from the repository root:
+    python -m benchmarks.bench_assisted --draft-layers 1
+"""
+import argparse
+import time
+from pathlib import Path
+
+from llm import LLM, recipe_parser as rp
+
+TINY_MODEL = "hf-internal-testing/tiny-random-LlamaForCausalLM"
+
+class ForwardCounter:
+    """Counts a model's forward passes."""
+    def __init__(self, model):
+        self.calls = 0
+        model.register_forward_hook(self._hook)
+
+    def _hook(self, module, inputs, output):
+        self.calls += 1
+
+def truncate_layers(model, layers):
+    """Keeps the first `layers` decoder layers of a Llama-style model."""
+    model.model.layers = model.model.layers[:layers]
+    model.config.num_hidden_layers = layers
+    if getattr(model.config, "layer_types", None):
+        model.config.layer_types = model.config.layer_types[:layers]
+
+def run(llm, prompts, target_calls, draft_calls):
+    """Generates every prompt; returns (outputs, new tokens, seconds, target forwards, draft forwards)."""
+    outputs, new_tokens, elapsed = [], 0, 0.0
+    target_start, draft_start = target_calls.calls, draft_calls.calls
+    for prompt in prompts:
+        start = time.perf_counter()
+        outputs.append(llm.run(prompt))
+        elapsed += time.perf_counter() - start
+        new_tokens += llm.last_new_tokens[0]
+    return outputs, new_tokens, elapsed, target_calls.calls - target_start, draft_calls.calls - draft_start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=TINY_MODEL)
+    parser.add_argument("--draft", default=None, help="Draft model ID (defaults to the target's).")
+    parser.add_argument("--draft-layers", type=int, default=None, help="Keep only this many decoder layers of the draft.")
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    prompts = [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))
+    ]
+    llm = LLM.HF_LLM(args.target, max_new_tokens=args.max_new_tokens, num_threads=args.threads)
+    draft = LLM.HF_LLM(args.draft or args.target, max_new_tokens=args.max_new_tokens, num_threads=args.threads)
+    if args.draft_layers:
+        truncate_layers(draft.model, args.draft_layers)
+    target_calls, draft_calls = ForwardCounter(llm.model), ForwardCounter(draft.model)
+
+    # Warm up both paths, which also prefills the cached prompt prefix.
+    llm.run(prompts[0])
+    llm.set_draft(draft)
+    llm.run(prompts[0])
+
+    results = {}
+    for label, paired in (("alone", None), ("assisted", draft)):
+        llm.set_draft(paired)
+        results[label] = run(llm, prompts, target_calls, draft_calls)
+
+    draft_label = (args.draft or args.target) + (f" ({args.draft_layers} layers)" if args.draft_layers else "")
+    print(f"target {args.target}, draft {draft_label}: {len(prompts)} recipes, greedy, "
+          f"up to {args.max_new_tokens} new tokens")
+    print(f"{'mode':<9} {'tokens':>7} {'tokens/s':>9} {'target passes/token':>20} {'acceptance':>11}")
+    for label, (_, tokens, elapsed, target_passes, draft_passes) in results.items():
+        acceptance = ""
+        if draft_passes:
+            # Every target pass yields one token of its own; the rest are accepted
+            # draft tokens. Each draft forward pass proposes one token.
+            acceptance = f"{(tokens - target_passes) / draft_passes:.1%}"
+        print(f"{label:<9} {tokens:>7} {tokens / elapsed:>9.1f} {target_passes / tokens:>20.2f} {acceptance:>11}")
+    alone, assisted = results["alone"], results["assisted"]
+    print(f"speed-up: {(assisted[1] / assisted[2]) / (alone[1] / alone[2]):.2f}x; "
+          f"identical outputs: {alone[0] == assisted[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the per-ingredient lookup path (one search and one information request
+per ingredient) with bulk mode (one parseIngredients request per recipe) on the
+test/json recipes against the mock Spoonacular server, with caching disabled so
+every analysis goes to the network.
+
+Run from the repository root:
+    python -m benchmarks.bench_bulk --latency 0.1
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from recipe_analyzer import RecipeAnalyzer
+
+def run(analyzer, recipes):
+    """Analyzes every recipe, returning the results and the per-recipe latencies."""
+    results, latencies = [], []
+    for recipe in recipes:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(analyzer.analyze_recipe(recipe))
+        latencies.append(time.perf_counter() - start)
+    return results, sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock server delay per request, in seconds.")
+    parser.add_argument("--workers", type=int, default=8, help="Thread pool size for the concurrent per-ingredient run.")
+    parser.add_argument("--json-dir", default="test/json")
+    args = parser.parse_args()
+
+    recipes = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(args.json_dir).glob("json_out_*.json"))]
+    server = MockSpoonacularServer(latency=args.latency).start()
+    try:
+        modes = [
+            ("per-ingredient", {}),
+            (f"per-ingredient x{args.workers}", {"max_workers": args.workers}),
+            ("bulk", {"bulk": True}),
+        ]
+        print(f"{len(recipes)} recipes, mock latency {args.latency * 1000:.0f} ms, no cache")
+        print(f"{'mode':<20} {'requests':>9} {'per recipe':>11} {'mean ms':>9} {'p95 ms':>9}")
+        baseline = None
+        for label, options in modes:
+            server.reset_counts()
+            analyzer = RecipeAnalyzer(api_key="bench", cache_path=None, api_root=server.api_root, **options)
+            results, latencies = run(analyzer, recipes)
+            mean = sum(latencies) / len(latencies) * 1000
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+            print(f"{label:<20} {server.total_requests:>9} {server.total_requests / len(recipes):>11.1f} "
+                  f"{mean:>9.1f} {p95:>9.1f}")
+            if baseline is None:
+                baseline = results
+            elif results != baseline:
+                print(f"  {label}: {sum(a != b for a, b in zip(baseline, results))} results differ from per-ingredient")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
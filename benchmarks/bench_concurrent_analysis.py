@@ -0,0 +1,59 @@
+"""
+Benchmarks RecipeAnalyzer.analyze_recipe against a local mock Spoonacular server
+with injected latency, comparing wall time as the number of workers grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_concurrent_analysis --latency 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from recipe_analyzer import RecipeAnalyzer
+
+def load_recipes(gt_dir):
+    """Loads every ground-truth ingredient list in `gt_dir`."""
+    return [json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(gt_dir).glob("json_out_*.json"))]
+
+def run_analysis(analyzer, recipes):
+    """Analyzes every recipe, returning the results and the elapsed wall time."""
+    start = time.perf_counter()
+    # The analyzer prints progress for every ingredient; silence it while timing.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [analyzer.analyze_recipe(recipe) for recipe in recipes]
+    return results, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Injected per-request latency in seconds.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rate", type=float, default=None, help="Optional requests/sec cap (token bucket).")
+    parser.add_argument("--gt-dir", default="test/json")
+    args = parser.parse_args()
+
+    recipes = load_recipes(args.gt_dir)
+    server = MockSpoonacularServer(latency=args.latency).start()
+    print(f"{len(recipes)} recipes, {args.latency * 1000:.0f} ms injected latency")
+    print(f"{'workers':>8} {'wall (s)':>10} {'requests':>10} {'speedup':>8}  identical")
+
+    baseline_results, baseline_time = None, None
+    try:
+        for workers in args.workers:
+            server.reset_counts()
+            # Caching is disabled so every configuration does the same network work.
+            analyzer = RecipeAnalyzer(api_key="benchmark", cache_path=None, max_workers=workers,
+                                      requests_per_second=args.rate, api_root=server.api_root)
+            results, elapsed = run_analysis(analyzer, recipes)
+            if baseline_results is None:
+                baseline_results, baseline_time = results, elapsed
+            identical = results == baseline_results
+            print(f"{workers:>8} {elapsed:>10.2f} {server.total_requests:>10} {baseline_time / elapsed:>7.2f}x  {identical}")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Reports the parse-failure rate and tokens generated per recipe on test/recipe with
+and without schema-constrained decoding.
+
+A response counts as a failure when `extract_json_from_output` falls back to raw
+text or any element is missing a key or has the wrong type.
+
+Run from the repository root:
+    python -m benchmarks.bench_constrained --model hf-internal-testing/tiny-random-LlamaForCausalLM
+"""
+import argparse
+import time
+from pathlib import Path
+
+from llm import LLM, recipe_parser as rp
+
+def matches_schema(parsed):
+    """True if `parsed` is a list of {"ingredient": str, "quantity": number, "unit": str}."""
+    if not isinstance(parsed, list):
+        return False
+    for item in parsed:
+        if not isinstance(item, dict) or set(item) != {"ingredient", "quantity", "unit"}:
+            return False
+        if not isinstance(item["ingredient"], str) or not isinstance(item["unit"], str):
+            return False
+        if isinstance(item["quantity"], bool) or not isinstance(item["quantity"], (int, float)):
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--max-new-tokens", type=int, default=512)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    prompts = [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))
+    ]
+    llm = LLM.HF_LLM(args.model, max_new_tokens=args.max_new_tokens)
+
+    print(f"{args.model}: {len(prompts)} recipes")
+    print(f"{'mode':>12} {'failures':>9} {'tokens/recipe':>14} {'s/recipe':>9}")
+    for label, constrained in (("free", False), ("constrained", True)):
+        llm.constrained = constrained
+        failures, tokens, elapsed = 0, 0, 0.0
+        for prompt in prompts:
+            start = time.perf_counter()
+            response = llm.run(prompt)
+            elapsed += time.perf_counter() - start
+            tokens += llm.last_new_tokens[0]
+            failures += not matches_schema(rp.extract_json_from_output(response))
+        print(f"{label:>12} {failures / len(prompts):>8.0%} {tokens / len(prompts):>14.1f} {elapsed / len(prompts):>9.2f}")
+
+if __name__ == "__main__":
+    main()
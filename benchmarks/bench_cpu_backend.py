@@ -0,0 +1,79 @@
+"""
+Compares CPU latency and peak memory of each LLM wrapper with int8 dynamic
+quantization and bf16. Every (model, dtype) pair runs in a fresh process so its peak
+RSS is measured in isolation.
+
+Run from the repository root:
+    python -m benchmarks.bench_cpu_backend --recipes 3 --threads 8
+    python -m benchmarks.bench_cpu_backend --models hf-internal-testing/tiny-random-LlamaForCausalLM
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+WRAPPERS = ["Llama_3_2_1B_LLM", "Llama_3_2_3B_LLM", "Gemma_2B_LLM", "Mistral_LLM"]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure(model, cpu_dtype, threads, prompts, max_new_tokens):
+    """Loads one model on the CPU and times it on `prompts`. Runs in a child process."""
+    from llm import LLM
+
+    start = time.perf_counter()
+    if model in WRAPPERS:
+        llm = getattr(LLM, model)(device="cpu", cpu_dtype=cpu_dtype, num_threads=threads)
+        llm.generation_kwargs = dict(llm.generation_kwargs, max_new_tokens=max_new_tokens)
+    else:
+        llm = LLM.HF_LLM(model, max_new_tokens=max_new_tokens, cpu_dtype=cpu_dtype, num_threads=threads)
+    load_time = time.perf_counter() - start
+
+    latencies, tokens = [], 0
+    for prompt in prompts:
+        start = time.perf_counter()
+        llm.run(prompt)
+        latencies.append(time.perf_counter() - start)
+        tokens += llm.last_new_tokens[0]
+    return {
+        "load_s": load_time,
+        "latency_s": sum(latencies) / len(latencies),
+        "tokens_per_s": tokens / sum(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=WRAPPERS, help="Wrapper class names or Hugging Face model IDs.")
+    parser.add_argument("--dtypes", nargs="+", default=["int8", "bf16"], choices=["int8", "bf16", "fp32"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--recipes", type=int, default=3, help="Number of test recipes to time per model.")
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    from llm import recipe_parser as rp
+    prompts = [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))[:args.recipes]
+    ]
+
+    print(f"{'model':<48} {'dtype':>5} {'load s':>7} {'s/recipe':>9} {'tok/s':>7} {'peak MB':>9}")
+    context = multiprocessing.get_context("spawn")
+    for model in args.models:
+        for cpu_dtype in args.dtypes:
+            with context.Pool(1) as pool:
+                try:
+                    r = pool.apply(measure, (model, cpu_dtype, args.threads, prompts, args.max_new_tokens))
+                except Exception as e:
+                    print(f"{model:<48} {cpu_dtype:>5} failed: {e}")
+                    continue
+            print(f"{model:<48} {cpu_dtype:>5} {r['load_s']:>7.1f} {r['latency_s']:>9.2f} "
+                  f"{r['tokens_per_s']:>7.1f} {r['peak_rss_mb']:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares tokens generated and wall time per recipe with and without early stopping
+(stop when the JSON array closes, plus the per-line token budget) on test/recipe.
+
+Run from the repository root:
+    python -m benchmarks.bench_early_stopping --model hf-internal-testing/tiny-random-LlamaForCausalLM
+
+A random tiny model never closes an array, so with it only the token budget takes
+effect; use a real instruction model to see the bracket-based stopping.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from llm import LLM, recipe_parser as rp
+
+def run_corpus(llm, prompts):
+    """Runs every prompt one at a time, returning per-recipe token counts and times."""
+    tokens, times = [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        llm.run(prompt)
+        times.append(time.perf_counter() - start)
+        tokens.append(llm.last_new_tokens[0])
+    return tokens, times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--max-new-tokens", type=int, default=512)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    prompts = [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))
+    ]
+    llm = LLM.HF_LLM(args.model, max_new_tokens=args.max_new_tokens)
+    llm.run(prompts[0])  # Warm-up.
+
+    results = {}
+    for label, early_stopping in (("before", False), ("after", True)):
+        llm.early_stopping = early_stopping
+        results[label] = run_corpus(llm, prompts)
+
+    print(f"{args.model}: {len(prompts)} recipes, max_new_tokens={args.max_new_tokens}")
+    print(f"{'recipe':>6} {'tokens before':>14} {'tokens after':>13} {'s before':>9} {'s after':>8}")
+    for i in range(len(prompts)):
+        print(f"{i + 1:>6} {results['before'][0][i]:>14} {results['after'][0][i]:>13} "
+              f"{results['before'][1][i]:>9.2f} {results['after'][1][i]:>8.2f}")
+
+    for label in ("before", "after"):
+        tokens, times = results[label]
+        print(f"{label:>6}: {sum(tokens) / len(tokens):.1f} tokens/recipe, {sum(times) / len(times):.2f} s/recipe")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Scores the rule-based fast-path parser against the test/json ground truth with the
+metrics from test_LLMs.py, and reports how much LLM work it saves.
+
+Without --model, lines the rules are unsure about count as missed, which gives a
+lower bound on accuracy. With --model, the benchmark also runs the LLM on whole
+recipes and through CachedParser with the fast path (rules, then the LLM on only
+the unsure lines, as the app parses) and compares their latency.
+
+It also checks the rules against LINE_CASES, lines they have got confidently wrong
+before; each must parse as listed, or be left to the LLM (None).
+
+Run from the repository root:
+    python -m benchmarks.bench_fast_parser
+    python -m benchmarks.bench_fast_parser --model hf-internal-testing/tiny-random-LlamaForCausalLM
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from llm import recipe_parser as rp
+from llm.parse_cache import CachedParser, ParseCache
+from test_LLMs import score_prediction
+
+METRIC_NAMES = ["precision", "recall", "f1", "name_f1", "qty_accuracy", "unit_accuracy"]
+
+# Line -> the parse the rules must give, or None if they must leave it to the LLM.
+LINE_CASES = {
+    "3 cookies": {"ingredient": "cookie", "quantity": 3, "unit": "piece"},
+    "4 pies": {"ingredient": "pie", "quantity": 4, "unit": "piece"},
+    "2 cups berries": {"ingredient": "berry", "quantity": 2, "unit": "cup"},
+    "1 can (14 oz) coconut milk": {"ingredient": "coconut milk", "quantity": 1, "unit": "can"},
+    "1 14-ounce can coconut milk": None,
+    "1 x 400g can chopped tomatoes": None,
+    "2 eggs plus 1 egg yolk": None,
+}
+
+def check_line_cases():
+    """Prints every LINE_CASES line the rules get wrong; returns how many passed."""
+    passed = 0
+    for line, expected in LINE_CASES.items():
+        got = rp.parse_ingredient_line(line)
+        if got == expected:
+            passed += 1
+        else:
+            print(f"  {line!r}: expected {expected}, got {got}")
+    return passed
+
+def load_corpus(recipe_dir, gt_dir):
+    """Returns (index, recipe text, ground-truth path) for every recipe with ground truth."""
+    corpus = []
+    for recipe_file in sorted(Path(recipe_dir).glob("recipe_in_*.txt")):
+        file_index = recipe_file.stem.split("_")[-1]
+        gt_path = Path(gt_dir) / f"json_out_{file_index}.json"
+        if gt_path.exists():
+            corpus.append((file_index, recipe_file.read_text(encoding="utf-8"), gt_path))
+    return corpus
+
+def average_scores(scores):
+    return {name: sum(s[i] for s in scores) / len(scores) for i, name in enumerate(METRIC_NAMES)}
+
+def print_scores(label, scores, seconds):
+    averages = average_scores(scores)
+    print(f"\n=== {label} ({len(scores)} recipes) ===")
+    for name in METRIC_NAMES:
+        print(f"{name:<14} {averages[name]:.4f}")
+    print(f"{'avg time':<14} {seconds / len(scores) * 1000:.2f} ms/recipe")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    parser.add_argument("--gt-dir", default="test/json")
+    parser.add_argument("--model", default=None, help="Optional Hugging Face model ID for the LLM comparison.")
+    parser.add_argument("--max-new-tokens", type=int, default=512)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.recipe_dir, args.gt_dir)
+    total_lines, unsure_lines, llm_free_recipes = 0, 0, 0
+    rule_scores, rule_time = [], 0.0
+    for _, text, gt_path in corpus:
+        start = time.perf_counter()
+        parsed, unsure = rp.fast_parse(text)
+        rule_time += time.perf_counter() - start
+
+        total_lines += len(parsed) + len(unsure)
+        unsure_lines += len(unsure)
+        llm_free_recipes += not unsure
+        rule_scores.append(score_prediction(parsed, gt_path))
+
+    print_scores("Rules only (unsure lines count as missed)", rule_scores, rule_time)
+    print(f"\nLines parsed by rules: {total_lines - unsure_lines}/{total_lines} "
+          f"({(total_lines - unsure_lines) / total_lines:.1%})")
+    print(f"Recipes needing no LLM call: {llm_free_recipes}/{len(corpus)}")
+    print(f"Line cases parsed as expected: {check_line_cases()}/{len(LINE_CASES)}")
+
+    if args.model:
+        from llm import LLM
+        llm = LLM.HF_LLM(args.model, max_new_tokens=args.max_new_tokens)
+        # An empty cache, so every hybrid parse runs the model.
+        cache_dir = tempfile.TemporaryDirectory()
+        hybrid = CachedParser(llm, cache=ParseCache(cache_dir.name), fast_path=True)
+
+        llm_scores, llm_time = [], 0.0
+        hybrid_scores, hybrid_time = [], 0.0
+        for _, text, gt_path in corpus:
+            start = time.perf_counter()
+            llm_json = rp.extract_json_from_output(llm.run(rp.pre_process_input(text)))
+            llm_time += time.perf_counter() - start
+            llm_scores.append(score_prediction(llm_json if isinstance(llm_json, list) else [], gt_path))
+
+            start = time.perf_counter()
+            hybrid_json = hybrid.parse(text)
+            hybrid_time += time.perf_counter() - start
+            hybrid_scores.append(score_prediction(hybrid_json, gt_path))
+
+        print_scores(f"LLM only ({args.model})", llm_scores, llm_time)
+        print_scores("Rules + LLM fallback", hybrid_scores, hybrid_time)
+        print(f"\nLatency saved: {(llm_time - hybrid_time) / len(corpus):.2f} s/recipe "
+              f"({1 - hybrid_time / llm_time:.1%})")
+        cache_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Measures re-analyzing a recipe after a one-line edit, as the GUI does when the
+input is changed and Analyze is clicked again, on the test/recipe corpus against
+the mock Spoonacular server and the stub LLM (--llm-latency per generate call).
+
+Each recipe is analyzed once, then one line is edited and the edited recipe is
+analyzed again. The edit changes the quantity of a line the rules parse
+("quantity"), or rewords a line they leave to the LLM ("llm line"), which changes
+the one LLM prompt that covers all such lines. Both run with the lookup cache on
+(as in the GUI) and off. Modes:
+
+    full          the whole recipe is parsed again (rules, then the LLM for the
+                  unsure lines) and every ingredient is resolved again, through
+                  whatever the first analysis cached
+    incremental   IncrementalAnalyzer: only an edited rule-parsed line is parsed
+                  and looked up; an edited LLM line re-runs the LLM's group
+    one line      reference: a fresh analysis of just the edited line
+
+It reports the mean latency, Spoonacular requests and LLM calls per edit, how many
+incremental results match the full analysis of the edited recipe, and whether the
+first analysis sent the LLM exactly the prompts the full path sends.
+
+Run from the repository root:
+    python -m benchmarks.bench_incremental --latency 0.05 --llm-latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from incremental_analysis import IncrementalAnalyzer, recipe_lines
+from llm import recipe_parser as rp
+from llm.parse_cache import CachedParser, ParseCache
+from llm.stub import StubLLM
+from recipe_analyzer import RecipeAnalyzer
+
+def edit_one_line(text, kind):
+    """
+    Edits one line of `text`: doubles the quantity of the last line the rules parse
+    ("quantity") or rewords the last line they don't ("llm line"). Returns the
+    edited text, or None if the recipe has no such line.
+    """
+    lines = text.replace("\r", "").split("\n")
+    for i in reversed(range(len(lines))):
+        if not lines[i].strip():
+            continue
+        parsed = rp.parse_ingredient_line(lines[i]) is not None
+        if kind == "quantity" and parsed:
+            match = re.match(r"\s*(\d+(?:\.\d+)?)\s", lines[i])
+            if match:
+                lines[i] = f"{float(match.group(1)) * 2:g}" + lines[i][match.end(1):]
+                return "\n".join(lines)
+        elif kind == "llm line" and not parsed:
+            lines[i] = lines[i].rstrip() + ", or more"
+            return "\n".join(lines)
+    return None
+
+class RecordingStubLLM(StubLLM):
+    """The stub LLM, remembering every prompt it was given."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def run_batch(self, prompts, batch_size=8):
+        self.prompts.extend(prompts)
+        return super().run_batch(prompts, batch_size)
+
+class Session:
+    """One GUI session: an analyzer, a parser and their caches in a temporary directory."""
+    def __init__(self, tmp, api_root, llm_latency, lookup_cache):
+        self.llm = RecordingStubLLM(latency=llm_latency)
+        cache_path = os.path.join(tmp, "lookups.db") if lookup_cache else None
+        self.calculator = RecipeAnalyzer(api_key="bench", cache_path=cache_path, api_root=api_root)
+        self.parser = CachedParser(self.llm, cache=ParseCache(os.path.join(tmp, "parses")), fast_path=True)
+        self.incremental = IncrementalAnalyzer(self.parser, self.calculator)
+
+    def full(self, text):
+        return self.calculator.analyze_recipe(self.parser.parse(text))
+
+def measure(server, session, func, text):
+    """Runs func(text); returns (result, seconds, Spoonacular requests, LLM calls)."""
+    server.reset_counts()
+    calls = session.llm.calls
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(text)
+    return result, time.perf_counter() - start, server.total_requests, session.llm.calls - calls
+
+def run_scenario(server, recipes, kind, lookup_cache, modes, llm_latency):
+    """Edits one line of every recipe that has a line of this `kind` and prints the mean cost per mode."""
+    totals = {mode: [0.0, 0, 0] for mode in modes}
+    agree = same_prompts = n = 0
+    for text in recipes:
+        edited = edit_one_line(text, kind)
+        if edited is None:
+            continue
+        n += 1
+        edited_line = next(line for line in recipe_lines(edited) if line not in recipe_lines(text))
+        runs, first_prompts = {}, {}
+        for mode in modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                session = Session(tmp, server.api_root, llm_latency, lookup_cache)
+                func = session.full if mode == "full" else session.incremental.analyze
+                if mode == "one line":
+                    runs[mode] = measure(server, session, func, edited_line)
+                else:
+                    measure(server, session, func, text)
+                    first_prompts[mode] = list(session.llm.prompts)
+                    runs[mode] = measure(server, session, func, edited)
+                for i, value in enumerate(runs[mode][1:]):
+                    totals[mode][i] += value
+        agree += runs["incremental"][0] == runs["full"][0]
+        same_prompts += first_prompts["incremental"] == first_prompts["full"]
+
+    for mode in modes:
+        seconds, requests_sent, llm_calls = totals[mode]
+        result = f"{agree}/{n}, first prompts {same_prompts}/{n}" if mode == "incremental" else ""
+        print(f"{kind:<9} {'on' if lookup_cache else 'off':<8} {n:>7}  {mode:<12} {seconds / n * 1000:>9.1f} "
+              f"{requests_sent / n:>9.1f} {llm_calls / n:>10.1f}  {result}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server delay per request, in seconds.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM delay per generate call, in seconds.")
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    recipes = [path.read_text(encoding="utf-8") for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))]
+    modes = ("full", "incremental", "one line")
+    print(f"{len(recipes)} recipes; mock latency {args.latency * 1000:.0f} ms, LLM latency {args.llm_latency * 1000:.0f} ms")
+    print(f"{'edit':<9} {'lookups':<8} {'recipes':>7}  {'mode':<12} {'mean ms':>9} {'requests':>9} {'LLM calls':>10}  agree, identical")
+    server = MockSpoonacularServer(latency=args.latency).start()
+    try:
+        for kind in ("quantity", "llm line"):
+            for lookup_cache in (True, False):
+                run_scenario(server, recipes, kind, lookup_cache, modes, args.llm_latency)
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Measures recipe-parsing throughput (recipes/sec) of BaseLLM.run_batch for several
+batch sizes, using a tiny Hugging Face model on the CPU.
+
+Run from the repository root:
+    python -m benchmarks.bench_llm_batch --model hf-internal-testing/tiny-random-LlamaForCausalLM
+"""
+import argparse
+import time
+from pathlib import Path
+
+from llm import LLM, recipe_parser as rp
+
+def load_prompts(recipe_dir):
+    """Builds the parsing prompt for every recipe in `recipe_dir`."""
+    return [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(recipe_dir).glob("recipe_in_*.txt"))
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.recipe_dir)
+    llm = LLM.HF_LLM(args.model, max_new_tokens=args.max_new_tokens)
+    # Warm up once so one-off initialization isn't charged to the first batch size.
+    llm.run(prompts[0])
+
+    print(f"{args.model}: {len(prompts)} recipes, max_new_tokens={args.max_new_tokens}")
+    print(f"{'batch':>6} {'wall (s)':>10} {'recipes/s':>10}")
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        llm.run_batch(prompts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:>6} {elapsed:>10.2f} {len(prompts) / elapsed:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares recipe analysis latency on the network path (every lookup goes to the mock
+Spoonacular server) with the local path (lookups answered by a LocalNutritionDB).
+
+The local database is built the way it would be in practice: the network pass
+records its responses in an IngredientCache, which is then imported. The local pass
+runs with the lookup cache disabled, so every answer comes from the database, and
+its results are checked against the network pass.
+
+Run from the repository root:
+    python -m benchmarks.bench_local_db --latency 0.1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from nutrition.local_db import LocalNutritionDB
+from recipe_analyzer import RecipeAnalyzer
+
+def time_analyses(analyzer, recipes):
+    """Analyzes every recipe, returning the results and the per-recipe latencies."""
+    results, latencies = [], []
+    for recipe in recipes:
+        start = time.perf_counter()
+        # The analyzer reports progress on stdout; keep the benchmark output readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(analyzer.analyze_recipe(recipe))
+        latencies.append(time.perf_counter() - start)
+    return results, sorted(latencies)
+
+def describe(label, latencies, requests):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+    mean = sum(latencies) / len(latencies) * 1000
+    print(f"{label:<10} {mean:>10.2f} {p50:>10.2f} {p95:>10.2f} {requests:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock server delay per request, in seconds.")
+    parser.add_argument("--json-dir", default="test/json")
+    args = parser.parse_args()
+
+    recipes = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(args.json_dir).glob("json_out_*.json"))]
+    server = MockSpoonacularServer(latency=args.latency).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.db")
+        db_path = os.path.join(tmp, "nutrition.db")
+        try:
+            network = RecipeAnalyzer(api_key="bench", cache_path=cache_path, api_root=server.api_root)
+            network_results, network_latencies = time_analyses(network, recipes)
+            network_requests = server.total_requests
+            network.cache.close()
+
+            start = time.perf_counter()
+            db = LocalNutritionDB(db_path)
+            names, profiles = db.import_cache(cache_path)
+            db.close()
+            import_time = time.perf_counter() - start
+
+            server.reset_counts()
+            local = RecipeAnalyzer(api_key="bench", cache_path=None, api_root=server.api_root, local_db_path=db_path)
+            local_results, local_latencies = time_analyses(local, recipes)
+            local_requests = server.total_requests
+            local_stats = local.local_db.stats
+            local.local_db.close()
+        finally:
+            server.stop()
+
+    print(f"{len(recipes)} recipes, mock latency {args.latency * 1000:.0f} ms; "
+          f"imported {names} names and {profiles} profiles in {import_time * 1000:.1f} ms")
+    print(f"{'path':<10} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'requests':>10}")
+    describe("network", network_latencies, network_requests)
+    describe("local", local_latencies, local_requests)
+    print(f"local hits/misses: {local_stats['hits']}/{local_stats['misses']}")
+    same = all(
+        n["summary"] == l["summary"] and n["price"] == l["price"]
+        for n, l in zip(network_results, local_results)
+    )
+    print(f"Results identical to the network path: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measures throughput and latency of concurrent parse requests sharing one model,
+with and without micro-batching. Each client thread sends its prompts one after
+another (a closed loop), so the number of clients is the offered concurrency.
+
+By default the model is the weight-free StubLLM, whose cost per `generate` call is
+`--latency` plus `--per-item-latency` per prompt, roughly how a GPU behaves until
+the batch saturates it. Pass --model to time a real Hugging Face model instead.
+
+Run from the repository root:
+    python -m benchmarks.bench_microbatch --clients 16 --requests 10
+    python -m benchmarks.bench_microbatch --model hf-internal-testing/tiny-random-LlamaForCausalLM
+"""
+import argparse
+import threading
+import time
+from pathlib import Path
+
+from llm import recipe_parser as rp
+from llm.scheduler import MicroBatchScheduler
+
+def run_load(scheduler, prompts, clients, requests_per_client):
+    """Runs the closed-loop load and returns (wall time, per-request latencies)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(requests_per_client):
+            prompt = prompts[(offset + i) % len(prompts)]
+            start = time.perf_counter()
+            scheduler.run(prompt)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=10, help="Requests sent by each client.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub cost per generate call, in seconds.")
+    parser.add_argument("--per-item-latency", type=float, default=0.01, help="Stub cost per prompt in a call.")
+    parser.add_argument("--model", default=None, help="Hugging Face model ID to use instead of the stub.")
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    prompts = [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))
+    ]
+    if args.model:
+        from llm import LLM
+        llm = LLM.HF_LLM(args.model)
+        print(f"{args.model}: {args.clients} clients x {args.requests} requests")
+    else:
+        from llm.stub import StubLLM
+        llm = StubLLM(latency=args.latency, per_item_latency=args.per_item_latency)
+        print(f"stub ({args.latency * 1000:.0f} ms + {args.per_item_latency * 1000:.0f} ms/prompt): "
+              f"{args.clients} clients x {args.requests} requests")
+
+    print(f"{'max batch':>9} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'mean batch':>11}")
+    for batch_size in args.batch_sizes:
+        # A batch size of 1 is the unbatched baseline: requests take turns on the model.
+        scheduler = MicroBatchScheduler(llm, max_batch_size=batch_size, max_wait_ms=args.max_wait_ms)
+        wall, latencies = run_load(scheduler, prompts, args.clients, args.requests)
+        scheduler.close()
+        p50 = latencies[int(0.50 * (len(latencies) - 1))]
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        mean_batch = scheduler.batched_prompts / scheduler.batches
+        print(f"{batch_size:>9} {len(latencies) / wall:>7.1f} {p50:>7.3f} {p95:>7.3f} {mean_batch:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Times each stage of the analysis pipeline separately on test/recipe and writes the
+results as JSON, so changes can be compared run to run:
+
+    pre_process_input, tokenize, prefill (one forward pass over the prompt),
+    decode (the rest of generate), detokenize, extract_json_from_output,
+    and each RecipeAnalyzer HTTP call (ingredient search, ingredient information)
+
+Every stage reports count, mean, p50, p95 and p99 in milliseconds. The report also
+has prefill and decode tokens/sec and the peak RSS of the process (plus peak CUDA
+memory on a GPU).
+
+Runs offline: the model is a small Hugging Face model on the CPU, and the HTTP
+calls go to the local mock Spoonacular server, fed the ground-truth ingredient lists
+from test/json. --skip-llm times only the non-model stages (no torch needed).
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline_stages --model hf-internal-testing/tiny-random-LlamaForCausalLM
+    python -m benchmarks.bench_pipeline_stages --skip-llm --output stages.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.bench_cpu_backend import peak_rss_mb
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from llm import recipe_parser as rp
+from recipe_analyzer import RecipeAnalyzer
+
+class StageTimer:
+    """Collects per-stage durations and summarizes them as percentiles."""
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        yield
+        self.samples[stage].append(time.perf_counter() - start)
+
+    def timed(self, stage, func):
+        """Wraps `func` so every call is recorded under `stage`."""
+        def wrapper(*args, **kwargs):
+            with self.time(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def summary(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            def percentile(p):
+                return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+            report[stage] = {
+                "count": len(ordered),
+                "total_ms": sum(ordered) * 1000,
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+            }
+        return report
+
+def time_llm_stages(timer, llm, prompts, repeat):
+    """Times tokenization, prefill, decode, detokenization and extraction for each prompt."""
+    import torch
+
+    prefill_tokens = decode_tokens = 0
+    for _ in range(repeat):
+        for prompt in prompts:
+            with timer.time("tokenize"):
+                inputs = llm.tokenizer([prompt], return_tensors="pt", padding=True).to(llm.device)
+
+            # Prefill is a single forward pass over the prompt; the decode time is
+            # what generate() spends beyond that.
+            with torch.inference_mode():
+                start = time.perf_counter()
+                llm.model(**inputs)
+                prefill = time.perf_counter() - start
+                start = time.perf_counter()
+                outputs = llm.model.generate(**inputs, **llm._generation_settings([prompt]))
+                total = time.perf_counter() - start
+            timer.samples["prefill"].append(prefill)
+            timer.samples["decode"].append(max(total - prefill, 0.0))
+            prefill_tokens += inputs["input_ids"].shape[1]
+            new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+            decode_tokens += int((new_tokens != llm.tokenizer.pad_token_id).sum())
+
+            with timer.time("detokenize"):
+                response = llm.tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
+            with timer.time("extract_json_from_output"):
+                rp.extract_json_from_output(response)
+
+    prefill_s = sum(timer.samples["prefill"])
+    decode_s = sum(timer.samples["decode"])
+    return {
+        "prefill_tokens_per_s": prefill_tokens / prefill_s if prefill_s else None,
+        "decode_tokens_per_s": decode_tokens / decode_s if decode_s else None,
+        "generated_tokens": decode_tokens,
+    }
+
+def time_http_stages(timer, ingredient_lists, latency, repeat):
+    """Times each RecipeAnalyzer call against the mock server, with the cache off."""
+    server = MockSpoonacularServer(latency=latency).start()
+    try:
+        analyzer = RecipeAnalyzer(api_key="bench", cache_path=None, api_root=server.api_root)
+        analyzer._fetch_ingredient_id = timer.timed("http_search", analyzer._fetch_ingredient_id)
+        analyzer._fetch_ingredient_info = timer.timed("http_information", analyzer._fetch_ingredient_info)
+        for _ in range(repeat):
+            for ingredients in ingredient_lists:
+                # The analyzer reports progress on stdout; keep the benchmark output readable.
+                with contextlib.redirect_stdout(io.StringIO()), timer.time("analyze_recipe"):
+                    analyzer.analyze_recipe(ingredients)
+    finally:
+        server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--skip-llm", action="store_true", help="Only time the stages that need no model.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock server delay per request, in seconds.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the test recipes.")
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    parser.add_argument("--json-dir", default="test/json")
+    parser.add_argument("--output", default="bench_stages.json")
+    args = parser.parse_args()
+
+    recipe_files = sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))
+    texts = [path.read_text(encoding="utf-8") for path in recipe_files]
+    ingredient_lists = [
+        json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(args.json_dir).glob("json_out_*.json"))
+    ]
+
+    timer = StageTimer()
+    for _ in range(args.repeat):
+        for text in texts:
+            with timer.time("pre_process_input"):
+                rp.pre_process_input(text)
+    prompts = [rp.pre_process_input(text) for text in texts]
+
+    report = {
+        "model": None if args.skip_llm else args.model,
+        "recipes": len(texts),
+        "repeat": args.repeat,
+        "mock_latency_s": args.latency,
+        "python": platform.python_version(),
+    }
+    if not args.skip_llm:
+        from llm import LLM
+        llm = LLM.HF_LLM(args.model, max_new_tokens=args.max_new_tokens, num_threads=args.threads)
+        report.update(time_llm_stages(timer, llm, prompts, args.repeat))
+        import torch
+        if torch.cuda.is_available():
+            report["peak_cuda_mb"] = torch.cuda.max_memory_allocated() / (1024 * 1024)
+
+    time_http_stages(timer, ingredient_lists, args.latency, args.repeat)
+    report["peak_rss_mb"] = peak_rss_mb()
+    report["stages"] = timer.summary()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':<26} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<26} {s['count']:>6} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f}")
+    for key in ("prefill_tokens_per_s", "decode_tokens_per_s"):
+        if report.get(key):
+            print(f"{key}: {report[key]:.1f}")
+    print(f"peak RSS: {report['peak_rss_mb']:.0f} MB -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures what reusing the KV cache of the fixed instruction prefix saves on the
+test/recipe prompts:
+
+    prefill   one forward pass over the whole prompt, against copying the cached
+              prefix and a forward pass over the recipe suffix only
+    ttft      time to first token: generate() with max_new_tokens=1, without and
+              with the cached prefix (the copy included)
+    run       full LLM.run per recipe with prefix_cache off and on, checking that
+              greedy outputs are identical
+
+Run from the repository root:
+    python -m benchmarks.bench_prefix_cache --model hf-internal-testing/tiny-random-LlamaForCausalLM
+"""
+import argparse
+import copy
+import time
+from pathlib import Path
+
+from llm import LLM, recipe_parser as rp
+
+def mean_ms(samples):
+    return sum(samples) / len(samples) * 1000
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    import torch
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recipe-dir", default="test/recipe")
+    args = parser.parse_args()
+
+    prompts = [
+        rp.pre_process_input(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(args.recipe_dir).glob("recipe_in_*.txt"))
+    ]
+    llm = LLM.HF_LLM(args.model, max_new_tokens=args.max_new_tokens, num_threads=args.threads)
+    model, tokenizer = llm.model, llm.tokenizer
+    llm.run(prompts[0])  # Warm-up.
+
+    # Time the one-off prefill of the prefix that every later request reuses.
+    llm._prefix_states.clear()
+    setup_time, (prefix_ids, prefix_past) = timed(lambda: llm._prefix_state(rp.PROMPT_PREFIX))
+    n = prefix_ids.shape[1]
+
+    samples = {"full prefill": [], "copy": [], "suffix prefill": [], "ttft": [], "ttft cached": []}
+    suffix_tokens = []
+    first_tokens = dict(pad_token_id=tokenizer.pad_token_id, max_new_tokens=1, do_sample=False)
+    with torch.inference_mode():
+        for _ in range(args.repeat):
+            for prompt in prompts:
+                inputs = tokenizer([prompt], return_tensors="pt").to(llm.device)
+                ids = inputs["input_ids"]
+                if ids.shape[1] <= n or not torch.equal(ids[0, :n], prefix_ids[0]):
+                    raise SystemExit("The prompt doesn't tokenize to the prefix's tokens; the cache can't be used.")
+                suffix_tokens.append(ids.shape[1] - n)
+
+                samples["full prefill"].append(timed(lambda: model(**inputs))[0])
+                copy_time, past = timed(lambda: copy.deepcopy(prefix_past))
+                samples["copy"].append(copy_time)
+                samples["suffix prefill"].append(timed(lambda: model(input_ids=ids[:, n:], past_key_values=past))[0])
+
+                samples["ttft"].append(timed(lambda: model.generate(**inputs, **first_tokens))[0])
+                samples["ttft cached"].append(timed(lambda: model.generate(
+                    **inputs, past_key_values=copy.deepcopy(prefix_past), **first_tokens))[0])
+
+    runs, outputs = {}, {}
+    for label, enabled in (("off", False), ("on", True)):
+        llm.prefix_cache = enabled
+        runs[label], outputs[label] = [], []
+        for prompt in prompts:
+            elapsed, response = timed(lambda: llm.run(prompt))
+            runs[label].append(elapsed)
+            outputs[label].append(response)
+
+    print(f"{args.model}: {len(prompts)} recipes x {args.repeat}; prefix {n} tokens, "
+          f"suffix {sum(suffix_tokens) / len(suffix_tokens):.0f} tokens on average; "
+          f"prefilling the prefix once took {setup_time * 1000:.1f} ms")
+    print(f"{'stage':<16} {'mean ms':>9}")
+    for stage, values in samples.items():
+        print(f"{stage:<16} {mean_ms(values):>9.2f}")
+    saved = mean_ms(samples["full prefill"]) - mean_ms(samples["copy"]) - mean_ms(samples["suffix prefill"])
+    print(f"prefill saved per request: {saved:.2f} ms; "
+          f"TTFT {mean_ms(samples['ttft']):.2f} -> {mean_ms(samples['ttft cached']):.2f} ms")
+    print(f"LLM.run: {mean_ms(runs['off']):.1f} ms without, {mean_ms(runs['on']):.1f} ms with the cached prefix; "
+          f"identical outputs: {outputs['off'] == outputs['on']}")
+
+if __name__ == "__main__":
+    main()
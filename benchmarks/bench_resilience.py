@@ -0,0 +1,113 @@
+"""
+Runs the test/json recipes against a fault-injecting mock Spoonacular server and
+compares the analyzer's resilient transport with a bare one (no timeout, no
+retries, no circuit breaker; how the analyzer behaved before).
+
+Scenarios:
+    healthy   no faults
+    flaky     10% of requests fail with 503, 2% are throttled with 429 + Retry-After
+    throttled the server accepts --max-rate requests per second and answers the
+              rest with 429 + Retry-After; analyses run on --workers threads
+    hangs     2% of requests hang for --hang-seconds before answering
+    outage    every request fails with 503
+    quota     the daily points quota runs out partway through
+
+For each, it reports the requests the server saw, how many analyses came out
+identical to a fault-free run, how many failed with an error (instead of
+returning incomplete totals), and the tail of the per-analysis latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_resilience --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from recipe_analyzer import IngredientLookupError, RecipeAnalyzer
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run(server, recipes, options):
+    """
+    Analyzes every recipe with a fresh, cache-less analyzer; returns (results,
+    latencies, transport stats). A failed analysis's result is its error dict.
+    """
+    options = dict(options)
+    bare = options.pop("bare", False)
+    analyzer = RecipeAnalyzer(api_key="bench", cache_path=None, api_root=server.api_root, **options)
+    if bare:
+        analyzer.transport.rate_limiter = None
+    results, latencies = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for recipe in recipes:
+            start = time.perf_counter()
+            try:
+                results.append(analyzer.analyze_recipe(recipe))
+            except IngredientLookupError as e:
+                results.append({"error": str(e)})
+            latencies.append(time.perf_counter() - start)
+    return results, sorted(latencies), analyzer.transport.stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock server delay per request, in seconds.")
+    parser.add_argument("--hang-seconds", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=1.0, help="Per-request timeout of the resilient client.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus per scenario.")
+    parser.add_argument("--max-rate", type=float, default=20, help="Server request limit in the throttled scenario.")
+    parser.add_argument("--workers", type=int, default=8, help="Lookup threads per analysis in the throttled scenario.")
+    parser.add_argument("--json-dir", default="test/json")
+    parser.add_argument("--scenarios", nargs="*", help="Only run these scenarios.")
+    args = parser.parse_args()
+
+    recipes = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(args.json_dir).glob("json_out_*.json"))]
+    recipes *= args.repeat
+    scenarios = {
+        "healthy": {},
+        "flaky": {"error_rate": 0.10, "throttle_rate": 0.02, "retry_after": 1},
+        "throttled": {"max_rate": args.max_rate, "retry_after": 1},
+        "hangs": {"hang_rate": 0.02, "hang_seconds": args.hang_seconds},
+        "outage": {"error_rate": 1.0},
+        "quota": {"daily_quota": 150},
+    }
+    clients = {
+        "bare": {"bare": True, "timeout": None, "max_retries": 0, "breaker_threshold": None},
+        "resilient": {"timeout": args.timeout, "breaker_reset": 5.0},
+    }
+
+    server = MockSpoonacularServer(latency=args.latency).start()
+    try:
+        reference, _, _ = run(server, recipes, clients["bare"])
+    finally:
+        server.stop()
+
+    print(f"{len(recipes)} analyses per run, mock latency {args.latency * 1000:.0f} ms")
+    print(f"{'scenario':<9} {'client':<10} {'requests':>8} {'correct':>8} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}  transport")
+    for scenario, faults in scenarios.items():
+        if args.scenarios and scenario not in args.scenarios:
+            continue
+        for client, options in clients.items():
+            # A fresh server per run, so every client meets the same seeded faults and a full quota.
+            server = MockSpoonacularServer(latency=args.latency, **faults).start()
+            try:
+                if scenario == "throttled":
+                    options = dict(options, max_workers=args.workers)
+                results, latencies, stats = run(server, recipes, options)
+                requests_seen = server.total_requests
+            finally:
+                server.stop()
+            correct = sum(result == expected for result, expected in zip(results, reference))
+            failed = sum("error" in result for result in results)
+            tail = [percentile(latencies, f) * 1000 for f in (0.5, 0.95, 0.99)] + [latencies[-1] * 1000]
+            extra = {k: stats[k] for k in ("retries", "timeouts", "circuit_opened", "rejected", "exhausted") if stats.get(k)}
+            print(f"{scenario:<9} {client:<10} {requests_seen:>8} {correct:>4}/{len(recipes):<3} {failed:>7} "
+                  + " ".join(f"{value:>8.0f}" for value in tail) + f"  {extra}")
+
+if __name__ == "__main__":
+    main()
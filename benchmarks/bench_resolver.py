@@ -0,0 +1,156 @@
+"""
+Benchmarks the fuzzy ingredient-name resolver.
+
+0. Names that differ by a word which picks a different food ("hot sauce" and
+   "sauce"), or by a one-letter change that makes another word ("ground beet" and
+   "ground beef"), must not resolve to each other.
+1. Lookup latency with 100k known names: exact matches after normalization
+   ("cold heavy cream" -> "heavy cream"), misspellings, and unknown names (misses).
+2. Search calls saved: the test/json recipes are analyzed against the mock
+   Spoonacular server, then again with the names reworded the way different LLM
+   runs tend to write them ("diced ...", "fresh ...", plurals, typos), with and
+   without the resolver.
+
+Run from the repository root:
+    python -m benchmarks.bench_resolver --names 100000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from nutrition.resolver import IngredientResolver
+from recipe_analyzer import RecipeAnalyzer
+
+FOODS = [
+    "cream", "chicken", "tomato", "onion", "pepper", "cheese", "bean", "rice", "flour", "sugar",
+    "butter", "milk", "yogurt", "apple", "potato", "carrot", "lentil", "pasta", "noodle", "bread",
+    "sausage", "salmon", "tuna", "shrimp", "mushroom", "lettuce", "spinach", "squash", "corn", "pea",
+    "vinegar", "oil", "honey", "syrup", "juice", "broth", "sauce", "seed", "nut", "oat",
+    "cabbage", "celery", "garlic", "ginger", "lemon", "lime", "orange", "berry", "plum", "melon",
+]
+VARIETIES = [
+    "red", "green", "yellow", "white", "black", "brown", "sweet", "sour", "spicy", "smoked",
+    "wild", "baby", "organic", "heavy", "light", "low fat", "whole wheat", "unsalted", "salted", "dried",
+    "roasted", "pickled", "canned", "frozen", "instant", "aged", "sharp", "mild", "golden", "purple",
+    "long grain", "short grain", "jasmine", "basmati", "cajun", "thai", "greek", "italian", "mexican", "french",
+    "coconut", "almond", "maple", "vanilla", "chocolate", "cinnamon", "garlic", "herb", "chili", "sesame",
+]
+ORIGINS = [
+    "", "california", "texas", "maine", "alaskan", "atlantic", "pacific", "kansas", "vermont", "georgia",
+    "idaho", "florida", "hawaiian", "spanish", "chinese", "japanese", "korean", "indian", "turkish", "moroccan",
+    "persian", "peruvian", "brazilian", "cuban", "jamaican", "irish", "scottish", "dutch", "german", "polish",
+    "russian", "swiss", "belgian", "danish", "nordic", "egyptian", "lebanese", "syrian", "ethiopian", "kenyan",
+    "nigerian", "ghanaian", "vietnamese", "filipino", "malaysian", "indonesian", "australian", "canadian", "chilean", "argentine",
+]
+# (query, known name) pairs naming different ingredients.
+DISTINCT_PAIRS = [
+    ("hot sauce", "sauce"), ("hot dog", "dog"), ("whole milk", "milk"),
+    ("crushed red pepper", "red pepper"), ("cooked rice", "rice"),
+    ("ground beet", "ground beef"), ("line juice", "lime juice"),
+]
+REWORDINGS = ["cold {}", "diced {}", "fresh {}", "{}s", "chopped fresh {}", "{}, drained"]
+
+def typo(name, rng):
+    """Deletes or swaps one character somewhere after the first letter."""
+    i = rng.randrange(1, len(name) - 1)
+    if rng.random() < 0.5:
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+def synthetic_names(count, rng):
+    names = [" ".join(filter(None, (origin, variety, food))) for origin in ORIGINS for variety in VARIETIES for food in FOODS]
+    rng.shuffle(names)
+    return names[:count]
+
+def check_distinct(pairs, threshold):
+    """Returns the (query, known name) pairs the resolver wrongly treats as the same ingredient."""
+    wrong = []
+    for query, known in pairs:
+        resolver = IngredientResolver(threshold)
+        resolver.add(known, 1)
+        if resolver.resolve(query) is not None:
+            wrong.append((query, known))
+    return wrong
+
+def time_lookups(resolver, queries):
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        hits += resolver.resolve(query) is not None
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1e6, latencies[int(0.95 * len(latencies))] * 1e6, hits / len(queries)
+
+def analyze_all(recipes, api_root, fuzzy_threshold):
+    """Analyzes every recipe with a fresh cache and returns the analyzer used."""
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = RecipeAnalyzer(api_key="bench", cache_path=os.path.join(tmp, "cache.db"), api_root=api_root,
+                                  fuzzy_threshold=fuzzy_threshold)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for recipe in recipes:
+                analyzer.analyze_recipe(recipe)
+        analyzer.cache.close()
+    return analyzer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--json-dir", default="test/json")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    wrong = check_distinct(DISTINCT_PAIRS, args.threshold)
+    print(f"Distinct ingredients kept apart: {len(DISTINCT_PAIRS) - len(wrong)}/{len(DISTINCT_PAIRS)}"
+          + "".join(f"\n  '{query}' resolved to '{known}'" for query, known in wrong))
+
+    names = synthetic_names(args.names, rng)
+    resolver = IngredientResolver(args.threshold)
+    start = time.perf_counter()
+    resolver.add_many((name, i) for i, name in enumerate(names))
+    print(f"Indexed {len(resolver)} names in {time.perf_counter() - start:.2f} s")
+
+    sample = rng.sample(names, args.queries)
+    query_sets = {
+        "reworded": [rng.choice(REWORDINGS).format(name) for name in sample],
+        "misspelled": [typo(name, rng) for name in sample],
+        "unknown": [f"{rng.choice(FOODS)} {typo(rng.choice(FOODS) + rng.choice(FOODS), rng)}" for _ in sample],
+    }
+    print(f"{'queries':<12} {'p50 us':>8} {'p95 us':>8} {'resolved':>9}")
+    for label, queries in query_sets.items():
+        p50, p95, hit_rate = time_lookups(resolver, queries)
+        print(f"{label:<12} {p50:>8.1f} {p95:>8.1f} {hit_rate:>9.0%}")
+
+    # The same recipes as the LLM might write them on other runs.
+    recipes = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(args.json_dir).glob("json_out_*.json"))]
+    reworded = []
+    for template in REWORDINGS[:3] + [None]:
+        for recipe in recipes:
+            reworded.append([
+                dict(item, ingredient=template.format(item["ingredient"]) if template else typo(item["ingredient"], rng))
+                for item in recipe
+            ])
+    workload = recipes + reworded
+
+    server = MockSpoonacularServer().start()
+    try:
+        print(f"\n{len(workload)} recipe analyses ({len(recipes)} originals, {len(reworded)} reworded):")
+        for label, threshold in (("exact cache only", None), (f"resolver ({args.threshold})", args.threshold)):
+            server.reset_counts()
+            analyzer = analyze_all(workload, server.api_root, threshold)
+            searches = server.request_counts["/food/ingredients/search"]
+            extra = f"  {analyzer.resolver.stats}" if analyzer.resolver else ""
+            print(f"  {label:<18} {searches:>5} search calls{extra}")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
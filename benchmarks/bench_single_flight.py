@@ -0,0 +1,137 @@
+"""
+Stress test for single-flight request coalescing.
+
+1. 100 threads analyze the same recipe at the same moment on one shared
+   RecipeAnalyzer (starting from an empty cache), with and without single_flight.
+   With it, the mock Spoonacular server should see exactly one request per unique
+   lookup key. The same again in bulk mode: with single_flight, the overlapping
+   parseIngredients requests send every line once. Without it, 100 simultaneous
+   requests overflow the mock's connection backlog, the circuit breaker opens and
+   some analyses come back empty, hence "agree False".
+2. 100 coroutines per key await SingleFlight.do_async, together with threads calling
+   SingleFlight.do for the same keys, including a key whose request fails: every
+   caller gets the shared result or error from one request.
+
+Run from the repository root:
+    python -m benchmarks.bench_single_flight --callers 100 --latency 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from nutrition.single_flight import SingleFlight
+from recipe_analyzer import RecipeAnalyzer
+
+def unique_keys(recipe):
+    """The number of distinct search and information lookups one analysis of `recipe` makes."""
+    items = [item for item in recipe if item.get("quantity", 0) > 0 and item.get("unit")]
+    names = {item["ingredient"].strip().lower() for item in items}
+    infos = {(item["ingredient"].strip().lower(), item["quantity"], item["unit"].strip().lower()) for item in items}
+    return len(names) + len(infos)
+
+def concurrent_analyses(recipe, callers, api_root, single_flight, bulk=False):
+    """Runs `callers` simultaneous analyses of `recipe`; returns (analyzer, results, seconds)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = RecipeAnalyzer(api_key="bench", cache_path=os.path.join(tmp, "cache.db"), api_root=api_root,
+                                  single_flight=single_flight, bulk=bulk)
+        # Each thread may open its own connection; size the pool so none are discarded.
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=callers)
+        analyzer.session.mount("http://", adapter)
+        barrier = threading.Barrier(callers)
+        results = [None] * callers
+
+        def analyze(i):
+            barrier.wait()
+            results[i] = analyzer.analyze_recipe(recipe)
+
+        threads = [threading.Thread(target=analyze, args=(i,)) for i in range(callers)]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        analyzer.cache.close()
+    return analyzer, results, elapsed
+
+async def mixed_callers(flights, keys, callers, fetch):
+    """`callers` coroutines plus a few threads per key, all asking at once."""
+    outcomes = []
+
+    def blocking_caller(key):
+        try:
+            outcomes.append(flights.do(key, lambda: fetch(key)))
+        except Exception as e:
+            outcomes.append(e)
+
+    # Threads join through the blocking API while the coroutines are waiting. They
+    # are plain threads rather than executor jobs: a blocked executor worker could
+    # starve a coroutine leader waiting for one.
+    threads = [threading.Thread(target=blocking_caller, args=(key,)) for key in keys for _ in range(4)]
+    tasks = [flights.do_async(key, lambda key=key: fetch(key)) for key in keys for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    outcomes.extend(await asyncio.gather(*tasks, return_exceptions=True))
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server delay per request, in seconds.")
+    parser.add_argument("--recipe", default="test/json/json_out_001.json")
+    args = parser.parse_args()
+
+    recipe = json.loads(Path(args.recipe).read_text(encoding="utf-8"))
+    expected = unique_keys(recipe)
+    server = MockSpoonacularServer(latency=args.latency).start()
+    try:
+        print(f"{args.callers} concurrent analyses of {args.recipe} ({expected} unique lookup keys)")
+        print(f"{'mode':<5} {'single_flight':<14} {'requests':>9} {'per key':>8} {'lines sent':>11} {'coalesced':>10} "
+              f"{'seconds':>8} {'agree':>6}")
+        for bulk in (False, True):
+            for single_flight in (False, True):
+                server.reset_counts()
+                analyzer, results, elapsed = concurrent_analyses(recipe, args.callers, server.api_root, single_flight, bulk)
+                coalesced = analyzer.flights.coalesced if analyzer.flights is not None else 0
+                agree = all(result == results[0] for result in results)
+                # In bulk mode the keys are the recipe's lines, each sent to parseIngredients.
+                lines_sent = sum(server.parsed_lines.values())
+                per_key = lines_sent / len(server.parsed_lines) if bulk else server.total_requests / expected
+                print(f"{'bulk' if bulk else 'item':<5} {str(single_flight):<14} {server.total_requests:>9} {per_key:>8.2f} "
+                      f"{lines_sent:>11} {coalesced:>10} {elapsed:>8.2f} {str(agree):>6}")
+
+        server.reset_counts()
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=64))
+
+        def fetch(key):
+            # The last key requests a path the mock doesn't serve, so it fails.
+            path = "/food/ingredients/search" if key != "missing" else "/food/unknown"
+            response = session.get(f"{server.api_root}{path}", params={"query": key, "apiKey": "bench"})
+            response.raise_for_status()
+            return response.json()["results"][0]["id"]
+
+        keys = ["butter", "milk", "flour", "missing"]
+        flights = SingleFlight()
+        outcomes = asyncio.run(mixed_callers(flights, keys, args.callers, fetch))
+        errors = sum(isinstance(outcome, requests.HTTPError) for outcome in outcomes)
+        print(f"\nasyncio + threads: {len(outcomes)} callers over {len(keys)} keys -> "
+              f"{server.total_requests} requests, {errors} callers received the shared error, {flights.stats}")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
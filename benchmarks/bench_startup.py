@@ -0,0 +1,56 @@
+"""
+Measures GUI startup: time-to-first-window (the Tk window is drawn and responsive)
+and time-to-ready (the LLM is loaded), both from process start.
+
+`--eager` reproduces the old behaviour of loading the model before building the
+window, for comparison. Needs a display.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --model hf-internal-testing/tiny-random-LlamaForCausalLM --eager
+"""
+import time
+
+START = time.perf_counter()
+
+import argparse
+import tkinter as tk
+
+def make_factory(model_id):
+    """Returns an LLM factory; the model stack is imported inside it, like the app does."""
+    def factory():
+        from llm import LLM
+        return LLM.HF_LLM(model_id) if model_id else LLM.Gemma_2B_LLM()
+    return factory
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=None, help="Hugging Face model ID to load instead of Gemma 2B.")
+    parser.add_argument("--eager", action="store_true", help="Load the model before creating the window.")
+    args = parser.parse_args()
+
+    factory = make_factory(args.model)
+    if args.eager:
+        llm = factory()
+        factory = lambda: llm
+
+    import main as app_main
+    root = tk.Tk()
+    app = app_main.SousChefAI(root, llm_factory=factory)
+    root.update()
+    first_window = time.perf_counter() - START
+
+    # Keep the event loop turning, as mainloop would, until the model is ready.
+    while not app.model_ready.is_set() and app.load_error is None:
+        root.update()
+        time.sleep(0.01)
+    ready = time.perf_counter() - START
+    root.destroy()
+
+    mode = "eager" if args.eager else "background"
+    print(f"{mode} loading ({args.model or 'Gemma 2B'})")
+    print(f"time-to-first-window: {first_window:.2f} s")
+    print(f"time-to-ready:        {ready:.2f} s" + (f"  (load failed: {app.load_error})" if app.load_error else ""))
+
+if __name__ == "__main__":
+    main()
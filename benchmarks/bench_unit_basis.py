@@ -0,0 +1,74 @@
+"""
+Counts API calls and cache hits when analyzing the test/json recipes with the
+information lookups keyed by the exact (amount, unit) pair, and with them
+normalized to a canonical basis by a UnitConverter (normalize_units=True).
+
+Each mode starts from an empty cache and analyzes the corpus twice: as written,
+then with every quantity doubled, the way the same recipes are analyzed again
+for a different number of servings.
+
+Run from the repository root:
+    python -m benchmarks.bench_unit_basis
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.mock_spoonacular import MockSpoonacularServer
+from nutrition.units import UnitConverter
+from recipe_analyzer import RecipeAnalyzer
+
+INFO = "information"
+
+def info_requests(server):
+    return sum(count for path, count in server.request_counts.items() if path.endswith(INFO))
+
+def run_pass(analyzer, server, recipes):
+    """Analyzes the recipes and returns (info requests, search requests, cache hits, cache misses) for the pass."""
+    server.reset_counts()
+    before = analyzer.cache_stats
+    with contextlib.redirect_stdout(io.StringIO()):
+        for recipe in recipes:
+            analyzer.analyze_recipe(recipe)
+    after = analyzer.cache_stats
+    searches = server.request_counts["/food/ingredients/search"]
+    return info_requests(server), searches, after["hits"] - before["hits"], after["misses"] - before["misses"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json-dir", default="test/json")
+    args = parser.parse_args()
+
+    recipes = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(Path(args.json_dir).glob("json_out_*.json"))]
+    doubled = [[dict(item, quantity=item.get("quantity", 0) * 2) for item in recipe] for recipe in recipes]
+
+    converter = UnitConverter()
+    items = [item for recipe in recipes for item in recipe if item.get("quantity", 0) > 0 and item.get("unit")]
+    bases = Counter(converter.basis(item["ingredient"], item["quantity"], item["unit"])[1] for item in items)
+    print(f"{len(recipes)} recipes, {len(items)} analyzable ingredient lines; lookup basis: "
+          + ", ".join(f"{unit} {count}" for unit, count in bases.most_common()))
+
+    server = MockSpoonacularServer().start()
+    try:
+        print(f"{'mode':<10} {'pass':<9} {'info calls':>10} {'searches':>9} {'hits':>6} {'misses':>7} {'hit rate':>9}")
+        for label, normalize in (("exact", False), ("basis", True)):
+            with tempfile.TemporaryDirectory() as tmp:
+                analyzer = RecipeAnalyzer(api_key="bench", cache_path=os.path.join(tmp, "cache.db"),
+                                          api_root=server.api_root, normalize_units=normalize)
+                for pass_label, workload in (("as given", recipes), ("doubled", doubled)):
+                    infos, searches, hits, misses = run_pass(analyzer, server, workload)
+                    rate = hits / (hits + misses) if hits + misses else 0.0
+                    print(f"{label:<10} {pass_label:<9} {infos:>10} {searches:>9} {hits:>6} {misses:>7} {rate:>9.0%}")
+                info_entries = len(analyzer.cache.items("info:"))
+                print(f"{label:<10} cached information entries: {info_entries}")
+                analyzer.cache.close()
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
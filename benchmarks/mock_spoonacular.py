@@ -0,0 +1,284 @@
+"""
+A local stand-in for the Spoonacular ingredient endpoints (search, information and
+the bulk POST /recipes/parseIngredients), used by the benchmarks.
+
+Responses are deterministic (derived from the query text and ID), so results can be
+compared across runs, and every request can be delayed by a fixed latency to mimic
+the round-trip to the real API.
+
+Faults can be injected to exercise the analyzer's transport: a share of requests
+failing with 503, throttled with 429 and a Retry-After header, or hanging before
+answering; a per-second request limit beyond which requests are throttled; a full outage (every request 503) while `outage` is set; and a daily
+points quota reported in X-API-Quota-* headers, with 402 once it is used up, as
+Spoonacular does.
+"""
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Nutrients reported per unit of amount, whatever the unit. Only the relative shape
+# matters for benchmarking.
+NUTRIENTS = [
+    ("Calories", "kcal", 40.0),
+    ("Protein", "g", 1.5),
+    ("Fat", "g", 2.0),
+    ("Carbohydrates", "g", 4.5),
+    ("Sugar", "g", 1.2),
+    ("Sodium", "mg", 35.0),
+    ("Fiber", "g", 0.4),
+    ("Cholesterol", "mg", 6.0),
+]
+
+def ingredient_id_for(name):
+    """Returns the stable fake ID the mock server assigns to an ingredient name."""
+    return zlib.crc32(name.strip().lower().encode("utf-8")) % 100000 + 1
+
+def ingredient_information(ingredient_id, amount, unit):
+    """Builds an information response shaped like Spoonacular's."""
+    # Vary nutrient density by ingredient so totals aren't trivially proportional.
+    density = 0.5 + (ingredient_id % 17) / 8
+    return {
+        "id": ingredient_id,
+        "amount": amount,
+        "unit": unit,
+        "estimatedCost": {"value": round(25 * density * amount, 2), "unit": "US Cents"},
+        "nutrition": {
+            "nutrients": [
+                {"name": name, "amount": round(per_unit * density * amount, 2), "unit": nutrient_unit}
+                for name, nutrient_unit, per_unit in NUTRIENTS
+            ]
+        },
+    }
+
+def parse_ingredient_line(line):
+    """
+    Parses "<amount> <unit> <name>" the way the mock's clients write lines, or
+    returns None. The real endpoint accepts free text; the mock only needs to
+    understand what RecipeAnalyzer sends.
+    """
+    parts = line.split(None, 2)
+    if len(parts) < 3:
+        return None
+    try:
+        amount = float(parts[0])
+    except ValueError:
+        return None
+    return amount, parts[1], parts[2]
+
+def parsed_ingredient(line):
+    """Builds one parseIngredients entry, with the same numbers search + information would give."""
+    parsed = parse_ingredient_line(line)
+    if parsed is None:
+        return {"original": line, "name": line}
+    amount, unit, name = parsed
+    entry = ingredient_information(ingredient_id_for(name), amount, unit)
+    entry.update(original=line, name=name)
+    return entry
+
+class MockSpoonacularHandler(BaseHTTPRequestHandler):
+    def _inject_fault(self):
+        """Answers with an injected fault instead of the real response; returns True if it did."""
+        server = self.server
+        fault = server.draw_fault()
+        if fault == "hang":
+            time.sleep(server.hang_seconds)
+        elif fault == "error":
+            self._send_json(503, {"status": "failure", "message": "Service unavailable"})
+            return True
+        elif fault == "throttle":
+            self._send_json(429, {"status": "failure", "message": "Too many requests"},
+                            {"Retry-After": str(server.retry_after)})
+            return True
+        if not server.charge_quota():
+            self._send_json(402, {"status": "failure", "code": 402,
+                                  "message": f"Your daily points limit of {server.daily_quota} has been reached."})
+            return True
+        return False
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server.record(url.path)
+
+        if server.latency:
+            time.sleep(server.latency)
+        if self._inject_fault():
+            return
+
+        parts = url.path.strip("/").split("/")
+        if url.path == "/food/ingredients/search":
+            query = params.get("query", "").strip()
+            results = [{"id": ingredient_id_for(query), "name": query}] if query else []
+            self._send_json(200, {"results": results, "offset": 0, "number": 10, "totalResults": len(results)})
+        elif len(parts) == 4 and parts[:2] == ["food", "ingredients"] and parts[3] == "information":
+            try:
+                ingredient_id = int(parts[2])
+                amount = float(params.get("amount", 1))
+            except ValueError:
+                self._send_json(400, {"status": "failure", "message": "Bad request"})
+                return
+            self._send_json(200, ingredient_information(ingredient_id, amount, params.get("unit", "")))
+        else:
+            self._send_json(404, {"status": "failure", "message": "Not found"})
+
+    def do_POST(self):
+        server = self.server
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        server.record(url.path)
+
+        if server.latency:
+            time.sleep(server.latency)
+        if self._inject_fault():
+            return
+
+        if url.path == "/recipes/parseIngredients":
+            lines = [line.strip() for line in form.get("ingredientList", "").splitlines() if line.strip()]
+            server.record_lines(lines)
+            self._send_json(200, [parsed_ingredient(line) for line in lines])
+        else:
+            self._send_json(404, {"status": "failure", "message": "Not found"})
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in {**self.server.quota_headers(), **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable.
+        pass
+
+class MockSpoonacularServer(ThreadingHTTPServer):
+    """A threaded HTTP server that answers like Spoonacular and counts requests per path."""
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, handler=MockSpoonacularHandler, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, hang_rate=0.0, hang_seconds=5.0, max_rate=None, daily_quota=None, seed=0):
+        super().__init__(("127.0.0.1", port), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.max_rate = max_rate
+        self._recent = deque()
+        self.daily_quota = daily_quota
+        self.quota_used = 0
+        # While True, every request fails with 503.
+        self.outage = False
+        self.request_counts = Counter()
+        # How often each ingredient line was sent to parseIngredients.
+        self.parsed_lines = Counter()
+        self._count_lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._thread = None
+
+    @property
+    def api_root(self):
+        """The URL to pass as `api_root` to RecipeAnalyzer."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_requests(self):
+        return sum(self.request_counts.values())
+
+    def record(self, path):
+        with self._count_lock:
+            self.request_counts[path] += 1
+
+    def record_lines(self, lines):
+        with self._count_lock:
+            self.parsed_lines.update(lines)
+
+    def reset_counts(self):
+        with self._count_lock:
+            self.request_counts.clear()
+            self.parsed_lines.clear()
+
+    def draw_fault(self):
+        """Picks the fault for one request: "error", "throttle", "hang" or None."""
+        if self.outage:
+            return "error"
+        with self._count_lock:
+            draw = self._random.random()
+            if self.max_rate:
+                # Requests accepted in the last second; beyond max_rate they are throttled.
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.max_rate:
+                    return "throttle"
+                self._recent.append(now)
+        for fault, rate in (("error", self.error_rate), ("throttle", self.throttle_rate), ("hang", self.hang_rate)):
+            if draw < rate:
+                return fault
+            draw -= rate
+        return None
+
+    def charge_quota(self, points=1):
+        """Charges a request against the daily quota; False if the quota is used up."""
+        if self.daily_quota is None:
+            return True
+        with self._count_lock:
+            if self.quota_used + points > self.daily_quota:
+                return False
+            self.quota_used += points
+            return True
+
+    def quota_headers(self):
+        if self.daily_quota is None:
+            return {}
+        with self._count_lock:
+            used = self.quota_used
+        return {"X-API-Quota-Request": "1", "X-API-Quota-Used": str(used),
+                "X-API-Quota-Left": str(max(0, self.daily_quota - used))}
+
+    def handle_error(self, request, client_address):
+        # A client that timed out on a hanging request has closed the socket by
+        # the time the answer is written; that is expected, not worth a traceback.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        """Serves requests on a background thread and returns the server."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock of the Spoonacular ingredient API.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay added to every request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests throttled with 429.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Share of requests that hang before answering.")
+    parser.add_argument("--max-rate", type=float, help="Requests per second beyond which requests are throttled.")
+    parser.add_argument("--daily-quota", type=int, help="Points available before requests fail with 402.")
+    args = parser.parse_args()
+
+    server = MockSpoonacularServer(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                                   throttle_rate=args.throttle_rate, hang_rate=args.hang_rate, max_rate=args.max_rate,
+                                   daily_quota=args.daily_quota)
+    print(f"Mock Spoonacular listening on {server.api_root}")
+    server.serve_forever()
@@ -0,0 +1,107 @@
+import tracing
+from llm import recipe_parser as rp
+from nutrition.aggregate import RecipeNutrition
+
+def recipe_lines(raw_input_text):
+    """Splits recipe text into its non-blank ingredient lines, stripped."""
+    lines = (line.strip() for line in raw_input_text.replace("\r", "").split("\n"))
+    return [line for line in lines if line]
+
+class IncrementalAnalyzer:
+    """
+    Re-analyzes an edited recipe incrementally, for the GUI's repeated submissions.
+
+    A submission is diffed against the previous one. Lines the rule-based parser
+    handles (with the parser's `fast_path`) keep their nutrition one by one, so
+    only new or changed ones are parsed and looked up (`calculator` is a
+    RecipeAnalyzer). The lines the rules leave to the LLM are kept as one group and
+    sent in the same single prompt `CachedParser.parse` builds for the whole
+    recipe, so the model sees the same context as before; the group is only
+    parsed and looked up again when one of its lines changes. A one-line edit of a
+    rule-parsed line therefore costs about as much as analyzing that ingredient.
+
+    The totals are folded from the kept results in the order the full analysis
+    sums them: the rule-parsed lines in recipe order, then the LLM's items.
+
+    A line (or the LLM group) with an ingredient that couldn't be resolved (an
+    unknown ingredient, no quantity) isn't kept and is tried again next time; its
+    parse and any lookups the analyzer cached are reused then. A failed request
+    raises the analyzer's IngredientLookupError and leaves the kept results as
+    they were.
+
+    Not thread-safe: run one analysis at a time.
+    """
+    def __init__(self, parser, calculator):
+        self.parser = parser
+        self.calculator = calculator
+        # Rule-parsed line -> its RecipeNutrition, for the lines of the previous submission.
+        self._lines = {}
+        # (the LLM's lines, their RecipeNutrition) from the previous submission, or None.
+        self._llm_group = None
+        self.last_reused = 0
+        self.last_analyzed = 0
+
+    def reset(self):
+        """Forgets the previous submission, so the next one is analyzed in full."""
+        self._lines = {}
+        self._llm_group = None
+
+    def analyze(self, raw_input_text):
+        """Returns the same display dict as RecipeAnalyzer.analyze_recipe."""
+        return self.recipe_nutrition(raw_input_text).format()
+
+    def recipe_nutrition(self, raw_input_text):
+        """Like `analyze`, but returns the totals as a RecipeNutrition."""
+        lines = recipe_lines(raw_input_text)
+        rule_items, unsure = {}, []
+        for line in lines:
+            item = rp.parse_ingredient_line(line) if self.parser.fast_path else None
+            if item is None:
+                unsure.append(line)
+            else:
+                rule_items[line] = item
+
+        changed = [line for line in rule_items if line not in self._lines]
+        group_changed = bool(unsure) and (self._llm_group is None or self._llm_group[0] != unsure)
+        self.last_analyzed = len(changed) + (len(unsure) if group_changed else 0)
+        self.last_reused = len(rule_items) + len(unsure) - self.last_analyzed
+
+        with tracing.span("IncrementalAnalyzer.analyze", lines=len(lines), changed=self.last_analyzed):
+            llm_items = None
+            if group_changed:
+                with tracing.span("parse", lines=len(unsure)):
+                    llm_items = self.parser.parse("\n".join(unsure))
+                if not isinstance(llm_items, list):
+                    llm_items = None
+
+            # One lookup pass over every new item, so the analyzer's concurrency
+            # and bulk mode still apply.
+            items = [rule_items[line] for line in changed] + (llm_items or [])
+            resolved = self.calculator.resolve_ingredients(items) if items else []
+            fresh = {line: self._nutrition(resolved[i:i + 1]) for i, line in enumerate(changed)}
+            kept = {line: self._lines[line] for line in rule_items if line in self._lines}
+            self._lines = dict(kept, **{line: nutrition for line, (nutrition, complete) in fresh.items() if complete})
+
+            if not unsure:
+                group = None
+                self._llm_group = None
+            elif group_changed:
+                group, complete = self._nutrition(resolved[len(changed):])
+                complete = complete and llm_items is not None
+                self._llm_group = (unsure, group) if complete else None
+            else:
+                group = self._llm_group[1]
+
+            vocabulary = self.calculator.nutrient_vocabulary
+            total = RecipeNutrition.from_infos([], vocabulary)
+            for line in lines:
+                if line in rule_items:
+                    total = total + (kept[line] if line in kept else fresh[line][0])
+            if group is not None:
+                total = total + group
+        return total
+
+    def _nutrition(self, infos):
+        """Returns (RecipeNutrition of the resolved infos, whether every item resolved)."""
+        found = [info for info in infos if info is not None]
+        return RecipeNutrition.from_infos(found, self.calculator.nutrient_vocabulary), len(found) == len(infos)
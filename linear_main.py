@@ -1,22 +1,18 @@
 from llm import LLM, recipe_parser as rp
+from llm.parse_cache import CachedParser
 from recipe_analyzer import *
 
 def main():
-    # Initiate LLM
-    llm = LLM.Gemma_2B_LLM()
+    # Initiate the parser. The LLM itself is only loaded if some lines need it
+    # and they are not already cached.
+    parser = CachedParser(LLM.Gemma_2B_LLM, fast_path=True)
     
     # Get user recipe here [would be from user input in full model]
     with open("recipe.txt", "r", encoding="utf-8") as f:
         raw_input_text = f.read()
 
-    # Pre process user input
-    prompt = rp.pre_process_input(raw_input_text)
-
-    # Get response from LLM
-    response = llm.run(prompt)
-
-    # Extract json from LLM
-    recipe_json = rp.extract_json_from_output(response)
+    # Pre process user input, run the LLM (on a cache miss), and extract the JSON
+    recipe_json = parser.parse(raw_input_text)
     
     # Print JSON for Debugging Purposes
     rp.print_JSON(recipe_json)
@@ -1,92 +1,254 @@
+import copy
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+import tracing
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, LogitsProcessorList, StoppingCriteriaList
+from llm import recipe_parser as rp
+from llm.constraints import IngredientSchemaLogitsProcessor, decode_vocabulary
+from llm.stopping import JSONArrayStoppingCriteria
 
-class Mistral_LLM:
-    def __init__(self):
-        self.model_id = "mistralai/Mistral-7B-v0.1"
+def resolve_device(device="auto"):
+    """Maps "auto" to "cuda" when a GPU is available and "cpu" otherwise."""
+    if device == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    if device not in ("cuda", "cpu"):
+        raise ValueError(f"Unknown device '{device}'. Expected 'auto', 'cuda' or 'cpu'.")
+    return device
+
+class BaseLLM:
+    """
+    Shared loading, tokenization and generation logic for the Hugging Face model
+    wrappers. Subclasses declare their model ID and generation settings as class
+    attributes.
+
+    On CUDA, models load in 4-bit with bitsandbytes. On the CPU they load with
+    `cpu_dtype`: "int8" (dynamic int8 quantization of the linear layers), "bf16" or
+    "fp32". `num_threads` sets torch's intra-op thread count. `precision` records
+    which it was ("nf4" on CUDA, otherwise `cpu_dtype`), since it changes the output.
+
+    With `early_stopping` on, generation stops once the JSON array is closed, and the
+    token budget is capped at `token_budget_base` plus `tokens_per_line` for each
+    ingredient line of the input (never more than `max_new_tokens`).
+
+    With `constrained` on, decoding is restricted to tokens that keep the output a
+    valid `[{"ingredient": str, "quantity": number, "unit": str}]` array.
+
+    With `prefix_cache` on, the instruction block every prompt starts with
+    (`recipe_parser.PROMPT_PREFIX`) is prefilled once per model, and single-prompt
+    generations start from a copy of its KV cache, so only the recipe itself is
+    prefilled. It is off by default: passing a copied cache to generate() depends
+    on the transformers version and the model's cache class (Gemma 2 uses a
+    HybridCache), so check a model with benchmarks/bench_prefix_cache.py (which
+    compares greedy outputs) before turning it on.
+
+    With a `draft` (another wrapper whose model shares this one's tokenizer, e.g.
+    Llama 3.2 1B for Llama 3.2 3B), single-prompt generations use assisted decoding:
+    the draft proposes a few tokens and this model checks them all in one forward
+    pass. Greedy output is the same as decoding alone; with sampling, speculative
+    sampling keeps this model's distribution. Batches and constrained generations
+    decode alone, and assisted generations don't use the prefix cache.
+    """
+    model_id = None
+    generation_kwargs = {"max_new_tokens": 512}
+    # Some models are padded with EOS even though they have their own pad token.
+    pad_with_eos = False
+    early_stopping = True
+    tokens_per_line = 48
+    token_budget_base = 32
+    constrained = False
+    # Sampling keeps this many of the best schema-valid tokens (HF's default top_k).
+    constrained_sampling_candidates = 50
+    prefix_cache = False
+
+    def __init__(self, device="auto", cpu_dtype="int8", num_threads=None, draft=None):
+        self.device = resolve_device(device)
+        self.precision = "nf4" if self.device == "cuda" else cpu_dtype
+        # Prefix text -> (its token IDs, its KV cache), filled on first use.
+        self._prefix_states = {}
+        self.last_cached_tokens = 0
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self._prepare_tokenizer()
+        if self.device == "cuda":
+            self.model = self._load_cuda_model()
+        else:
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self.model = self._load_cpu_model(cpu_dtype)
+        self.model.eval()
+        self.draft = None
+        if draft is not None:
+            self.set_draft(draft)
+
+    @classmethod
+    def default_precision(cls):
+        """The `precision` a wrapper constructed with the default arguments will have."""
+        return "nf4" if resolve_device() == "cuda" else "int8"
+
+    def set_draft(self, draft):
+        """Pairs this wrapper with a smaller `draft` wrapper for assisted decoding (None unpairs)."""
+        if draft is not None:
+            # Draft tokens are checked by ID, so both models must use the same vocabulary.
+            if draft.tokenizer.get_vocab() != self.tokenizer.get_vocab():
+                raise ValueError(f"{draft.model_id} doesn't share the tokenizer of {self.model_id}.")
+            if draft.device != self.device:
+                raise ValueError(f"The draft model is on {draft.device}, but {self.model_id} is on {self.device}.")
+        self.draft = draft
+
+    def _load_cuda_model(self):
         self.bnb_config = BitsAndBytesConfig(
             load_in_4bit=True,
             bnb_4bit_compute_dtype=torch.float16,
             bnb_4bit_use_double_quant=True,
             bnb_4bit_quant_type="nf4"
         )
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
-        self.tokenizer.pad_token = self.tokenizer.eos_token
-        self.model = AutoModelForCausalLM.from_pretrained(
+        return AutoModelForCausalLM.from_pretrained(
             self.model_id,
             device_map="auto",
             torch_dtype=torch.float16,
             quantization_config=self.bnb_config
         )
 
-    def run(self,prompt):
-        inputs = self.tokenizer(prompt, return_tensors="pt", padding=True).to("cuda")
-        outputs = self.model.generate(**inputs, max_new_tokens=512)
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return response
-    
-class Gemma_2B_LLM:
-        def __init__(self):
-            self.model_id = "google/gemma-2-2b-it"
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
-            quantization_config = BitsAndBytesConfig(load_in_4bit=True,bnb_4bit_compute_dtype=torch.float16,bnb_4bit_use_double_quant=True, bnb_4bit_quant_type="nf4")
+    def _load_cpu_model(self, cpu_dtype):
+        if cpu_dtype == "bf16":
+            return AutoModelForCausalLM.from_pretrained(self.model_id, torch_dtype=torch.bfloat16)
+        model = AutoModelForCausalLM.from_pretrained(self.model_id, torch_dtype=torch.float32)
+        if cpu_dtype == "int8":
+            # Weights of every linear layer are stored in int8; activations are
+            # quantized on the fly, which suits CPU matmul kernels.
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif cpu_dtype != "fp32":
+            raise ValueError(f"Unknown cpu_dtype '{cpu_dtype}'. Expected 'int8', 'bf16' or 'fp32'.")
+        return model
+
+    def _prepare_tokenizer(self):
+        # Decoder-only models must be left padded so every sequence in a batch ends
+        # right where generation starts. Models without a pad token reuse EOS.
+        if self.pad_with_eos or self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_id,
-                device_map="auto",
-                quantization_config=quantization_config,
-                torch_dtype=torch.float16
-            )
-            
-        def run(self,prompt):
-            inputs = self.tokenizer(prompt, return_tensors="pt").to("cuda")
-            outputs = self.model.generate(**inputs, max_new_tokens=512, do_sample=False, pad_token_id=self.tokenizer.eos_token_id)
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
-
-class Llama_3_2_1B_LLM:
-        def __init__(self):
-            self.model_id = "meta-llama/Llama-3.2-1B-Instruct"
-            self.bnb_config = BitsAndBytesConfig(
-                load_in_4bit=True,
-                bnb_4bit_compute_dtype=torch.float16,
-                bnb_4bit_use_double_quant=True,
-                bnb_4bit_quant_type="nf4"
-            )
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_id,
-                device_map="auto",
-                torch_dtype=torch.float16,
-                quantization_config=self.bnb_config
-            )
-
-        def run(self,prompt):
-            inputs = self.tokenizer(prompt, return_tensors="pt").to("cuda")
-            outputs = self.model.generate(**inputs, max_new_tokens=512, do_sample=True, pad_token_id=self.tokenizer.eos_token_id)
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
-
- 
-class Llama_3_2_3B_LLM:
-        def __init__(self):
-            self.model_id = "meta-llama/Llama-3.2-3B-Instruct"
-            self.bnb_config = BitsAndBytesConfig(
-                load_in_4bit=True,
-                bnb_4bit_compute_dtype=torch.float16,
-                bnb_4bit_use_double_quant=True,
-                bnb_4bit_quant_type="nf4"
-            )
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_id,
-                device_map="auto",
-                torch_dtype=torch.float16,
-                quantization_config=self.bnb_config
-            )
-
-        def run(self,prompt):
-            inputs = self.tokenizer(prompt, return_tensors="pt").to("cuda")
-            outputs = self.model.generate(**inputs, max_new_tokens=512, do_sample=True, pad_token_id=self.tokenizer.eos_token_id)
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
+        self.tokenizer.padding_side = "left"
+
+    def run(self, prompt):
+        with tracing.span("LLM.run", model=self.model_id):
+            return self.run_batch([prompt], batch_size=1)[0]
+
+    def run_batch(self, prompts, batch_size=8):
+        """
+        Generates a response for every prompt, running up to `batch_size` prompts
+        through each `generate` call. Responses are returned in the input order.
+        """
+        # Batching prompts of similar length keeps padding (and wasted compute) low.
+        order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
+        responses = [None] * len(prompts)
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            for i, response in zip(chunk, self._generate([prompts[i] for i in chunk])):
+                responses[i] = response
+        return responses
+
+    def _generation_settings(self, prompts, prompt_length=None):
+        """Returns the generate() keyword arguments for a batch of prompts."""
+        settings = dict(self.generation_kwargs, pad_token_id=self.tokenizer.pad_token_id)
+        if self.early_stopping:
+            longest = max(rp.count_ingredient_lines(prompt) for prompt in prompts)
+            budget = self.token_budget_base + self.tokens_per_line * longest
+            settings["max_new_tokens"] = min(settings.get("max_new_tokens", budget), budget)
+            criteria = JSONArrayStoppingCriteria(self.tokenizer, len(prompts), prompt_length=prompt_length)
+            settings["stopping_criteria"] = StoppingCriteriaList([criteria])
+        if self.constrained:
+            # Greedy decoding only needs the single best valid token.
+            candidates = self.constrained_sampling_candidates if settings.get("do_sample") else 1
+            processor = IngredientSchemaLogitsProcessor(self.tokenizer, len(prompts), self._schema_vocabulary(), max_candidates=candidates)
+            settings["logits_processor"] = LogitsProcessorList([processor])
+        # Assisted decoding runs one sequence at a time, and the schema processor
+        # can't follow draft tokens that get rejected.
+        if self.draft is not None and len(prompts) == 1 and not self.constrained:
+            settings["assistant_model"] = self.draft.model
+        return settings
+
+    def _schema_vocabulary(self):
+        # Decoding the whole vocabulary takes a while, so do it once per model.
+        if getattr(self, "_vocabulary", None) is None:
+            self._vocabulary = decode_vocabulary(self.tokenizer)
+        return self._vocabulary
+
+    def _prefix_state(self, prefix):
+        """Returns (token IDs, KV cache) of `prefix`, prefilling it on first use."""
+        if prefix not in self._prefix_states:
+            ids = self.tokenizer(prefix, return_tensors="pt")["input_ids"].to(self.device)
+            with tracing.span("LLM.prefill_prefix", tokens=ids.shape[1]):
+                with torch.inference_mode():
+                    past = self.model(input_ids=ids, use_cache=True).past_key_values
+            self._prefix_states[prefix] = (ids, past)
+        return self._prefix_states[prefix]
+
+    def _reusable_prefix(self, prompts, input_ids):
+        """
+        Returns a fresh copy of the cached prefix KV cache for this generation, or
+        None if it can't be used.
+        """
+        # In a left-padded batch the prefix starts at a different position in every
+        # row, so only single prompts reuse it.
+        if not self.prefix_cache or len(prompts) != 1:
+            return None
+        prefix, _ = rp.split_prompt(prompts[0])
+        if not prefix:
+            return None
+        prefix_ids, past = self._prefix_state(prefix)
+        n = prefix_ids.shape[1]
+        # The prompt must tokenize to exactly the prefix's tokens followed by at
+        # least one more (generate needs something to prefill for the first logits).
+        if input_ids.shape[1] <= n or not torch.equal(input_ids[0, :n], prefix_ids[0]):
+            return None
+        self.last_cached_tokens = n
+        # generate() appends to the cache in place, so every request gets its own copy.
+        return copy.deepcopy(past)
+
+    def _generate(self, prompts):
+        # Padding produces the attention mask that keeps pad tokens out of attention.
+        with tracing.span("LLM.tokenize", batch=len(prompts)):
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
+        settings = self._generation_settings(prompts, prompt_length=inputs["input_ids"].shape[1])
+        self.last_cached_tokens = 0
+        # Assisted generation with an injected cache hasn't been verified, so the
+        # two don't combine: assisted generations prefill the whole prompt.
+        past = None if "assistant_model" in settings else self._reusable_prefix(prompts, inputs["input_ids"])
+        if past is not None:
+            settings["past_key_values"] = past
+        with tracing.span("LLM.generate", batch=len(prompts), prompt_tokens=inputs["input_ids"].shape[1],
+                          cached_tokens=self.last_cached_tokens, assisted="assistant_model" in settings):
+            with torch.inference_mode():
+                outputs = self.model.generate(**inputs, **settings)
+
+        # Record how many tokens each sequence actually generated (padding excluded),
+        # which the benchmarks report.
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        self.last_new_tokens = (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        with tracing.span("LLM.detokenize", batch=len(prompts)):
+            return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+class Mistral_LLM(BaseLLM):
+    model_id = "mistralai/Mistral-7B-v0.1"
+    generation_kwargs = {"max_new_tokens": 512}
+    pad_with_eos = True
+
+class Gemma_2B_LLM(BaseLLM):
+    model_id = "google/gemma-2-2b-it"
+    generation_kwargs = {"max_new_tokens": 512, "do_sample": False}
+    pad_with_eos = True
+
+class Llama_3_2_1B_LLM(BaseLLM):
+    model_id = "meta-llama/Llama-3.2-1B-Instruct"
+    generation_kwargs = {"max_new_tokens": 512, "do_sample": True}
+
+class Llama_3_2_3B_LLM(BaseLLM):
+    model_id = "meta-llama/Llama-3.2-3B-Instruct"
+    generation_kwargs = {"max_new_tokens": 512, "do_sample": True}
+
+class HF_LLM(BaseLLM):
+    """
+    A wrapper for any Hugging Face causal LM, on the CPU and unquantized by default.
+    Meant for benchmarks and experiments with small local models.
+    """
+    def __init__(self, model_id, max_new_tokens=512, device="cpu", cpu_dtype="fp32", num_threads=None, draft=None):
+        self.model_id = model_id
+        self.generation_kwargs = {"max_new_tokens": max_new_tokens, "do_sample": False}
+        super().__init__(device=device, cpu_dtype=cpu_dtype, num_threads=num_threads, draft=draft)
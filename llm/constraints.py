@@ -0,0 +1,240 @@
+import torch
+from transformers import LogitsProcessor
+
+# The object every array element must match, in key order.
+OBJECT_FIELDS = (("ingredient", "string"), ("quantity", "number"), ("unit", "string"))
+WHITESPACE = " \t\n\r"
+# Bounds that stop a constrained model from looping forever inside one value.
+MAX_WHITESPACE_RUN = 16
+MAX_STRING_LENGTH = 64
+MAX_NUMBER_LENGTH = 12
+
+class IngredientSchemaState:
+    """
+    A character-level recognizer for `[{"ingredient": str, "quantity": number,
+    "unit": str}, ...]`. `feed` reports whether text keeps the output a valid prefix
+    of that schema; `copy` is cheap so candidate tokens can be tried speculatively.
+    """
+    __slots__ = ("stage", "field", "pos", "length", "escaped", "number", "whitespace")
+
+    def __init__(self):
+        self.stage = "open"
+        self.field = 0
+        self.pos = 0
+        self.length = 0
+        self.escaped = False
+        self.number = None
+        self.whitespace = 0
+
+    def copy(self):
+        other = IngredientSchemaState.__new__(IngredientSchemaState)
+        for slot in self.__slots__:
+            setattr(other, slot, getattr(self, slot))
+        return other
+
+    @property
+    def done(self):
+        return self.stage == "done"
+
+    def feed(self, text):
+        """Consumes `text`, returning False (and leaving the state undefined) if it breaks the schema."""
+        for char in text:
+            if not self._feed_char(char):
+                return False
+        return True
+
+    def _skip_whitespace(self, char):
+        if char in WHITESPACE:
+            self.whitespace += 1
+            return self.whitespace <= MAX_WHITESPACE_RUN
+        return None
+
+    def _feed_char(self, char):
+        stage = self.stage
+        if stage == "string":
+            return self._feed_string(char)
+        if stage == "number":
+            result = self._feed_number(char)
+            if result is not None:
+                return result
+            stage = self.stage  # The number ended; `char` belongs to what follows.
+
+        if stage == "done":
+            return False
+        if stage != "key" or self.pos == 0:
+            skipped = self._skip_whitespace(char)
+            if skipped is not None:
+                return skipped
+        self.whitespace = 0
+
+        if stage == "open":
+            if char != "[":
+                return False
+            self.stage = "items"
+        elif stage == "items":
+            if char == "]":
+                self.stage = "done"
+            elif char == "{":
+                self._start_object()
+            else:
+                return False
+        elif stage == "key":
+            literal = f'"{OBJECT_FIELDS[self.field][0]}"'
+            if char != literal[self.pos]:
+                return False
+            self.pos += 1
+            if self.pos == len(literal):
+                self.stage = "colon"
+        elif stage == "colon":
+            if char != ":":
+                return False
+            self.stage = "value"
+        elif stage == "value":
+            if OBJECT_FIELDS[self.field][1] == "string":
+                if char != '"':
+                    return False
+                self.stage, self.length, self.escaped = "string", 0, False
+            else:
+                self.stage, self.length, self.number = "number", 0, "start"
+                return self._feed_number(char)
+        elif stage == "separator":
+            if self.field < len(OBJECT_FIELDS) - 1:
+                if char != ",":
+                    return False
+                self.field += 1
+                self.stage, self.pos = "key", 0
+            else:
+                if char != "}":
+                    return False
+                self.stage = "next"
+        elif stage == "next":
+            if char == "]":
+                self.stage = "done"
+            elif char == ",":
+                self.stage = "comma"
+            else:
+                return False
+        elif stage == "comma":
+            if char != "{":
+                return False
+            self._start_object()
+        return True
+
+    def _start_object(self):
+        self.stage, self.field, self.pos = "key", 0, 0
+
+    def _feed_string(self, char):
+        if self.escaped:
+            self.escaped = False
+            if char not in '"\\/bfnrt':
+                return False
+        elif char == "\\":
+            self.escaped = True
+        elif char == '"':
+            # The ingredient name can't be empty; the unit may be.
+            if self.field == 0 and self.length == 0:
+                return False
+            self.stage = "separator"
+            self.whitespace = 0
+            return True
+        elif ord(char) < 0x20:
+            return False
+        self.length += 1
+        return self.length <= MAX_STRING_LENGTH
+
+    def _feed_number(self, char):
+        """
+        Consumes one character of a non-negative JSON number. Returns None when the
+        number has ended and `char` must be handled by the next stage.
+        """
+        state = self.number
+        if char.isdigit() and char.isascii():
+            if state == "zero":
+                return False
+            self.number = {"start": "zero" if char == "0" else "int", "dot": "frac"}.get(state, state)
+        elif char == "." and state in ("zero", "int"):
+            self.number = "dot"
+        elif state in ("zero", "int", "frac"):
+            self.stage = "separator"
+            self.whitespace = 0
+            return None
+        else:
+            return False
+        self.length += 1
+        return self.length <= MAX_NUMBER_LENGTH
+
+def decode_vocabulary(tokenizer):
+    """
+    Returns the text each token ID contributes when it follows other tokens, so
+    candidate tokens can be checked against the schema character by character.
+    """
+    strings = []
+    for token_id in range(len(tokenizer)):
+        text = tokenizer.decode([token_id])
+        token = tokenizer.convert_ids_to_tokens(token_id)
+        # SentencePiece tokenizers drop the leading space of a lone "▁word" token.
+        if isinstance(token, str) and token.startswith("▁") and not text.startswith(" "):
+            text = " " + text
+        # Partial UTF-8 byte tokens decode to the replacement character; never allow them.
+        strings.append(None if "�" in text else text)
+    return strings
+
+class IngredientSchemaLogitsProcessor(LogitsProcessor):
+    """
+    Masks every token that would make the output stop matching the ingredient schema.
+
+    Checking the whole vocabulary each step would be far too slow in Python, so
+    candidates are tried in descending logit order and only the best `max_candidates`
+    valid tokens stay unmasked. With greedy decoding (max_candidates=1) this picks
+    exactly the token full masking would, and for sampling it matches top-k filtering.
+    """
+    def __init__(self, tokenizer, batch_size, vocabulary, max_candidates=1, search_width=256):
+        self.eos_token_id = tokenizer.eos_token_id
+        self.vocabulary = vocabulary
+        self.states = [IngredientSchemaState() for _ in range(batch_size)]
+        self.max_candidates = max_candidates
+        self.search_width = search_width
+        self._seen = None
+
+    def _advance(self, input_ids):
+        # The first call sees only the prompt; later calls add the tokens we allowed.
+        if self._seen is None:
+            self._seen = input_ids.shape[1]
+            return
+        for state, tokens in zip(self.states, input_ids[:, self._seen:].tolist()):
+            for token_id in tokens:
+                if not state.done and token_id < len(self.vocabulary) and self.vocabulary[token_id]:
+                    state.feed(self.vocabulary[token_id])
+        self._seen = input_ids.shape[1]
+
+    def _allowed(self, state, token_ids):
+        allowed = []
+        for token_id in token_ids:
+            if token_id == self.eos_token_id:
+                ok = state.done
+            elif state.done or token_id >= len(self.vocabulary) or not self.vocabulary[token_id]:
+                ok = False
+            else:
+                ok = state.copy().feed(self.vocabulary[token_id])
+            if ok:
+                allowed.append(token_id)
+                if len(allowed) == self.max_candidates:
+                    break
+        return allowed
+
+    def __call__(self, input_ids, scores):
+        self._advance(input_ids)
+        masked = torch.full_like(scores, float("-inf"))
+        for row, state in enumerate(self.states):
+            if state.done:
+                allowed = [self.eos_token_id]
+            else:
+                width = min(self.search_width, scores.shape[1])
+                allowed = self._allowed(state, torch.topk(scores[row], width).indices.tolist())
+                if not allowed:
+                    # Rare: nothing valid near the top, so search the full ranking.
+                    allowed = self._allowed(state, torch.argsort(scores[row], descending=True).tolist())
+            if allowed:
+                index = torch.tensor(allowed, device=scores.device)
+                masked[row, index] = scores[row, index]
+        return masked
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import tracing
+from llm import recipe_parser as rp
+
+def normalize_prompt(prompt):
+    """
+    Normalizes a prompt so that whitespace-only edits (trailing spaces, blank lines,
+    Windows line endings) map to the same cache key.
+    """
+    lines = (line.strip() for line in prompt.replace("\r", "").split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def make_key(prompt, model_id, generation_kwargs):
+    """
+    Returns the content hash identifying one parse: the normalized prompt, the model,
+    and the generation settings it was produced with (which CachedParser extends
+    with the decoding constraint and the precision of the weights).
+    """
+    payload = json.dumps(
+        {"prompt": normalize_prompt(prompt), "model_id": model_id, "generation": generation_kwargs},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ParseCache:
+    """
+    A two-tier cache of parsed ingredient JSON: an in-memory dictionary in front of
+    one JSON file per entry in `cache_dir`, so entries survive restarts and can be
+    inspected by hand.
+    """
+    def __init__(self, cache_dir="parse_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached entry for `key` (checking memory, then disk), or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and os.path.exists(self._path(key)):
+                try:
+                    with open(self._path(key), "r", encoding="utf-8") as f:
+                        entry = json.load(f)
+                    self._memory[key] = entry
+                except (OSError, ValueError):
+                    # A half-written or corrupted file is treated as a miss.
+                    entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, parsed, model_id):
+        """Stores a parsed ingredient list in both tiers."""
+        entry = {"model_id": model_id, "created_at": time.time(), "parsed": parsed}
+        with self._lock:
+            self._memory[key] = entry
+            # Write to a temporary file first so readers never see a partial entry.
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, indent=2)
+            os.replace(tmp_path, self._path(key))
+
+    def entries(self):
+        """Lists every stored entry as (key, model_id, created_at, ingredient count)."""
+        listing = []
+        for filename in sorted(os.listdir(self.cache_dir)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, filename), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            listing.append((filename[:-len(".json")], entry.get("model_id"), entry.get("created_at"), len(entry.get("parsed", []))))
+        return listing
+
+    def clear(self):
+        """Removes every entry from memory and disk and resets the counters."""
+        with self._lock:
+            self._memory.clear()
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(".json") or filename.endswith(".tmp"):
+                    os.remove(os.path.join(self.cache_dir, filename))
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return sum(1 for filename in os.listdir(self.cache_dir) if filename.endswith(".json"))
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+def _precision(llm):
+    """The precision `llm`'s weights are (or, for a wrapper class, will be) loaded in, or None if it doesn't say."""
+    if isinstance(llm, type):
+        default = getattr(llm, "default_precision", None)
+        return default() if default else None
+    return getattr(llm, "precision", None)
+
+class CachedParser:
+    """
+    Parses recipe text into ingredient JSON, consulting a ParseCache before running
+    the model.
+
+    `llm` may be an LLM wrapper instance or a wrapper class. A class is only
+    instantiated on the first cache miss, so runs that hit the cache never load the
+    model at all. With `fast_path`, well-formed lines are parsed by the rule-based
+    parser and only the remaining lines go to the (cached) LLM.
+
+    Parses are keyed by the wrapper's `precision` too, so an int8 model's output isn't
+    served as a bf16 model's; a class is keyed by the precision it loads with by default.
+    """
+    def __init__(self, llm, cache=None, model_id=None, generation_kwargs=None, fast_path=False):
+        self._llm = None if isinstance(llm, type) else llm
+        self._llm_class = llm if isinstance(llm, type) else None
+        self.model_id = model_id or llm.model_id
+        if generation_kwargs is None:
+            # Constrained decoding and quantization change the output, so they are
+            # part of the key too.
+            generation_kwargs = dict(llm.generation_kwargs, constrained=getattr(llm, "constrained", False),
+                                     precision=_precision(llm))
+        self.generation_kwargs = generation_kwargs
+        self.cache = cache if cache is not None else ParseCache()
+        self.fast_path = fast_path
+        self._load_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        """The underlying model wrapper, loaded on first access."""
+        with self._load_lock:
+            if self._llm is None:
+                self._llm = self._llm_class()
+        return self._llm
+
+    def parse(self, raw_input_text):
+        """
+        Returns the parsed ingredient list for a recipe. On a miss, the model output
+        goes through `extract_json_from_output`, and only successful parses (lists)
+        are cached; the raw text fallback is returned as-is.
+        """
+        if not self.fast_path:
+            return self._parse_with_llm(raw_input_text)
+
+        with tracing.span("fast_parse"):
+            parsed, unsure = rp.fast_parse(raw_input_text)
+        if unsure:
+            llm_json = self._parse_with_llm("\n".join(unsure))
+            if isinstance(llm_json, list):
+                parsed.extend(llm_json)
+            else:
+                print(f"Warning: LLM fallback returned no JSON for {len(unsure)} line(s).")
+        return parsed
+
+    def _parse_with_llm(self, raw_input_text):
+        prompt = rp.pre_process_input(raw_input_text)
+        key = make_key(prompt, self.model_id, self.generation_kwargs)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry["parsed"]
+
+        response = self.llm.run(prompt)
+        with tracing.span("extract_json_from_output"):
+            recipe_json = rp.extract_json_from_output(response)
+        if isinstance(recipe_json, list):
+            self.cache.set(key, recipe_json, self.model_id)
+        return recipe_json
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM parse cache.")
+    parser.add_argument("--cache-dir", default="parse_cache")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached parse.")
+    args = parser.parse_args()
+
+    cache = ParseCache(args.cache_dir)
+    if args.clear:
+        count = len(cache)
+        cache.clear()
+        print(f"Removed {count} cached parses from {args.cache_dir}.")
+    else:
+        for key, model_id, created_at, count in cache.entries():
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)) if created_at else "?"
+            print(f"{key[:16]}  {created}  {model_id}  {count} ingredients")
+        print(f"{len(cache)} entries in {args.cache_dir}")
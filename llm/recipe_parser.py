@@ -2,37 +2,62 @@ from fractions import Fraction
 import re
 import json
 
+FRACTION_MAP = {
+    '½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4',
+    '¾': '3/4', '⅕': '1/5', '⅖': '2/5', '⅗': '3/5',
+    '⅘': '4/5', '⅙': '1/6', '⅚': '5/6', '⅛': '1/8',
+    '⅜': '3/8', '⅝': '5/8', '⅞': '7/8'
+}
+
 def unicode_fraction_to_float(text):
-    fraction_map = {
-        '½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4',
-        '¾': '3/4', '⅕': '1/5', '⅖': '2/5', '⅗': '3/5',
-        '⅘': '4/5', '⅙': '1/6', '⅚': '5/6', '⅛': '1/8',
-        '⅜': '3/8', '⅝': '5/8', '⅞': '7/8'
-    }
-    for uf, frac in fraction_map.items():
+    for uf, frac in FRACTION_MAP.items():
         text = text.replace(uf, str(float(Fraction(frac))))
     return text
 
+# The instructions in front of every recipe. They never change, so the LLM wrappers
+# can prefill them once and reuse the result; anything recipe-specific belongs in
+# the suffix.
+PROMPT_PREFIX = (
+    "You are an expert recipe parser. Extract the ingredients from the following text "
+    "into a structured JSON array. \n"
+    "Rules:\n"
+    "1. 'ingredient' must be lowercase and singular (e.g., 'eggs' -> 'egg').\n"
+    "2. 'quantity' MUST be a numeric decimal value. Do not use strings.\n"
+    "3. If a quantity is ambiguous or non-numeric (e.g., 'to taste', 'a pinch', 'a dash'), the 'quantity' MUST be 0.\n"
+    "4. If no quantity is specified at all, the 'quantity' MUST be 0.\n"
+    "5. 'unit' must be lowercase and singular. If no unit is given, infer the most appropriate one (e.g., 'piece' for an egg, 'clove' for garlic, 'teaspoon' for powders, like salt and pepper).\n\n"
+    "Input Text:\n---\n"
+)
+
 def pre_process_input(recipe):
     """
     Formats the raw recipe text for the LLM.
     """
     processed_recipe = unicode_fraction_to_float(recipe)
     
-    final_prompt = (
-        "You are an expert recipe parser. Extract the ingredients from the following text "
-        "into a structured JSON array. \n"
-        "Rules:\n"
-        "1. 'ingredient' must be lowercase and singular (e.g., 'eggs' -> 'egg').\n"
-        "2. 'quantity' MUST be a numeric decimal value. Do not use strings.\n"
-        "3. If a quantity is ambiguous or non-numeric (e.g., 'to taste', 'a pinch', 'a dash'), the 'quantity' MUST be 0.\n"
-        "4. If no quantity is specified at all, the 'quantity' MUST be 0.\n"
-        "5. 'unit' must be lowercase and singular. If no unit is given, infer the most appropriate one (e.g., 'piece' for an egg, 'clove' for garlic, 'teaspoon' for powders, like salt and pepper).\n\n"
-        f"Input Text:\n---\n{processed_recipe.strip()}\n---\n\n"
+    final_prompt = PROMPT_PREFIX + (
+        f"{processed_recipe.strip()}\n---\n\n"
         "Respond ONLY with the JSON array. Do not include explanations or any extra text."
     )
     return final_prompt
 
+def split_prompt(prompt):
+    """
+    Splits a prompt into (PROMPT_PREFIX, recipe-specific suffix). Prompts not
+    built by `pre_process_input` have no shared prefix: ("", prompt).
+    """
+    if prompt.startswith(PROMPT_PREFIX):
+        return PROMPT_PREFIX, prompt[len(PROMPT_PREFIX):]
+    return "", prompt
+
+def count_ingredient_lines(prompt):
+    """
+    Counts the non-empty recipe lines in a prompt built by `pre_process_input`.
+    """
+    match = re.search(r"Input Text:\n---\n(.*?)\n---\n", prompt, re.DOTALL)
+    text = match.group(1) if match else prompt
+    return sum(1 for line in text.split("\n") if line.strip())
+
 def extract_json_from_output(text):
     # Extract the JSON Array
     try:
@@ -42,4 +67,187 @@ def extract_json_from_output(text):
         return text  # fallback to raw output
     
 def print_JSON(json_text):
-    print("\nParsed JSON:\n", json.dumps(json_text, indent=2))
\ No newline at end of file
+    print("\nParsed JSON:\n", json.dumps(json_text, indent=2))
+
+# --- Rule-based fast path ---
+# Well-formed ingredient lines ("1/2 cup sliced almonds, toasted") are parsed
+# deterministically; anything the rules aren't sure about is left for the LLM.
+
+# Maps every spelling of a unit to its normalized, singular form.
+UNIT_ALIASES = {
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "tablespoon": "tablespoon", "tablespoons": "tablespoon", "tbsp": "tablespoon", "tbs": "tablespoon", "tbl": "tablespoon",
+    "teaspoon": "teaspoon", "teaspoons": "teaspoon", "tsp": "teaspoon",
+    "pound": "pound", "pounds": "pound", "lb": "pound", "lbs": "pound",
+    "ounce": "ounce", "ounces": "ounce", "oz": "ounce",
+    "gram": "gram", "grams": "gram", "g": "gram",
+    "kilogram": "kilogram", "kilograms": "kilogram", "kg": "kilogram",
+    "milliliter": "milliliter", "milliliters": "milliliter", "ml": "milliliter",
+    "liter": "liter", "liters": "liter", "l": "liter",
+    "quart": "quart", "quarts": "quart", "pint": "pint", "pints": "pint",
+    "can": "can", "cans": "can", "packet": "packet", "packets": "packet",
+    "package": "package", "packages": "package", "slice": "slice", "slices": "slice",
+    "stalk": "stalk", "stalks": "stalk", "head": "head", "heads": "head",
+    "bunch": "bunch", "bunches": "bunch", "sprig": "sprig", "sprigs": "sprig",
+    "stick": "stick", "sticks": "stick", "leaf": "leaf", "leaves": "leaf",
+    "clove": "clove", "cloves": "clove",
+    "pinch": "pinch", "pinches": "pinch", "dash": "dash", "dashes": "dash", "handful": "handful",
+}
+
+# Units that describe an imprecise amount; rule 3 of the prompt makes these quantity 0.
+IMPRECISE_UNITS = {"pinch": "pinch", "dash": "dash", "handful": "bunch"}
+
+# Descriptors dropped from ingredient names. Words that change what is bought
+# ("fresh", "frozen", "melted", "ground") are kept.
+DROPPED_DESCRIPTORS = {
+    "large", "medium", "small", "extra-large", "jumbo", "ripe",
+    "chopped", "diced", "sliced", "minced", "shredded", "grated", "halved", "cubed",
+    "packed", "finely", "thinly", "roughly", "coarsely", "freshly",
+}
+
+# Words that start a trailing preparation note after a comma ("butter, softened").
+PREP_NOTE_WORDS = DROPPED_DESCRIPTORS | {
+    "softened", "toasted", "juiced", "zested", "rinsed", "drained", "peeled", "seeded",
+    "cut", "half", "or", "to", "divided", "beaten", "melted", "room", "at", "optional",
+    "trimmed", "crumbled", "cooked", "cooled", "warmed", "thawed", "pitted", "stemmed",
+}
+
+# Plurals that the suffix rules below would get wrong.
+IRREGULAR_SINGULARS = {
+    "leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife", "molasses": "molasses",
+    "cookies": "cookie", "brownies": "brownie", "veggies": "veggie", "smoothies": "smoothie", "calories": "calorie",
+    "fries": "fry", "chilies": "chili", "chillies": "chilli",
+}
+
+# Words that join a second amount onto the name ("1 x 400g can", "2 eggs plus 1 yolk").
+AMOUNT_JOINERS = {"x", "×", "plus"}
+
+_NUMBER = r"\d+(?:\.\d+)?(?:\s+\d+/\d+|/\d+)?"
+_QUANTITY_RE = re.compile(rf"^(?P<low>{_NUMBER})(?:\s*(?:-|–|to)\s*(?P<high>{_NUMBER}))?\s+(?P<rest>.+)$")
+_TO_TASTE_RE = re.compile(r"^(?P<name>[a-z][a-z\s-]*?),?\s+(?:or\s+)?to taste$")
+_ARTICLE_RE = re.compile(r"^(?:a|an|one)\s+(?P<unit>pinch|dash|handful)\s+of\s+(?P<name>.+)$")
+
+def _to_number(text):
+    """Converts '2', '0.5', '1/2' or a mixed number like '1 1/2' to a float."""
+    return float(sum(Fraction(part) for part in text.split()))
+
+def singularize(word):
+    """Returns the singular form of an English noun using simple suffix rules."""
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        # Short stems are "-ie" words ("pies", "ties"); longer ones mostly "-y" ("berries").
+        return word[:-1] if len(word) <= 5 else word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+def _clean_name(text):
+    """
+    Normalizes an ingredient name: drops parenthetical notes, trailing preparation
+    notes and descriptors, and singularizes the head noun. Returns None if the name
+    still looks ambiguous.
+    """
+    text = re.sub(r"\([^)]*\)", " ", text)
+    segments = [segment.strip() for segment in text.split(",")]
+    # Drop trailing ", softened" / ", or to taste" style notes.
+    while len(segments) > 1 and segments[-1].split(" ")[0] in PREP_NOTE_WORDS:
+        segments.pop()
+    if len(segments) > 1:
+        return None  # A comma inside the name ("boneless, skinless chicken").
+
+    words = [word for word in segments[0].split() if word not in DROPPED_DESCRIPTORS]
+    if words and words[0] == "of":
+        words = words[1:]
+    # Lists and alternatives ("salt and pepper", "water or milk") need the LLM, and
+    # so do names that still carry an amount ("14-ounce can coconut milk").
+    if not words or any(word in ("and", "or", "&", "/") or word.endswith(":") for word in words):
+        return None
+    if any(word in AMOUNT_JOINERS or any(c.isdigit() for c in word) for word in words):
+        return None
+    words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+def parse_ingredient_line(line):
+    """
+    Parses one ingredient line into {"ingredient", "quantity", "unit"} following the
+    same rules the LLM prompt spells out. Returns None when the line isn't
+    well-formed enough to parse with confidence.
+    """
+    text = line.strip().lower()
+    # Unicode fractions become ' 1/2' so '1½' reads as the mixed number '1 1/2'.
+    for uf, frac in FRACTION_MAP.items():
+        text = text.replace(uf, f" {frac}")
+    text = re.sub(r"\s+", " ", text).strip()
+    if not text:
+        return None
+
+    # "Salt to taste" and "A pinch of salt" carry no numeric quantity.
+    match = _TO_TASTE_RE.match(text)
+    if match:
+        name = _clean_name(match.group("name"))
+        return {"ingredient": name, "quantity": 0, "unit": "teaspoon"} if name else None
+    match = _ARTICLE_RE.match(text)
+    if match:
+        name = _clean_name(match.group("name"))
+        return {"ingredient": name, "quantity": 0, "unit": IMPRECISE_UNITS[match.group("unit")]} if name else None
+
+    match = _QUANTITY_RE.match(text)
+    if not match:
+        return None
+    try:
+        quantity = _to_number(match.group("low"))
+        if match.group("high"):
+            # Ranges ("2-3 cups") use their midpoint.
+            quantity = (quantity + _to_number(match.group("high"))) / 2
+    except (ValueError, ZeroDivisionError):
+        return None
+
+    # A parenthetical right after the quantity ("1 can (5 oz) tuna") is a size note.
+    rest = re.sub(r"^\([^)]*\)\s*", "", match.group("rest"))
+    words = rest.split(" ")
+    # Size words can come before the unit, as in "8 large cloves garlic".
+    while len(words) > 1 and words[0] in ("large", "medium", "small"):
+        words = words[1:]
+
+    unit = UNIT_ALIASES.get(words[0].rstrip("."))
+    if unit and len(words) > 1:
+        words = words[1:]
+    else:
+        unit = None
+
+    name = _clean_name(" ".join(words))
+    if not name:
+        return None
+    if unit == "clove":
+        # Garlic is counted in pieces of "garlic clove".
+        name, unit = f"{name} clove", "piece"
+    elif unit in IMPRECISE_UNITS:
+        quantity, unit = 0, IMPRECISE_UNITS[unit]
+    elif unit is None:
+        # A bare count ("3 large eggs") is measured in pieces.
+        unit = "piece"
+
+    if quantity == int(quantity):
+        quantity = int(quantity)
+    return {"ingredient": name, "quantity": quantity, "unit": unit}
+
+def fast_parse(recipe):
+    """
+    Parses every line of a recipe with the rule-based parser. Returns the parsed
+    ingredients and the lines the rules were unsure about.
+    """
+    parsed, unsure = [], []
+    for line in recipe.replace("\r", "").split("\n"):
+        if not line.strip():
+            continue
+        result = parse_ingredient_line(line)
+        if result is None:
+            unsure.append(line.strip())
+        else:
+            parsed.append(result)
+    return parsed, unsure
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class MicroBatchScheduler:
+    """
+    Sits in front of an LLM wrapper and merges prompts from concurrent callers into
+    batched `run_batch` calls. A batch is dispatched once it holds `max_batch_size`
+    prompts or the oldest prompt has waited `max_wait_ms`, whichever comes first.
+
+    It has the same `run(prompt)` interface as the wrappers (and forwards every other
+    attribute to the wrapped model), so it can be used wherever an LLM is expected.
+    """
+    def __init__(self, llm, max_batch_size=8, max_wait_ms=10):
+        self.llm = llm
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched_prompts = 0
+        self._pending = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name):
+        # Only called for attributes the scheduler doesn't define itself
+        # (model_id, generation_kwargs, tokenizer, ...).
+        return getattr(self.__dict__["llm"], name)
+
+    def submit(self, prompt):
+        """Queues a prompt and returns a Future that resolves to the model's response."""
+        if self._closed:
+            raise RuntimeError("The scheduler has been closed.")
+        future = Future()
+        self._pending.put((prompt, future))
+        return future
+
+    def run(self, prompt):
+        return self.submit(prompt).result()
+
+    def run_batch(self, prompts, batch_size=None):
+        futures = [self.submit(prompt) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stops the dispatcher after the prompts already queued have been served."""
+        self._closed = True
+        self._pending.put(None)
+        self._worker.join()
+
+    def _collect_batch(self):
+        """Blocks for the first prompt, then gathers more until the batch is full or the wait expires."""
+        first = self._pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Serve what we have, then let the loop see the shutdown marker.
+                self._pending.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                responses = self.llm.run_batch(prompts, batch_size=len(prompts))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_prompts += len(batch)
+            for (_, future), response in zip(batch, responses):
+                future.set_result(response)
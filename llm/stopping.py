@@ -0,0 +1,77 @@
+import torch
+from transformers import StoppingCriteria
+
+class JSONArrayTracker:
+    """
+    Follows bracket and string nesting in a stream of generated text and reports when
+    the first top-level JSON array has been closed.
+    """
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+
+    def feed(self, text):
+        """Consumes more generated text. Returns True once the array is complete."""
+        for char in text:
+            if self.done:
+                break
+            if not self.started:
+                # Anything before the array (a code fence, a stray sentence) is ignored.
+                if char == "[":
+                    self.started = True
+                    self.depth = 1
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.done = True
+        return self.done
+
+class JSONArrayStoppingCriteria(StoppingCriteria):
+    """
+    Stops each sequence in a batch as soon as its top-level JSON array closes, so no
+    tokens are spent on text that `extract_json_from_output` would throw away.
+
+    Pass the (padded) `prompt_length` when a step can add several tokens at once, as
+    in assisted decoding; otherwise it is inferred from the first call.
+    """
+    def __init__(self, tokenizer, batch_size, prompt_length=None):
+        self.tokenizer = tokenizer
+        self.trackers = [JSONArrayTracker() for _ in range(batch_size)]
+        self._seen = prompt_length
+        # Decoding single tokens is cheap but happens every step, so memoize it.
+        self._token_text = {}
+
+    def _decode(self, token_id):
+        text = self._token_text.get(token_id)
+        if text is None:
+            text = self.tokenizer.decode([token_id], skip_special_tokens=True)
+            self._token_text[token_id] = text
+        return text
+
+    def __call__(self, input_ids, scores, **kwargs):
+        # Without a prompt length, only the last token is new on the first call.
+        if self._seen is None:
+            self._seen = input_ids.shape[1] - 1
+        new_tokens = input_ids[:, self._seen:].tolist()
+        self._seen = input_ids.shape[1]
+
+        for tracker, tokens in zip(self.trackers, new_tokens):
+            for token_id in tokens:
+                if tracker.feed(self._decode(token_id)):
+                    break
+        return torch.tensor([tracker.done for tracker in self.trackers], dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,41 @@
+import json
+import re
+import time
+from llm import recipe_parser as rp
+
+class StubLLM:
+    """
+    A stand-in for the model wrappers that needs no weights: it answers with the
+    rule-based parse of the prompt's recipe after a fixed delay. Used to exercise the
+    service and benchmarks locally.
+
+    `latency` is charged once per `generate`-like call, plus `per_item_latency` for
+    every prompt in it, so batched calls are cheaper per prompt, like on a real GPU.
+    """
+    model_id = "stub"
+    generation_kwargs = {}
+
+    def __init__(self, latency=0.0, per_item_latency=0.0):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+
+    def _respond(self, prompt):
+        match = re.search(r"Input Text:\n---\n(.*?)\n---\n", prompt, re.DOTALL)
+        parsed, unsure = rp.fast_parse(match.group(1) if match else prompt)
+        # Lines the rules can't handle come back with no quantity, like a model
+        # that found the ingredient but not the amount.
+        parsed += [{"ingredient": line.lower(), "quantity": 0, "unit": ""} for line in unsure]
+        return prompt + "\n" + json.dumps(parsed)
+
+    def run(self, prompt):
+        return self.run_batch([prompt])[0]
+
+    def run_batch(self, prompts, batch_size=8):
+        responses = []
+        for start in range(0, len(prompts), batch_size):
+            chunk = prompts[start:start + batch_size]
+            self.calls += 1
+            time.sleep(self.latency + self.per_item_latency * len(chunk))
+            responses.extend(self._respond(prompt) for prompt in chunk)
+        return responses
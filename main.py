@@ -2,28 +2,39 @@ import tkinter as tk
 from tkinter import scrolledtext
 import json
 import threading
-from llm import LLM, recipe_parser as rp
+import tracing
+from incremental_analysis import IncrementalAnalyzer
+from llm.parse_cache import CachedParser
 from recipe_analyzer import RecipeAnalyzer
 
 class SousChefAI:
     """
     The main class for the Sous-Chef.ai application.
     """
-    def __init__(self, root):
+    def __init__(self, root, llm_factory=None):
         """
         Initializes the SousChefAI application, sets up the GUI,
-        and loads the necessary backend models.
+        and starts loading the backend model in the background.
+        `llm_factory` builds the LLM wrapper (Gemma 2B by default).
         """
         self.root = root
         self.root.title("Sous-Chef.ai Nutrition Analyzer")
-        self.root.geometry("550x480")
+        self.root.geometry("550x500")
 
         self.BG_COLOR = "#5F8575"  # A muted green (same as presentation)
         self.FG_COLOR = "#FFFFFF"  # White text for contrast
         self.root.config(bg=self.BG_COLOR)
 
-        # Initialize the LLM for parsing recipe text.
-        self.llm = LLM.Gemma_2B_LLM()
+        # The LLM is loaded on a background thread (see _load_model) so the window
+        # appears right away. An analysis requested before it is ready waits in
+        # `pending_text` and starts once loading finishes.
+        self.llm_factory = llm_factory
+        self.llm = None
+        self.parser = None
+        self.incremental = None
+        self.model_ready = threading.Event()
+        self.load_error = None
+        self.pending_text = None
         # Initialize the RecipeAnalyzer for fetching nutritional data.
         self.calculator = RecipeAnalyzer(api_key=<key>)
         
@@ -33,6 +44,46 @@ class SousChefAI:
         # Build the user interface.
         self._create_widgets()
 
+        # Load the model without blocking the Tk main loop.
+        threading.Thread(target=self._load_model, daemon=True).start()
+
+    def _load_model(self):
+        """
+        Imports the model stack and loads the LLM. Runs on a background thread, since
+        importing torch/transformers and loading the weights take a long time.
+        """
+        try:
+            if self.llm_factory is None:
+                from llm import LLM
+                self.llm_factory = LLM.Gemma_2B_LLM
+            self.llm = self.llm_factory()
+            # Well-formed lines are parsed by rules, and re-submitted recipes are
+            # answered from the parse cache; only the rest goes to the LLM.
+            self.parser = CachedParser(self.llm, fast_path=True)
+            # Re-submitting an edited recipe only analyzes the lines that changed.
+            self.incremental = IncrementalAnalyzer(self.parser, self.calculator)
+            error = None
+        except Exception as e:
+            error = e
+        # Hand the result back to the GUI thread.
+        self.root.after(0, self._on_model_loaded, error)
+
+    def _on_model_loaded(self, error):
+        """Updates the UI once the model has loaded and starts any queued analysis."""
+        pending_text, self.pending_text = self.pending_text, None
+        if error is not None:
+            self.load_error = error
+            self.status_label.config(text=f"Model failed to load: {error}")
+            if pending_text is not None:
+                self._update_summary_labels({"error": f"Model failed to load: {error}"})
+            return
+
+        self.model_ready.set()
+        self.status_label.config(text="Model ready.")
+        if pending_text is not None:
+            self.analyze_button.config(text="Analyzing...")
+            threading.Thread(target=self.run_analysis_logic, args=(pending_text,)).start()
+
     def _create_widgets(self):
         """Creates and places all the Tkinter widgets in the window."""
         # Use a main frame to hold all widgets for better padding and organization.
@@ -50,6 +101,10 @@ class SousChefAI:
         self.analyze_button = tk.Button(main_frame, text="Analyze Recipe", font=("Helvetica", 12, "bold"), command=self.process_recipe)
         self.analyze_button.pack(pady=5)
 
+        # --- Model Status ---
+        self.status_label = tk.Label(main_frame, text="Loading model...", font=("Helvetica", 9, "italic"), bg=self.BG_COLOR, fg=self.FG_COLOR)
+        self.status_label.pack()
+
         # --- Output Area ---
         # A separate frame for results helps to visually group the output.
         results_frame = tk.Frame(main_frame, relief=tk.GROOVE, borderwidth=2, padx=10, pady=10, bg=self.BG_COLOR)
@@ -94,6 +149,16 @@ class SousChefAI:
             self._update_summary_labels({"error": "Please enter a recipe."})
             self.analyze_button.config(state=tk.NORMAL, text="Analyze Recipe")
             return
+
+        if self.load_error is not None:
+            self._update_summary_labels({"error": f"Model failed to load: {self.load_error}"})
+            return
+
+        if not self.model_ready.is_set():
+            # Queue the request; _on_model_loaded starts it once the model is ready.
+            self.pending_text = sanitized_text
+            self.analyze_button.config(text="Queued (model loading)...")
+            return
             
         # Running the analysis in a separate thread to prevent the GUI from freezing during the potentially long-running network and LLM calls.
         threading.Thread(target=self.run_analysis_logic, args=(sanitized_text,)).start()
@@ -103,17 +168,21 @@ class SousChefAI:
         Contains the core analysis logic that runs in the background thread.
         This method performs the LLM parsing and API calls.
         """
+        started = tracing.mark()
         try:
-            # Step 1: Pre-process the input and run the LLM to parse ingredients.
-            prompt = rp.pre_process_input(raw_input_text)
-            response = self.llm.run(prompt)
-            recipe_json = rp.extract_json_from_output(response)
-            
-            # Step 2: Use the parsed JSON to get nutritional data.
-            recipe_analysis = self.calculator.analyze_recipe(recipe_json)
+            with tracing.span("run_analysis_logic", characters=len(raw_input_text)):
+                # Parse the lines that changed since the last analysis (rules first,
+                # then the LLM's lines together in one prompt), look up their
+                # nutrition, and fold the totals with the results kept for the rest.
+                recipe_analysis = self.incremental.analyze(raw_input_text)
         except Exception as e:
             # Catch any exceptions during the process to display an error.
             recipe_analysis = {"error": f"An error occurred: {e}"}
+
+        if tracing.is_enabled():
+            # Show where this analysis spent its time (run with SOUSCHEF_TRACE=trace.json);
+            # the trace written at exit keeps the whole session.
+            tracing.print_summary(since=started)
         
         # When the background task is complete, schedule the GUI update on the
         # main thread
@@ -0,0 +1,244 @@
+import threading
+import numpy as np
+
+# The nutrients shown in the main window. They always occupy the first columns, so
+# summaries can be read off without a name lookup.
+SUMMARY_NUTRIENTS = ["Calories", "Protein", "Fat", "Carbohydrates"]
+
+class NutrientVocabulary:
+    """
+    Maps nutrient names to matrix columns. It grows as responses mention new
+    nutrients; a nutrient keeps its column (and the unit it was first seen with) for
+    the vocabulary's lifetime, so vectors built earlier stay valid after padding.
+    """
+    def __init__(self, names=SUMMARY_NUTRIENTS):
+        self.names = []
+        self.units = []
+        self._columns = {}
+        self._lock = threading.Lock()
+        for name in names:
+            self.index(name, "")
+
+    def __len__(self):
+        return len(self.names)
+
+    def column(self, name):
+        """Returns the column of `name`, or None if it has never been seen."""
+        return self._columns.get(name)
+
+    def index(self, name, unit):
+        """Returns the column for `name`, adding it if needed."""
+        column = self._columns.get(name)
+        if column is None or not self.units[column]:
+            # Analyzer threads share one vocabulary; only growth needs the lock.
+            with self._lock:
+                column = self._columns.get(name)
+                if column is None:
+                    column = len(self.names)
+                    self.names.append(name)
+                    self.units.append(unit)
+                    self._columns[name] = column
+                elif not self.units[column]:
+                    self.units[column] = unit
+        return column
+
+def _pad(array, width):
+    """Pads the last axis of `array` with zeros (or False) up to `width` columns."""
+    missing = width - array.shape[-1]
+    if missing <= 0:
+        return array
+    return np.pad(array, [(0, 0)] * (array.ndim - 1) + [(0, missing)])
+
+def _fractional_mask(present, fractional):
+    """The fractional mask, where None means every reported nutrient is a float."""
+    return present if fractional is None else fractional
+
+def info_rows(infos, vocabulary):
+    """
+    Converts Spoonacular information responses into an ingredient x nutrient matrix,
+    a matching presence mask (True where a response reported the nutrient), a
+    vector of costs in cents, and a mask of the cells that got a non-integer
+    amount (so totals of integer amounts can still be shown as integers).
+    """
+    rows, columns, amounts, fractional_cells = [], [], [], []
+    known, units = vocabulary._columns, vocabulary.units
+    for row, info in enumerate(infos):
+        for n in info.get("nutrition", {}).get("nutrients", []):
+            name = n.get("name")
+            column = known.get(name)
+            if column is None or not units[column]:
+                if name is None:
+                    continue
+                column = vocabulary.index(name, n.get("unit", ""))
+            rows.append(row)
+            columns.append(column)
+            amount = n.get("amount", 0)
+            amounts.append(amount)
+            if not isinstance(amount, int):
+                fractional_cells.append(len(amounts) - 1)
+
+    shape = (len(infos), len(vocabulary))
+    # Flattened cell numbers; bincount sums a nutrient listed twice in one response.
+    flat = np.array(rows, dtype=np.intp) * shape[1] + np.array(columns, dtype=np.intp)
+    values = np.bincount(flat, weights=amounts, minlength=shape[0] * shape[1]).reshape(shape)
+    present = np.zeros(shape, dtype=bool)
+    present.flat[flat] = True
+    fractional = np.zeros(shape, dtype=bool)
+    fractional.flat[flat[fractional_cells]] = True
+    costs = np.array([info.get("estimatedCost", {}).get("value", 0) for info in infos], dtype=float)
+    return values, present, costs, fractional
+
+class RecipeNutrition:
+    """
+    Nutrient totals and cost of one recipe as numbers. Combine with `+`, rescale with
+    `scaled` or `per_serving`, and call `format` only when the result is displayed.
+
+    `fractional` marks the nutrients with at least one non-integer amount; the rest
+    are formatted as integers, as the dict loop did with Python ints. None means
+    every nutrient is fractional.
+    """
+    def __init__(self, totals, present, cost_cents, vocabulary, fractional=None):
+        self.totals = totals
+        self.present = present
+        self.cost_cents = cost_cents
+        self.vocabulary = vocabulary
+        self.fractional = fractional
+
+    @classmethod
+    def from_infos(cls, infos, vocabulary):
+        values, present, costs, fractional = info_rows(infos, vocabulary)
+        # Summed row by row in recipe order (and the costs with plain sum), so the
+        # floating-point results match the dict loop analyze_recipe used to have.
+        return cls(values.sum(axis=0), present.any(axis=0), sum(costs.tolist()), vocabulary, fractional.any(axis=0))
+
+    def __add__(self, other):
+        width = len(self.vocabulary)
+        return RecipeNutrition(
+            _pad(self.totals, width) + _pad(other.totals, width),
+            _pad(self.present, width) | _pad(other.present, width),
+            self.cost_cents + other.cost_cents,
+            self.vocabulary,
+            _pad(_fractional_mask(self.present, self.fractional), width)
+            | _pad(_fractional_mask(other.present, other.fractional), width),
+        )
+
+    def scaled(self, factor):
+        # Scaled amounts are no longer integers.
+        return RecipeNutrition(self.totals * factor, self.present, self.cost_cents * factor, self.vocabulary)
+
+    def per_serving(self, servings):
+        return self.scaled(1 / servings)
+
+    def amount(self, name):
+        """The total of one nutrient (0 if it was never reported)."""
+        column = self.vocabulary.column(name)
+        return float(self.totals[column]) if column is not None and column < len(self.totals) else 0.0
+
+    def format(self):
+        """Returns the display strings RecipeAnalyzer.analyze_recipe has always returned."""
+        totals = self.totals.tolist()
+        fractional = _pad(_fractional_mask(self.present, self.fractional), len(totals)).tolist()
+        names, units = self.vocabulary.names, self.vocabulary.units
+        summary = {name: f"{round(self.amount(name))}" for name in SUMMARY_NUTRIENTS}
+        full_data = {
+            # A sum of integer amounts stayed an int in the dict loop ("100 kcal", not "100.0 kcal").
+            names[column]: f"{round(totals[column] if fractional[column] else int(totals[column]), 2)} {units[column]}"
+            for column in sorted(np.flatnonzero(self.present).tolist(), key=names.__getitem__)
+        }
+        return {"summary": summary, "price": f"${self.cost_cents / 100:.2f}", "full_data": full_data}
+
+class NutrientTable:
+    """
+    Ingredient responses stored once as matrix rows, so any number of recipes can
+    be totalled together as (row, scale) references with a few array operations.
+    """
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary or NutrientVocabulary()
+        self._blocks = []
+        self._rows = 0
+        self._matrix = None
+
+    def __len__(self):
+        return self._rows
+
+    def add(self, infos):
+        """Adds responses as new rows and returns their row numbers."""
+        self._blocks.append(info_rows(infos, self.vocabulary))
+        self._matrix = None
+        first = self._rows
+        self._rows += len(infos)
+        return list(range(first, self._rows))
+
+    def matrix(self):
+        """Returns (values, present, costs, fractional) for all rows, padded to the current vocabulary."""
+        if self._matrix is None:
+            width = len(self.vocabulary)
+            values = np.vstack([_pad(v, width) for v, _, _, _ in self._blocks]) if self._blocks else np.zeros((0, width))
+            present = np.vstack([_pad(p, width) for _, p, _, _ in self._blocks]) if self._blocks else np.zeros((0, width), dtype=bool)
+            costs = np.concatenate([c for _, _, c, _ in self._blocks]) if self._blocks else np.zeros(0)
+            fractional = np.vstack([_pad(f, width) for _, _, _, f in self._blocks]) if self._blocks else np.zeros((0, width), dtype=bool)
+            self._blocks = [(values, present, costs, fractional)]
+            self._matrix = (values, present, costs, fractional)
+        return self._matrix
+
+    def totals(self, recipes):
+        """
+        Totals many recipes at once. `recipes` is a list of lists of row numbers or
+        (row, scale) pairs. Returns a NutritionBatch.
+        """
+        values, present, costs, fractional = self.matrix()
+        rows, scales, lengths = [], [], []
+        for recipe in recipes:
+            lengths.append(len(recipe))
+            for entry in recipe:
+                row, scale = entry if isinstance(entry, tuple) else (entry, 1.0)
+                rows.append(row)
+                scales.append(scale)
+        rows = np.array(rows, dtype=np.intp)
+        scales = np.array(scales)
+        lengths = np.array(lengths)
+
+        totals = np.zeros((len(recipes), values.shape[1]))
+        mask = np.zeros((len(recipes), values.shape[1]), dtype=bool)
+        fractional_mask = np.zeros((len(recipes), values.shape[1]), dtype=bool)
+        recipe_costs = np.zeros(len(recipes))
+        # Every recipe's ingredients are contiguous, so its totals are one segment
+        # sum. reduceat can't express an empty segment, so those stay zero.
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.intp)
+        nonempty = lengths > 0
+        if rows.size:
+            totals[nonempty] = np.add.reduceat(values[rows] * scales[:, None], starts[nonempty], axis=0)
+            mask[nonempty] = np.logical_or.reduceat(present[rows], starts[nonempty], axis=0)
+            # A row used at a scale other than 1 contributes non-integer amounts.
+            scaled_rows = fractional[rows] | (present[rows] & (scales != 1.0)[:, None])
+            fractional_mask[nonempty] = np.logical_or.reduceat(scaled_rows, starts[nonempty], axis=0)
+            recipe_costs[nonempty] = np.add.reduceat(costs[rows] * scales, starts[nonempty])
+        return NutritionBatch(totals, mask, recipe_costs, self.vocabulary, fractional_mask)
+
+class NutritionBatch:
+    """Totals of many recipes as arrays: recipe x nutrient totals and presence, plus costs."""
+    def __init__(self, totals, present, costs, vocabulary, fractional=None):
+        self.totals = totals
+        self.present = present
+        self.costs = costs
+        self.vocabulary = vocabulary
+        self.fractional = fractional
+
+    def __len__(self):
+        return len(self.costs)
+
+    def __getitem__(self, i):
+        fractional = None if self.fractional is None else self.fractional[i]
+        return RecipeNutrition(self.totals[i], self.present[i], float(self.costs[i]), self.vocabulary, fractional)
+
+    def per_serving(self, servings):
+        """Divides every recipe by its number of servings (a scalar or one value per recipe)."""
+        servings = np.broadcast_to(np.asarray(servings, dtype=float), self.costs.shape)
+        return NutritionBatch(self.totals / servings[:, None], self.present, self.costs / servings, self.vocabulary)
+
+    def column(self, name):
+        """One nutrient's total for every recipe, e.g. to rank recipes by protein."""
+        column = self.vocabulary.column(name)
+        if column is None or column >= self.totals.shape[1]:
+            return np.zeros(len(self))
+        return self.totals[:, column]
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+
+class IngredientCache:
+    """
+    A persistent, SQLite-backed cache for Spoonacular lookups with TTL expiry and
+    size-bounded LRU eviction. Values are stored as JSON, so `None` (a "not found"
+    answer from the API) is cached like any other result.
+    """
+    # Returned by `get` when there is no usable entry. This is distinct from a
+    # cached `None`, which means the API already told us the item doesn't exist.
+    MISS = object()
+
+    def __init__(self, path="spoonacular_cache.db", ttl=7 * 24 * 3600, max_entries=10000):
+        """
+        Opens (or creates) the cache database at `path`.
+
+        `ttl` is the lifetime of an entry in seconds (None keeps entries forever) and
+        `max_entries` bounds the number of rows; the least recently used rows are
+        evicted once it is exceeded.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # The GUI runs every analysis on its own thread, so one connection is shared
+        # behind a lock instead of being tied to the thread that created it.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or `IngredientCache.MISS` if there is no
+        entry or it has expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return self.MISS
+
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                # Stale entries are dropped on read so they get refreshed from the API.
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return self.MISS
+
+            # Touch the entry so it counts as recently used for LRU eviction.
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        """Stores `value` (anything JSON-serializable, including None) under `key`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Deletes the least recently used rows until the cache fits in `max_entries`."""
+        if self.max_entries is None:
+            return
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def items(self, prefix=""):
+        """Returns (key without `prefix`, value) for every unexpired entry whose key starts with `prefix`."""
+        oldest = time.time() - self.ttl if self.ttl is not None else float("-inf")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM entries WHERE substr(key, 1, ?) = ? AND created_at >= ?",
+                (len(prefix), prefix, oldest)
+            ).fetchall()
+        return [(key[len(prefix):], json.loads(value)) for key, value in rows]
+
+    def clear(self):
+        """Removes every entry and resets the hit/miss counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+    @property
+    def stats(self):
+        """Hit/miss counters and the current number of stored entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
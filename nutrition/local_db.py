@@ -0,0 +1,226 @@
+import json
+import sqlite3
+import threading
+
+class LocalNutritionDB:
+    """
+    An offline, SQLite-backed nutrition store: ingredient names mapped to IDs, and
+    per-unit nutrient and cost profiles for each (ID, unit) pair. Lookups answer in
+    the same shape as Spoonacular's information endpoint, scaled to the requested
+    amount, so RecipeAnalyzer can use it in place of the network.
+
+    Profiles are stored per single unit, assuming nutrients and cost scale linearly
+    with the amount, which is how Spoonacular computes them too.
+    """
+    def __init__(self, path="nutrition.db"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        # Shared between analyzer worker threads, like IngredientCache.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS names ("
+            " name TEXT PRIMARY KEY,"
+            " ingredient_id INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            " ingredient_id INTEGER NOT NULL,"
+            " unit TEXT NOT NULL,"
+            " cost_per_unit REAL NOT NULL,"
+            " nutrients TEXT NOT NULL,"
+            " PRIMARY KEY (ingredient_id, unit))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize(text):
+        return text.strip().lower()
+
+    def lookup_id(self, name):
+        """Returns the ingredient ID stored for `name`, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT ingredient_id FROM names WHERE name = ?", (self._normalize(name),)).fetchone()
+        return row[0] if row else None
+
+    def information(self, ingredient_id, amount, unit):
+        """
+        Returns a Spoonacular-shaped information dict for `amount` `unit` of the
+        ingredient, or None if there is no profile for that unit.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cost_per_unit, nutrients FROM profiles WHERE ingredient_id = ? AND unit = ?",
+                (ingredient_id, self._normalize(unit))
+            ).fetchone()
+        if row is None:
+            return None
+        cost_per_unit, nutrients = row
+        return {
+            "id": ingredient_id,
+            "amount": amount,
+            "unit": unit,
+            "estimatedCost": {"value": cost_per_unit * amount, "unit": "US Cents"},
+            "nutrition": {
+                "nutrients": [
+                    {"name": name, "amount": per_unit * amount, "unit": nutrient_unit}
+                    for name, nutrient_unit, per_unit in json.loads(nutrients)
+                ]
+            },
+        }
+
+    def lookup(self, name, amount, unit):
+        """Returns the information for `amount` `unit` of the named ingredient, or None on a miss."""
+        ingredient_id = self.lookup_id(name)
+        info = self.information(ingredient_id, amount, unit) if ingredient_id is not None else None
+        with self._lock:
+            if info is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return info
+
+    def names(self):
+        """Returns every stored (name, ingredient_id) pair."""
+        with self._lock:
+            return self._conn.execute("SELECT name, ingredient_id FROM names").fetchall()
+
+    def add_names(self, ingredient_id, names):
+        """Maps every name in `names` to `ingredient_id`."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO names (name, ingredient_id) VALUES (?, ?)",
+                [(self._normalize(name), ingredient_id) for name in names]
+            )
+            self._conn.commit()
+
+    def add_profile(self, ingredient_id, info):
+        """
+        Stores a per-unit profile from a Spoonacular-shaped information dict (which
+        carries its own "amount" and "unit"). Returns False if it can't be used.
+        """
+        row = self._profile_row(ingredient_id, info)
+        if row is None:
+            return False
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?)", row)
+            self._conn.commit()
+        return True
+
+    @staticmethod
+    def _profile_row(ingredient_id, info):
+        try:
+            amount = float(info.get("amount", 1))
+            unit = info["unit"].strip().lower()
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+        if amount <= 0 or not unit:
+            return None
+        cost = info.get("estimatedCost", {}).get("value", 0)
+        nutrients = [
+            [n.get("name"), n.get("unit", ""), n.get("amount", 0) / amount]
+            for n in info.get("nutrition", {}).get("nutrients", [])
+        ]
+        return (ingredient_id, unit, cost / amount, json.dumps(nutrients))
+
+    def import_cache(self, cache_path):
+        """
+        Imports the responses recorded by IngredientCache at `cache_path`: every
+        "id:<name>" entry becomes a name and every "info:..." entry a profile. Cached
+        "not found" answers are skipped. Returns (names, profiles) imported.
+        """
+        source = sqlite3.connect(cache_path)
+        try:
+            rows = source.execute("SELECT key, value FROM entries").fetchall()
+        finally:
+            source.close()
+
+        names, profiles = [], []
+        for key, value in rows:
+            value = json.loads(value)
+            if value is None:
+                continue
+            if key.startswith("id:"):
+                names.append((self._normalize(key[len("id:"):]), value))
+            elif key.startswith("info:"):
+                ingredient_id = int(key.split(":")[1])
+                row = self._profile_row(ingredient_id, value)
+                if row is not None:
+                    profiles.append(row)
+        self._insert_bulk(names, profiles)
+        return len(names), len(profiles)
+
+    def import_dataset(self, path):
+        """
+        Imports a JSONL dataset with one ingredient profile per line:
+
+            {"id": 1123, "name": "egg", "aliases": ["eggs"], "amount": 1, "unit": "piece",
+             "estimatedCost": {"value": 25.0, "unit": "US Cents"},
+             "nutrition": {"nutrients": [{"name": "Calories", "amount": 72, "unit": "kcal"}]}}
+
+        "aliases" is optional and "amount" defaults to 1. Lines that can't be used
+        are skipped with a warning. Returns (names, profiles) imported.
+        """
+        names, profiles = [], []
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    ingredient_id = int(record["id"])
+                    record_names = [record["name"], *record.get("aliases", [])]
+                    row = self._profile_row(ingredient_id, record)
+                    if row is None:
+                        raise ValueError("missing amount or unit")
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Warning: skipping dataset line {line_number}: {e}")
+                    continue
+                names.extend((self._normalize(name), ingredient_id) for name in record_names)
+                profiles.append(row)
+        self._insert_bulk(names, profiles)
+        return len(names), len(profiles)
+
+    def _insert_bulk(self, names, profiles):
+        # One transaction for the whole import; row-by-row commits are far slower.
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO names (name, ingredient_id) VALUES (?, ?)", names)
+                self._conn.executemany("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?)", profiles)
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()
+        return count
+
+    @property
+    def stats(self):
+        """Hit/miss counters and the number of stored names and profiles."""
+        with self._lock:
+            (names,) = self._conn.execute("SELECT COUNT(*) FROM names").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "names": names, "profiles": len(self)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect the offline nutrition database.")
+    parser.add_argument("--db", default="nutrition.db")
+    parser.add_argument("--from-cache", help="Import the responses recorded in a Spoonacular cache database.")
+    parser.add_argument("--from-dataset", help="Import a JSONL dataset of ingredient profiles.")
+    args = parser.parse_args()
+
+    db = LocalNutritionDB(args.db)
+    if args.from_cache:
+        names, profiles = db.import_cache(args.from_cache)
+        print(f"Imported {names} names and {profiles} profiles from {args.from_cache}.")
+    if args.from_dataset:
+        names, profiles = db.import_dataset(args.from_dataset)
+        print(f"Imported {names} names and {profiles} profiles from {args.from_dataset}.")
+    stats = db.stats
+    print(f"{args.db}: {stats['names']} names, {stats['profiles']} profiles")
@@ -0,0 +1,128 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    A thread-safe token-bucket rate limiter. Tokens refill continuously at `rate`
+    per second up to `capacity`; each request takes one token and blocks until one
+    is available.
+    """
+    def __init__(self, rate, capacity=None):
+        """
+        Creates a bucket that allows `rate` requests per second on average, with
+        bursts of up to `capacity` requests (defaults to one second's worth).
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # Sleep just long enough for the next token to arrive.
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        """Changes the refill rate (and the default burst size) from now on."""
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+def seconds_until_utc_midnight(now=None):
+    """Spoonacular's daily points quota resets at midnight UTC."""
+    now = time.time() if now is None else now
+    return 86400 - now % 86400
+
+class AdaptiveRateLimiter:
+    """
+    Paces requests by a fixed ceiling and by the daily points quota Spoonacular
+    reports in its X-API-Quota-* response headers.
+
+    `max_rate` caps requests per second (None for no cap). With `quota_reserve`
+    set (e.g. 0.1), once less than that share of the quota is left the remaining
+    points are spread evenly until the quota resets; that can mean minutes between
+    requests, so it suits unattended batch jobs rather than the GUI. Once the
+    headers report no points left, `exhausted` is True until the quota resets, so
+    callers can fail fast instead of spending requests on certain refusals.
+    """
+    def __init__(self, max_rate=None, quota_reserve=None, seconds_until_reset=seconds_until_utc_midnight):
+        self.max_rate = max_rate
+        self.quota_reserve = quota_reserve
+        self.seconds_until_reset = seconds_until_reset
+        self.quota_left = None
+        self.quota_used = None
+        self.points_per_request = 1.0
+        self._quota_rate = None
+        self._exhausted_until = 0.0
+        self._bucket = TokenBucket(max_rate) if max_rate else None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """The current pace in requests per second, or None if requests aren't being delayed."""
+        rates = [r for r in (self.max_rate, self._quota_rate) if r]
+        return min(rates) if rates else None
+
+    @property
+    def exhausted(self):
+        return time.time() < self._exhausted_until
+
+    def acquire(self):
+        """Blocks until the next request may start."""
+        bucket = self._bucket
+        if bucket is not None:
+            bucket.acquire()
+
+    def observe(self, headers):
+        """Updates the quota from a response's headers and adjusts the pace."""
+        try:
+            left = float(headers["X-API-Quota-Left"])
+            used = float(headers.get("X-API-Quota-Used", 0))
+            cost = float(headers.get("X-API-Quota-Request", self.points_per_request))
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            self.quota_left, self.quota_used = left, used
+            if cost > 0:
+                # Smoothed, since bulk requests cost more points than single lookups.
+                self.points_per_request = 0.8 * self.points_per_request + 0.2 * cost
+            reset_in = self.seconds_until_reset()
+            if left < self.points_per_request:
+                self._exhausted_until = time.time() + reset_in
+            total = left + used
+            if self.quota_reserve and total > 0 and left / total < self.quota_reserve:
+                self._quota_rate = max(left, 0) / self.points_per_request / max(reset_in, 1.0)
+            else:
+                self._quota_rate = None
+
+            rate = self.rate
+            if rate is None:
+                self._bucket = None
+            elif self._bucket is None:
+                self._bucket = TokenBucket(rate)
+            elif rate != self._bucket.rate:
+                self._bucket.set_rate(rate)
+
+    @property
+    def stats(self):
+        return {"rate": self.rate, "quota_left": self.quota_left, "quota_used": self.quota_used,
+                "exhausted": self.exhausted}
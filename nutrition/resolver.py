@@ -0,0 +1,133 @@
+import re
+import threading
+from llm.recipe_parser import DROPPED_DESCRIPTORS, singularize
+
+# Words that describe the temporary state of an ingredient rather than which
+# ingredient it is, so "cold heavy cream" and "heavy cream" resolve to the same ID.
+# Words that can name a different food ("hot sauce", "whole milk", "crushed red
+# pepper", "cooked rice"), and those DROPPED_DESCRIPTORS keeps on purpose ("fresh",
+# "melted"), must stay out of this set.
+IGNORED_WORDS = DROPPED_DESCRIPTORS | {"cold", "warm", "chilled", "softened", "beaten", "thawed", "rinsed", "drained"}
+
+def normalize_name(name):
+    """
+    Canonicalizes an ingredient name for matching: lowercase, punctuation removed,
+    state and preparation words dropped and every word singularized.
+    """
+    words = re.sub(r"[^a-z0-9 ]+", " ", name.lower()).split()
+    kept = [singularize(word) for word in words if word not in IGNORED_WORDS]
+    # A name made only of descriptors ("whole") is kept as it is.
+    return " ".join(kept or words)
+
+def deletes(word):
+    """Every string obtained by deleting one character from `word`."""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def within_one_edit(a, b):
+    """True if `a` and `b` differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    return (a[i + 1:] == b[i + 1:] or a[i + 1:] == b[i:] or a[i:] == b[i + 1:]
+            or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:]))
+
+class IngredientResolver:
+    """
+    Maps ingredient names to Spoonacular IDs using names that were already
+    resolved, so near-duplicates ("diced cold chicken breasts", "chicken breast")
+    don't each need their own search call. Words that can change the food stay in
+    the name, so "cooked chicken" and "chicken" are looked up separately.
+
+    A name first goes through `normalize_name` and an exact lookup. Failing that,
+    each word not in the known vocabulary is corrected to the most common known word
+    one edit away (found through an index of single-character deletions, so this
+    costs a few dictionary lookups rather than a scan), and the corrected name is
+    looked up again. Each corrected word is scored on its own, as the share of its
+    characters the correction left untouched, and the match is only used if every
+    corrected word scores at least `threshold`; otherwise `resolve` returns None and
+    the caller should ask the API. Scoring against the whole name would let a wrong
+    short word in a long name through ("ground beet" -> "ground beef").
+    """
+    # Shorter words are too easy to "correct" into a different ingredient (pea/pear).
+    MIN_CORRECTABLE_LENGTH = 4
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._exact = {}
+        self._word_counts = {}
+        # One-deletion variant (or the word itself) -> known words producing it.
+        self._variants = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._exact)
+
+    def add(self, name, ingredient_id):
+        """Records that `name` resolved to `ingredient_id`."""
+        normalized = normalize_name(name)
+        with self._lock:
+            if normalized in self._exact:
+                return
+            self._exact[normalized] = ingredient_id
+            for word in normalized.split():
+                if word not in self._word_counts:
+                    self._word_counts[word] = 0
+                    for variant in deletes(word) | {word}:
+                        self._variants.setdefault(variant, set()).add(word)
+                self._word_counts[word] += 1
+
+    def add_many(self, pairs):
+        """Adds (name, ingredient_id) pairs, skipping "not found" (None) IDs."""
+        for name, ingredient_id in pairs:
+            if ingredient_id is not None:
+                self.add(name, ingredient_id)
+
+    def _correct(self, word):
+        """Returns the known word closest to `word` (itself if known), or None."""
+        if word in self._word_counts:
+            return word
+        if len(word) < self.MIN_CORRECTABLE_LENGTH:
+            return None
+        # Any word one edit away shares the word itself or one of its deletions
+        # with the word's own entry in the variant index.
+        candidates = set()
+        for variant in deletes(word) | {word}:
+            candidates.update(self._variants.get(variant, ()))
+        candidates = [known for known in candidates if within_one_edit(word, known)]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda known: (self._word_counts[known], known))
+
+    def match(self, name):
+        """Returns (ingredient_id, normalized name matched, score) for the best match, or (None, None, 0.0)."""
+        normalized = normalize_name(name)
+        with self._lock:
+            if normalized in self._exact:
+                self.exact_hits += 1
+                return self._exact[normalized], normalized, 1.0
+
+            words = normalized.split()
+            corrected = [self._correct(word) for word in words]
+            if None not in corrected:
+                candidate = " ".join(corrected)
+                if candidate in self._exact:
+                    # Every correction is one edit, so its score is 1 - 1 / word length.
+                    score = min(1 - (word != fixed) / len(word) for word, fixed in zip(words, corrected))
+                    if score >= self.threshold:
+                        self.fuzzy_hits += 1
+                        return self._exact[candidate], candidate, score
+            self.misses += 1
+            return None, None, 0.0
+
+    def resolve(self, name):
+        """Returns the ingredient ID for `name`, or None if no known name is close enough."""
+        return self.match(name)[0]
+
+    @property
+    def stats(self):
+        return {"names": len(self), "exact_hits": self.exact_hits, "fuzzy_hits": self.fuzzy_hits, "misses": self.misses}
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller (the leader) runs
+    the function, and everyone who asks for that key while it is running waits for
+    the same result, or the same exception, instead of repeating the work.
+
+    Threads call `do`; coroutines await `do_async`. Both share one table of calls in
+    flight, so a coroutine can join a call a thread started and vice versa. Once a
+    call finishes its key is forgotten, so later callers start a fresh call (the
+    caller is expected to cache results itself).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Returns (future for `key`, True if the caller has to run the call)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.calls += 1
+            return future, True
+
+    def _run(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            error, result = e, None
+        else:
+            error = None
+        # Callers arriving from here on start a new call; by now the leader's
+        # result is wherever the caller caches it.
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        """Returns `fn()`, sharing the call with any other caller of `key` in flight."""
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    def do_many(self, keys, fn):
+        """
+        Batch `do`. `fn` is called once, with the list of keys no other caller has
+        in flight, and returns {key: result}; keys already in flight are waited for
+        instead. Returns ({key: result}, {key: exception}) covering every key.
+        """
+        futures, claimed = {}, []
+        for key in dict.fromkeys(keys):
+            futures[key], leader = self._join(key)
+            if leader:
+                claimed.append(key)
+        if claimed:
+            try:
+                results = fn(claimed)
+            except BaseException as e:
+                error, results = e, {}
+            else:
+                error = None
+            with self._lock:
+                for key in claimed:
+                    del self._calls[key]
+            for key in claimed:
+                if error is not None:
+                    futures[key].set_exception(error)
+                else:
+                    futures[key].set_result(results.get(key))
+
+        results, errors = {}, {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = e
+        return results, errors
+
+    async def do_async(self, key, fn, executor=None):
+        """
+        Awaitable `do`. A leading coroutine runs the blocking `fn` on `executor`
+        (the event loop's default executor when None), so the loop keeps running.
+        Don't call the blocking `do` from that executor's workers: if they are all
+        waiting on a call, the leader never gets a worker to run it.
+        """
+        future, leader = self._join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(executor, self._run, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+    def __len__(self):
+        """The number of calls currently in flight."""
+        with self._lock:
+            return len(self._calls)
+
+    @property
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self)}
@@ -0,0 +1,175 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+class QuotaExhaustedError(requests.exceptions.RequestException):
+    """Raised instead of sending a request once the daily points quota is used up."""
+
+def parse_retry_after(value):
+    """Returns the delay a Retry-After header asks for, in seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """
+    Fails fast while the API is down. After `failure_threshold` consecutive failures
+    (timeouts, connection errors, 5xx responses) the circuit opens and requests are
+    refused with CircuitOpenError for `reset_timeout` seconds. Then one trial
+    request is let through (half-open): success closes the circuit, failure opens
+    it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raises CircuitOpenError if the request must not be sent."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError("Spoonacular looks unavailable; not sending requests for now.")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+class ResilientTransport:
+    """
+    Sends requests for RecipeAnalyzer on its `session` with:
+
+    - a timeout on every request (`timeout` is passed to requests: seconds, or a
+      (connect, read) pair);
+    - up to `max_retries` retries of timeouts, connection errors, 429 and 5xx
+      responses, after a full-jitter exponential backoff (a random delay up to
+      `backoff_base` * 2**attempt, capped at `backoff_max`), or after the delay a
+      Retry-After header asks for if that is longer. A Retry-After beyond
+      `max_retry_after` isn't waited for; the response is returned as is;
+    - an optional `rate_limiter` (an AdaptiveRateLimiter) that paces requests and
+      reads the quota headers of each response;
+    - an optional circuit `breaker`.
+
+    Responses that aren't retried, including 4xx errors such as 404, are returned
+    for the caller to handle. When retries run out, the last response is returned,
+    or the last exception raised.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, session, timeout=(3.05, 10), max_retries=3, backoff_base=0.25, backoff_max=8.0,
+                 max_retry_after=30.0, rate_limiter=None, breaker=None):
+        self.session = session
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.requests = 0
+        self.retries = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, increment in increments.items():
+                setattr(self, name, getattr(self, name) + increment)
+
+    def request(self, method, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count(retries=1)
+            if self.rate_limiter is not None and self.rate_limiter.exhausted:
+                raise QuotaExhaustedError("The daily Spoonacular points quota is used up.")
+            if self.breaker is not None:
+                self.breaker.before_request()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            self._count(requests=1)
+
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if isinstance(e, requests.exceptions.Timeout):
+                    self._count(timeouts=1)
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                transient = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                if not transient or attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.observe(response.headers)
+            if self.breaker is not None:
+                # Anything below 500, 429 included, means the API is up.
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > self.max_retry_after:
+                return response
+            time.sleep(max(retry_after or 0.0, self._backoff(attempt)))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    @property
+    def stats(self):
+        stats = {"requests": self.requests, "retries": self.retries, "timeouts": self.timeouts}
+        if self.breaker is not None:
+            stats.update(circuit=self.breaker.state, circuit_opened=self.breaker.opened, rejected=self.breaker.rejected)
+        if self.rate_limiter is not None:
+            stats.update(self.rate_limiter.stats)
+        return stats
@@ -0,0 +1,169 @@
+import re
+from llm.recipe_parser import UNIT_ALIASES, singularize
+
+# Grams per unit of mass.
+MASS_UNITS = {
+    "gram": 1.0,
+    "kilogram": 1000.0,
+    "milligram": 0.001,
+    "ounce": 28.3495,
+    "pound": 453.592,
+}
+
+# Milliliters per unit of volume (US customary). Pinch and dash are the usual
+# 1/16 and 1/8 teaspoon.
+VOLUME_UNITS = {
+    "milliliter": 1.0,
+    "liter": 1000.0,
+    "teaspoon": 4.92892,
+    "tablespoon": 14.7868,
+    "fluid ounce": 29.5735,
+    "cup": 236.588,
+    "pint": 473.176,
+    "quart": 946.353,
+    "gallon": 3785.41,
+    "pinch": 0.308,
+    "dash": 0.616,
+}
+
+# Units that count items or packages rather than measure them.
+COUNT_UNITS = {"piece", "can", "packet", "package", "slice", "stalk", "head", "bunch", "sprig", "stick", "leaf", "clove"}
+
+# Spellings the recipe parser doesn't produce but the LLM or a user might.
+EXTRA_UNIT_ALIASES = {
+    "mg": "milligram", "milligrams": "milligram",
+    "fl oz": "fluid ounce", "fluid ounces": "fluid ounce",
+    "gallon": "gallon", "gallons": "gallon", "gal": "gallon",
+    "piece": "piece", "pieces": "piece", "whole": "piece", "each": "piece",
+}
+
+# Grams per milliliter, as used when measuring the ingredient in a kitchen (flour
+# spooned into a cup, brown sugar packed, herbs chopped), mostly derived from USDA
+# household measures. Matched against the words of the ingredient name ending with
+# its last word, longest phrase first, so "peanut butter" wins over "butter" and
+# "chocolate chip cookie" matches nothing.
+DENSITIES = {
+    "water": 1.0, "broth": 1.0, "stock": 1.0, "milk": 1.03, "buttermilk": 1.04,
+    "cream": 1.01, "heavy cream": 1.01, "sour cream": 0.97, "yogurt": 1.04, "greek yogurt": 1.06,
+    "butter": 0.96, "peanut butter": 1.09, "oil": 0.92, "olive oil": 0.91, "mayonnaise": 0.93,
+    "flour": 0.53, "all purpose flour": 0.53, "whole wheat flour": 0.51, "cornstarch": 0.54,
+    "sugar": 0.85, "granulated sugar": 0.85, "brown sugar": 0.93, "powdered sugar": 0.51,
+    "honey": 1.43, "maple syrup": 1.35, "syrup": 1.37, "molasses": 1.43,
+    "salt": 1.22, "kosher salt": 0.61, "black pepper": 0.47, "baking powder": 0.93, "baking soda": 0.93,
+    "garlic powder": 0.66, "cinnamon": 0.53, "paprika": 0.46, "cumin": 0.42, "thyme": 0.2, "oregano": 0.2,
+    "vanilla extract": 0.85, "vinegar": 1.01, "lemon juice": 1.03, "lime juice": 1.03, "soy sauce": 1.15,
+    "mustard": 1.01, "dijon mustard": 1.01, "ketchup": 1.15, "salsa": 1.08, "sauce": 1.04,
+    "cheese": 0.48, "cheddar cheese": 0.48, "parmesan cheese": 0.42, "oat": 0.34, "granola": 0.51,
+    "cream cheese": 1.0, "cottage cheese": 0.95, "ricotta cheese": 1.03, "ricotta": 1.03, "whipped cream": 0.25,
+    "ice cream": 0.55, "coconut milk": 0.97, "almond milk": 1.03, "almond flour": 0.4, "coconut flour": 0.5,
+    "rice flour": 0.67, "tomato sauce": 1.04, "tomato paste": 1.1, "onion powder": 0.5,
+    "green onion": 0.42, "scallion": 0.42,
+    "rice": 0.78, "lentil": 0.81, "chocolate chip": 0.72, "berry": 0.61, "strawberry": 0.64,
+    "tomato": 0.76, "cherry tomato": 0.63, "onion": 0.68, "lettuce": 0.2, "spinach": 0.13,
+    "parsley": 0.25, "basil": 0.1, "cilantro": 0.07, "dill": 0.04,
+}
+
+# Grams per whole item for ingredients counted by the piece ("2 eggs"), for a
+# medium-sized item with its inedible parts included, as Spoonacular counts them.
+PIECE_WEIGHTS = {
+    "egg": 50, "avocado": 201, "banana": 118, "apple": 182, "lemon": 58, "lime": 67, "orange": 131,
+    "onion": 110, "tomato": 123, "roma tomato": 62, "potato": 213, "carrot": 61, "cucumber": 301,
+    "celery": 40, "celery stalk": 40, "garlic": 3, "garlic clove": 3, "jalapeno": 14, "bell pepper": 119,
+    "chicken breast": 174, "salmon fillet": 170, "tortilla": 45, "flour tortilla": 45, "taco shell": 13,
+    "green onion": 15, "scallion": 15,
+}
+
+# Count units that name a specific portion of particular ingredients.
+PORTION_WEIGHTS = {
+    ("clove", "garlic"): 3, ("stalk", "celery"): 40, ("stick", "butter"): 113,
+    ("slice", "bread"): 32, ("leaf", "lettuce"): 6, ("slice", "cheese"): 21,
+}
+
+def normalize_unit(unit):
+    """Returns the canonical singular name of `unit` ("Tbsp." -> "tablespoon"), or the lowercased input."""
+    unit = " ".join(unit.strip().lower().rstrip(".").split())
+    return UNIT_ALIASES.get(unit) or EXTRA_UNIT_ALIASES.get(unit) or unit
+
+def _lookup(table, name):
+    words = [singularize(word) for word in re.sub(r"[^a-z ]+", " ", name.lower().replace("ñ", "n")).split()]
+    # Only phrases ending with the last word, the food the name is about: the words
+    # before it modify it, so "egg yolk" or "banana pepper" must not be priced as
+    # an egg or a banana. Unknown names fall back to an unconverted basis.
+    for start in range(len(words)):
+        phrase = " ".join(words[start:])
+        if phrase in table:
+            # A leftover word that is a food of its own ("cream" in "sour cream
+            # cheese") means the name may be a different food than the phrase, so
+            # give up rather than borrow its value.
+            if any(word in table for word in words[:start]):
+                return None
+            return table[phrase]
+    return None
+
+class UnitConverter:
+    """
+    Converts ingredient amounts between mass, volume and count units, so every
+    amount of an ingredient can be expressed against one canonical basis (by
+    default 100 g) and its nutrition fetched once and scaled locally.
+
+    Volumes need the ingredient's density and counts its weight per piece; both
+    come from the tables above, which can be extended or replaced.
+    """
+    BASIS_GRAMS = 100
+
+    def __init__(self, densities=DENSITIES, piece_weights=PIECE_WEIGHTS, portion_weights=PORTION_WEIGHTS):
+        self.densities = densities
+        self.piece_weights = piece_weights
+        self.portion_weights = portion_weights
+        # Per count unit, so a lookup only considers foods that come in that portion.
+        self._portions = {}
+        for (portion, food), grams in portion_weights.items():
+            self._portions.setdefault(portion, {})[food] = grams
+
+    def grams(self, name, amount, unit):
+        """Returns the weight of `amount` `unit` of the named ingredient in grams, or None if unknown."""
+        unit = normalize_unit(unit)
+        if unit in MASS_UNITS:
+            return amount * MASS_UNITS[unit]
+        if unit in VOLUME_UNITS:
+            density = _lookup(self.densities, name)
+            return amount * VOLUME_UNITS[unit] * density if density is not None else None
+        if unit == "piece":
+            weight = _lookup(self.piece_weights, name)
+        else:
+            weight = _lookup(self._portions.get(unit, {}), name)
+        return amount * weight if weight is not None else None
+
+    def basis(self, name, amount, unit):
+        """
+        Returns (basis_amount, basis_unit, factor): the amount and unit to look the
+        ingredient up with, and the factor that scales that answer to `amount`
+        `unit`.
+
+        Anything convertible to grams uses BASIS_GRAMS grams. A volume of unknown
+        density falls back to 100 ml and an unknown count unit to one of that unit,
+        which still shares one lookup between all amounts. A unit the converter
+        doesn't recognize is looked up as given.
+        """
+        grams = self.grams(name, amount, unit)
+        if grams is not None:
+            return self.BASIS_GRAMS, "g", grams / self.BASIS_GRAMS
+        normalized = normalize_unit(unit)
+        if normalized in VOLUME_UNITS:
+            return 100, "ml", amount * VOLUME_UNITS[normalized] / 100
+        if normalized in COUNT_UNITS:
+            return 1, normalized, amount
+        return amount, unit, 1.0
+
+def scale_information(info, factor, amount, unit):
+    """
+    Returns a copy of a Spoonacular information response with the cost and every
+    nutrient multiplied by `factor`, relabelled as `amount` `unit`.
+    """
+    scaled = dict(info, amount=amount, unit=unit)
+    if "estimatedCost" in info:
+        scaled["estimatedCost"] = dict(info["estimatedCost"], value=info["estimatedCost"].get("value", 0) * factor)
+    if "nutrition" in info:
+        nutrients = [dict(n, amount=n.get("amount", 0) * factor) for n in info["nutrition"].get("nutrients", [])]
+        scaled["nutrition"] = dict(info["nutrition"], nutrients=nutrients)
+    return scaled
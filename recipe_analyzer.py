@@ -1,30 +1,167 @@
 import requests
+import tracing
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from nutrition.aggregate import NutrientVocabulary, RecipeNutrition
+from nutrition.cache import IngredientCache
+from nutrition.local_db import LocalNutritionDB
+from nutrition.resolver import IngredientResolver
+from nutrition.single_flight import SingleFlight
+from nutrition.transport import CircuitBreaker, ResilientTransport
+from nutrition.rate_limit import AdaptiveRateLimiter
+from nutrition.units import UnitConverter, scale_information
+
+# Stands in for a line parseIngredients answered no entry for, in single-flight results.
+_UNMATCHED = object()
+
+class IngredientLookupError(requests.exceptions.RequestException):
+    """Raised when the API failed to answer for an ingredient, so the recipe's totals would be incomplete."""
 
 class RecipeAnalyzer:
     """
     Calculates nutritional values and price for a recipe by fetching data from the
     Spoonacular API.
     """
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_path="spoonacular_cache.db", cache_ttl=7 * 24 * 3600, cache_max_entries=10000,
+                 max_workers=1, requests_per_second=None, api_root="https://api.spoonacular.com", local_db_path=None,
+                 fuzzy_threshold=None, normalize_units=False,
+                 single_flight=True, bulk=False, timeout=(3.05, 10), max_retries=3, breaker_threshold=5,
+                 breaker_reset=30.0, quota_reserve=None):
         """
         Initializes the RecipeAnalyzer with a Spoonacular API key.
+
+        Lookups are cached on disk at `cache_path` (pass None to disable caching),
+        with entries expiring after `cache_ttl` seconds and at most
+        `cache_max_entries` rows kept.
+
+        With `max_workers` > 1, ingredients are resolved concurrently on a bounded
+        thread pool. `api_root` allows pointing the analyzer at a different server,
+        such as a local mock.
+
+        Requests go through a ResilientTransport: each has a `timeout` (seconds,
+        or a (connect, read) pair), timeouts, connection errors, 429 and 5xx
+        responses are retried up to `max_retries` times with jittered backoff
+        (honoring Retry-After), and after `breaker_threshold` consecutive failures
+        a circuit breaker fails requests fast for `breaker_reset` seconds (None
+        disables it). An AdaptiveRateLimiter caps requests at
+        `requests_per_second` (None means unlimited) and fails fast once
+        Spoonacular reports the daily points quota used up; with `quota_reserve`
+        set it also spreads the last share of the quota over the rest of the day.
+        A request that still fails (including while the breaker is open or the
+        quota is used up) fails the whole analysis with an IngredientLookupError,
+        rather than leaving the ingredient out of the totals.
+
+        `local_db_path` names an offline LocalNutritionDB that is consulted before
+        the API; only ingredients it doesn't know go over the network.
+
+        With `fuzzy_threshold` set (0-1, e.g. 0.8), ingredient names are first
+        matched against names already resolved (from the cache, the local database
+        and earlier searches) by an IngredientResolver, and only names with no
+        close enough match are searched for.
+
+        With `normalize_units`, nutrition is fetched once per ingredient at a
+        canonical basis (100 g where a UnitConverter can convert the unit) and
+        scaled locally, so "1 cup butter" and "2 tablespoons butter" share one
+        lookup. Conversions use typical densities and piece weights, so totals can
+        differ slightly from Spoonacular's own conversion of the exact amount.
+
+        With `single_flight` (the default), concurrent lookups of the same key, from
+        overlapping analyses on other threads, share one request and its result or
+        error instead of each going to the API.
+
+        With `bulk`, a recipe is resolved through Spoonacular's parseIngredients
+        endpoint instead: every ingredient line the cache and local database can't
+        answer goes out in a single request, rather than one search and one
+        information request per ingredient. With single_flight, lines another
+        analysis is already fetching are left out of that request and shared. A
+        line the response has no entry for is looked up on its own instead. The
+        fuzzy resolver doesn't apply in bulk mode, since Spoonacular matches the
+        names itself.
         """
         if not api_key:
             raise ValueError("API key cannot be empty.")
         self.api_key = api_key
-        self.base_url = "https://api.spoonacular.com/food/ingredients"
+        self.base_url = f"{api_root}/food/ingredients"
+        self.parse_url = f"{api_root}/recipes/parseIngredients"
+        self.bulk = bulk
         self.session = requests.Session()
+        self.max_workers = max_workers
+        self.rate_limiter = AdaptiveRateLimiter(requests_per_second, quota_reserve=quota_reserve)
+        self._executor = None
+        if max_workers > 1:
+            # Let the session keep one pooled connection per worker.
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        breaker = CircuitBreaker(breaker_threshold, breaker_reset) if breaker_threshold else None
+        self.transport = ResilientTransport(self.session, timeout=timeout, max_retries=max_retries,
+                                            rate_limiter=self.rate_limiter, breaker=breaker)
+        self.cache = IngredientCache(cache_path, ttl=cache_ttl, max_entries=cache_max_entries) if cache_path else None
+        self.local_db = LocalNutritionDB(local_db_path) if local_db_path else None
+        # Shared by every analysis, so totals from different recipes line up column for column.
+        self.nutrient_vocabulary = NutrientVocabulary()
+        self.resolver = None
+        if fuzzy_threshold:
+            self.resolver = IngredientResolver(fuzzy_threshold)
+            if self.cache is not None:
+                self.resolver.add_many(self.cache.items("id:"))
+            if self.local_db is not None:
+                self.resolver.add_many(self.local_db.names())
+        self.unit_converter = UnitConverter() if normalize_units else None
+        self.flights = SingleFlight() if single_flight else None
+
+    @property
+    def cache_stats(self):
+        """Hit/miss counters of the lookup cache (all zero when caching is disabled)."""
+        if self.cache is None:
+            return {"hits": 0, "misses": 0, "entries": 0}
+        return self.cache.stats
+
+    def _cached(self, key, fetch):
+        """
+        Returns the cached value for `key`, calling `fetch()` and caching its result
+        on a miss. "Not found" results (None) are cached too.
+        """
+        if self.flights is None:
+            return self._load(key, fetch)
+        # The cache read is part of the shared call, so a caller arriving just after
+        # a call finished still finds its result in the cache instead of fetching.
+        return self.flights.do(key, lambda: self._load(key, fetch))
+
+    def _load(self, key, fetch):
+        if self.cache is None:
+            return fetch()
+        value = self.cache.get(key)
+        if value is IngredientCache.MISS:
+            value = fetch()
+            self.cache.set(key, value)
+        return value
 
     def _get_ingredient_id(self, ingredient_name):
         """
         Searches for an ingredient by name to find its Spoonacular ID.
         """
+        key = f"id:{ingredient_name.strip().lower()}"
+        with tracing.span("RecipeAnalyzer._get_ingredient_id", ingredient=ingredient_name):
+            if self.resolver is not None:
+                ingredient_id = self.resolver.resolve(ingredient_name)
+                if ingredient_id is not None:
+                    return ingredient_id
+            ingredient_id = self._cached(key, lambda: self._fetch_ingredient_id(ingredient_name))
+            if self.resolver is not None and ingredient_id is not None:
+                self.resolver.add(ingredient_name, ingredient_id)
+            return ingredient_id
+
+    def _fetch_ingredient_id(self, ingredient_name):
+        """
+        Queries the Spoonacular search endpoint for an ingredient's ID.
+        """
         search_url = f"{self.base_url}/search"
         params = {"apiKey": self.api_key, "query": ingredient_name}
-        
         # The response from this GET request will contain a list of possible
         # matches. We assume the first result is the most relevant.
-        response = self.session.get(search_url, params=params)
+        response = self.transport.get(search_url, params=params)
         response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
         data = response.json()
         
@@ -39,84 +176,235 @@ class RecipeAnalyzer:
         """
         Retrieves detailed nutritional and cost info for a specific ingredient ID.
         """
+        key = f"info:{ingredient_id}:{amount}:{unit.strip().lower()}"
+        with tracing.span("RecipeAnalyzer._get_ingredient_info", id=ingredient_id, amount=amount, unit=unit):
+            return self._cached(key, lambda: self._fetch_ingredient_info(ingredient_id, amount, unit))
+
+    def _fetch_ingredient_info(self, ingredient_id, amount, unit):
+        """
+        Queries the Spoonacular information endpoint for an ingredient ID.
+        """
         info_url = f"{self.base_url}/{ingredient_id}/information"
         params = {"apiKey": self.api_key, "amount": amount, "unit": unit}
-        response = self.session.get(info_url, params=params)
+        response = self.transport.get(info_url, params=params)
+        # An unknown ID is a definitive "not found", so return None (which gets
+        # cached) rather than raising like other HTTP errors.
+        if response.status_code == 404:
+            return None
         response.raise_for_status()
         return response.json()
 
+    def _is_analyzable(self, item):
+        """Returns False (after saying why) for items that can't be looked up."""
+        # Skip items with no valid quantity, as they cannot be analyzed.
+        if item.get('quantity', 0) <= 0:
+            print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' due to zero or invalid quantity.")
+            return False
+
+        # Skip items with no valid unit, as they cannot be analyzed.
+        if not item.get('unit'):
+            print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' due to missing unit.")
+            return False
+        return True
+
+    def _lookup_amount(self, item):
+        """
+        Returns (amount, unit, factor): what to ask the API for, and the factor
+        that scales its answer to the item's own amount (None if no scaling is
+        needed).
+        """
+        if self.unit_converter is None:
+            return item['quantity'], item['unit'], None
+        return self.unit_converter.basis(item['ingredient'], item['quantity'], item['unit'])
+
+    def _resolve_ingredient(self, item):
+        """
+        Looks up the nutritional and cost data for one parsed ingredient. Returns
+        None if the ingredient has to be skipped, and raises IngredientLookupError
+        if the API failed to answer.
+        """
+        if not self._is_analyzable(item):
+            return None
+
+        if self.local_db is not None:
+            info_data = self.local_db.lookup(item['ingredient'], item['quantity'], item['unit'])
+            if info_data:
+                return info_data
+
+        try:
+            # Step 1: Get the unique ID for the ingredient.
+            ingredient_id = self._get_ingredient_id(item['ingredient'])
+            if not ingredient_id:
+                print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' unable to find ID.")
+                return None  # Skip if no ID was found.
+
+            # Step 2: Use the ID to get detailed nutritional and cost data.
+            amount, unit, factor = self._lookup_amount(item)
+            info_data = self._get_ingredient_info(ingredient_id, amount, unit)
+            if info_data and factor is not None:
+                info_data = scale_information(info_data, factor, item['quantity'], item['unit'])
+            if not info_data:
+                print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' unable to find data.")
+                return None # Skip if no data found
+            return info_data
+
+        except requests.exceptions.RequestException as e:
+            # Retries are behind us, so dropping the ingredient would pass off
+            # partial totals as the recipe's; fail the analysis instead.
+            raise IngredientLookupError(f"Could not look up '{item.get('ingredient', 'unknown item')}': {e}") from e
+
+    def _resolve_bulk(self, llm_parsed_list):
+        """
+        Looks up every item of a recipe at once and returns one information dict
+        (or None, if the item has to be skipped) per item. Lines answered by the
+        local database or the cache are not sent; the rest go to the
+        parseIngredients endpoint in a single request, and any the response has no
+        entry for are resolved one by one.
+        """
+        resolved = [None] * len(llm_parsed_list)
+        # Ingredient line -> [(item index, scale factor)], so repeated lines are sent once.
+        wanted = {}
+        for i, item in enumerate(llm_parsed_list):
+            if not self._is_analyzable(item):
+                continue
+            if self.local_db is not None:
+                resolved[i] = self.local_db.lookup(item['ingredient'], item['quantity'], item['unit'])
+                if resolved[i]:
+                    continue
+            amount, unit, factor = self._lookup_amount(item)
+            wanted.setdefault(f"{amount} {unit} {item['ingredient']}", []).append((i, factor))
+
+        answers, errors = self._parsed_lines(list(wanted))
+        if errors:
+            error = next(iter(errors.values()))
+            if not isinstance(error, requests.exceptions.RequestException):
+                raise error
+            raise IngredientLookupError(f"Could not look up {len(errors)} ingredients: {error}") from error
+
+        for line, uses in wanted.items():
+            if line not in answers and line not in errors:
+                for i, _ in uses:
+                    resolved[i] = self._resolve_ingredient(llm_parsed_list[i])
+                continue
+            info_data = answers.get(line)
+            for i, factor in uses:
+                item = llm_parsed_list[i]
+                if not info_data:
+                    if line in answers:
+                        print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' unable to find data.")
+                    continue
+                resolved[i] = info_data if factor is None else scale_information(info_data, factor, item['quantity'], item['unit'])
+        return resolved
+
+    def _parsed_lines(self, lines):
+        """
+        Returns ({line: information dict or None}, {line: exception}) for ingredient
+        lines, from the cache or one parseIngredients request; lines the response
+        had no entry for are in neither. With single_flight, lines another analysis
+        is already fetching are waited for rather than sent again.
+        """
+        if self.flights is None:
+            try:
+                return self._load_parsed_lines(lines), {}
+            except Exception as e:
+                return {}, dict.fromkeys(lines, e)
+        keys = {f"parse:{line}": line for line in lines}
+
+        def load(claimed):
+            # As in _cached, the cache read is part of the shared call.
+            loaded = self._load_parsed_lines([keys[key] for key in claimed])
+            return {key: loaded.get(keys[key], _UNMATCHED) for key in claimed}
+
+        results, errors = self.flights.do_many(list(keys), load)
+        return ({keys[key]: value for key, value in results.items() if value is not _UNMATCHED},
+                {keys[key]: error for key, error in errors.items()})
+
+    def _load_parsed_lines(self, lines):
+        answers = {}
+        for line in lines:
+            value = self.cache.get(f"parse:{line.strip().lower()}") if self.cache is not None else IngredientCache.MISS
+            if value is not IngredientCache.MISS:
+                answers[line] = value
+        missing = [line for line in lines if line not in answers]
+        if missing:
+            with tracing.span("RecipeAnalyzer._fetch_parsed_ingredients", lines=len(missing)):
+                fetched = self._fetch_parsed_ingredients(missing)
+            if self.cache is not None:
+                for line, value in fetched.items():
+                    self.cache.set(f"parse:{line.strip().lower()}", value)
+            answers.update(fetched)
+        return answers
+
+    def _fetch_parsed_ingredients(self, lines):
+        """
+        Sends ingredient lines ("2 cup milk") to Spoonacular's parseIngredients
+        endpoint with nutrition included. Returns {line: information dict, or None
+        if Spoonacular couldn't identify it}, leaving out lines the response has no
+        entry for.
+        """
+        params = {"apiKey": self.api_key}
+        data = {"ingredientList": "\n".join(lines), "servings": 1, "includeNutrition": "true"}
+        response = self.transport.post(self.parse_url, params=params, data=data)
+        response.raise_for_status()
+        # Entries are matched to lines by the line they echo back rather than by
+        # position, so a dropped or reordered entry can't pair a line with another
+        # ingredient's nutrition. An unidentified line comes back without an ID or
+        # nutrition.
+        entries = {}
+        for parsed in response.json():
+            original = parsed.get("original")
+            if isinstance(original, str):
+                entries.setdefault(" ".join(original.lower().split()), parsed)
+        results = {}
+        for line in lines:
+            parsed = entries.get(" ".join(line.lower().split()))
+            if parsed is None:
+                print(f"Warning: no parseIngredients entry for '{line}'; looking it up on its own.")
+                continue
+            results[line] = parsed if parsed.get("id") and "nutrition" in parsed else None
+        return results
+
+    def resolve_ingredients(self, llm_parsed_list):
+        """
+        Looks up every parsed ingredient and returns one information dict (or None,
+        if the item was skipped) per item, in order. Raises IngredientLookupError
+        if the API failed to answer for any of them.
+        """
+        # The lookups are independent, so they can run concurrently. Results are
+        # still returned in recipe order, which keeps the totals identical to the
+        # sequential path.
+        if self.bulk:
+            return self._resolve_bulk(llm_parsed_list)
+        if self._executor is not None:
+            return list(self._executor.map(self._resolve_ingredient, llm_parsed_list))
+        return [self._resolve_ingredient(item) for item in llm_parsed_list]
+
+    @tracing.traced("RecipeAnalyzer.analyze_recipe")
     def analyze_recipe(self, llm_parsed_list):
         """
         Analyzes a full recipe for total nutrition and price by looking up each
         ingredient provided in a list of parsed ingredient dictionaries.
         """
-        # Data structures to aggregate results across all ingredients.
-        summary_nutrients = {"Calories": 0.0, "Protein": 0.0, "Fat": 0.0, "Carbohydrates": 0.0}
-        all_nutrients = {}
-        total_price_cents = 0
+        return self.recipe_nutrition(llm_parsed_list).format()
 
+    def recipe_nutrition(self, llm_parsed_list):
+        """
+        Like `analyze_recipe`, but returns the totals as a RecipeNutrition (numbers
+        that can still be added, scaled per serving or compared) instead of display
+        strings.
+        """
         print("--- Analyzing Recipe Nutrition & Price ---")
-        for item in llm_parsed_list:
-            # Skip items with no valid quantity, as they cannot be analyzed.
-            if item.get('quantity', 0) <= 0:
-                print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' due to zero or invalid quantity.")
-                continue
+        resolved = self.resolve_ingredients(llm_parsed_list)
 
-            # Skip items with no valid unit, as they cannot be analyzed.
-            if not item.get('unit'):
-                print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' due to missing unit.")
-                continue
-            
-            try:
-                # Step 1: Get the unique ID for the ingredient.
-                ingredient_id = self._get_ingredient_id(item['ingredient'])
-                if not ingredient_id:
-                    print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' unable to find ID.")
-                    continue  # Skip if no ID was found.
-
-                # Step 2: Use the ID to get detailed nutritional and cost data.
-                info_data = self._get_ingredient_info(ingredient_id, item['quantity'], item['unit'])
-                if not info_data:
-                    print(f"Skipping ingredient '{item.get('ingredient', 'unknown')}' unable to find data.")
-                    continue # Skip if no data found
-
-                print(f"Successfully processed: {item['ingredient']}")
-                
-                # Accumulate the total cost. The API returns this value in cents.
-                total_price_cents += info_data.get("estimatedCost", {}).get("value", 0)
-
-                # Process and aggregate the nutritional data.
-                if "nutrition" in info_data and "nutrients" in info_data["nutrition"]:
-                    for nutrient in info_data["nutrition"]["nutrients"]:
-                        name, amount, unit = nutrient.get("name"), nutrient.get("amount", 0), nutrient.get("unit", "")
-                        
-                        # Add to the high-level summary if it's a tracked nutrient.
-                        if name in summary_nutrients:
-                            summary_nutrients[name] += amount
-                        
-                        # Add to the comprehensive nutrient dictionary.
-                        if name in all_nutrients:
-                            all_nutrients[name]["amount"] += amount
-                        else:
-                            all_nutrients[name] = {"amount": amount, "unit": unit}
-            
-            except requests.exceptions.RequestException as e:
-                # Handle network or API errors gracefully.
-                print(f"Error processing '{item.get('ingredient', 'unknown item')}': {e}")
+        infos = []
+        for item, info_data in zip(llm_parsed_list, resolved):
+            if info_data is None:
                 continue
-        
+            print(f"Successfully processed: {item['ingredient']}")
+            infos.append(info_data)
+
+        # Sum the cost (in cents) and every nutrient as one ingredient x nutrient
+        # matrix; the strings are only produced by format() at display time.
+        nutrition = RecipeNutrition.from_infos(infos, self.nutrient_vocabulary)
         print("--- Analysis Complete ---")
-        
-        # Format the final results
-        formatted_summary = {name: f"{round(amount)}" for name, amount in summary_nutrients.items()}
-        formatted_price = f"${total_price_cents / 100:.2f}"
-        full_data_formatted = {
-            name: f"{round(data['amount'], 2)} {data['unit']}" 
-            for name, data in sorted(all_nutrients.items())
-        }
-        
-        return {
-            "summary": formatted_summary,
-            "price": formatted_price,
-            "full_data": full_data_formatted
-        }
\ No newline at end of file
+        return nutrition
\ No newline at end of file
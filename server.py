@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm.parse_cache import CachedParser
+from llm.scheduler import MicroBatchScheduler
+from recipe_analyzer import RecipeAnalyzer
+
+class QueueFullError(Exception):
+    """Raised when the analysis queue has no room for another request."""
+
+class AnalysisService:
+    """
+    Runs recipe analyses for concurrent clients. Parse workers take requests from a
+    queue and share one model through a MicroBatchScheduler, which merges their
+    prompts into batched `generate` calls; each parsed recipe is then handed to a
+    separate pool for the nutrition lookups, so the workers move on to the next
+    request while the network calls run.
+
+    At most `queue_size` requests are in flight at once, counted from `submit` until
+    their analysis finishes in either stage; beyond that `submit` refuses new ones.
+    """
+    def __init__(self, llm_factory, analyzer, queue_size=32, nutrition_workers=4, fast_path=True,
+                 max_batch_size=8, max_wait_ms=10):
+        self.llm_factory = llm_factory
+        self.analyzer = analyzer
+        self.fast_path = fast_path
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.scheduler = None
+        self.parser = None
+        self.load_error = None
+        self.model_ready = threading.Event()
+        self._loaded = threading.Event()
+        self.queue_size = queue_size
+        # Requests accepted and not yet finished, in the queue or in either stage.
+        self._in_flight = 0
+        self._jobs = queue.Queue()
+        self._nutrition_pool = ThreadPoolExecutor(max_workers=nutrition_workers)
+        self._metrics_lock = threading.Lock()
+        self._latencies = []
+        self.counters = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def start(self):
+        """Loads the model in the background and starts the parse workers."""
+        threading.Thread(target=self._load_model, daemon=True).start()
+        # One worker per batch slot, so the scheduler can fill a whole batch.
+        for _ in range(self.max_batch_size):
+            threading.Thread(target=self._parse_worker, daemon=True).start()
+        return self
+
+    def submit(self, recipe_text):
+        """
+        Queues a recipe and returns a Future for its analysis. Raises QueueFullError
+        instead of blocking when `queue_size` requests are already in flight, so
+        callers can push back.
+        """
+        with self._metrics_lock:
+            if self._in_flight >= self.queue_size:
+                self.counters["rejected"] += 1
+                raise QueueFullError("The analysis queue is full.")
+            self._in_flight += 1
+            self.counters["accepted"] += 1
+        future = Future()
+        self._jobs.put((recipe_text, future, time.perf_counter()))
+        return future
+
+    def _load_model(self):
+        try:
+            self.scheduler = MicroBatchScheduler(self.llm_factory(), max_batch_size=self.max_batch_size,
+                                                 max_wait_ms=self.max_wait_ms)
+            self.parser = CachedParser(self.scheduler, fast_path=self.fast_path)
+            self.model_ready.set()
+        except Exception as e:
+            self.load_error = e
+            print(f"Error: the model failed to load: {e}")
+        finally:
+            self._loaded.set()
+
+    def _parse_worker(self):
+        # Requests queued while the model loads wait here rather than failing.
+        self._loaded.wait()
+        while True:
+            recipe_text, future, queued_at = self._jobs.get()
+            if self.load_error is not None:
+                self._finish(future, queued_at, error=RuntimeError(f"The model failed to load: {self.load_error}"))
+                continue
+            try:
+                recipe_json = self.parser.parse(recipe_text)
+            except Exception as e:
+                self._finish(future, queued_at, error=e)
+                continue
+            if not isinstance(recipe_json, list):
+                self._finish(future, queued_at, error=ValueError("The model did not return an ingredient list."))
+                continue
+            self._nutrition_pool.submit(self._analyze, recipe_json, future, queued_at)
+
+    def _analyze(self, recipe_json, future, queued_at):
+        try:
+            result = self.analyzer.analyze_recipe(recipe_json)
+            result["ingredients"] = recipe_json
+            self._finish(future, queued_at, result=result)
+        except Exception as e:
+            self._finish(future, queued_at, error=e)
+
+    def _finish(self, future, queued_at, result=None, error=None):
+        with self._metrics_lock:
+            self._latencies.append(time.perf_counter() - queued_at)
+            # Keep a bounded window of recent latencies for the percentiles.
+            del self._latencies[:-1000]
+            self.counters["failed" if error else "completed"] += 1
+            self._in_flight -= 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def health(self):
+        if self.load_error is not None:
+            return {"status": "error", "error": str(self.load_error)}
+        return {"status": "ok" if self.model_ready.is_set() else "loading"}
+
+    def metrics(self):
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self.counters)
+            in_flight = self._in_flight
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4) if latencies else None
+
+        batches = self.scheduler.batches if self.scheduler else 0
+
+        return {
+            **counters,
+            "queue_depth": in_flight,
+            "queue_capacity": self.queue_size,
+            "latency_p50_s": percentile(0.50),
+            "latency_p95_s": percentile(0.95),
+            "llm_batches": batches,
+            "llm_mean_batch_size": round(self.scheduler.batched_prompts / batches, 2) if batches else None,
+            "parse_cache": self.parser.cache.stats if self.parser else None,
+            "nutrition_cache": self.analyzer.cache_stats,
+        }
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Serves POST /analyze, GET /health and GET /metrics."""
+    def do_GET(self):
+        if self.path == "/health":
+            health = self.server.service.health()
+            self._send_json(200 if health["status"] == "ok" else 503, health)
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.service.metrics())
+        else:
+            self._send_json(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if self.path != "/analyze":
+            self._send_json(404, {"error": "Not found."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            recipe_text = body["recipe"].replace("\r", "").strip()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_json(400, {"error": 'Expected a JSON body like {"recipe": "..."}.'})
+            return
+        if not recipe_text:
+            self._send_json(400, {"error": "Please enter a recipe."})
+            return
+
+        try:
+            future = self.server.service.submit(recipe_text)
+        except QueueFullError as e:
+            self._send_json(429, {"error": str(e)}, headers={"Retry-After": "1"})
+            return
+        try:
+            self._send_json(200, future.result(timeout=self.server.request_timeout))
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "The analysis timed out."})
+        except Exception as e:
+            self._send_json(500, {"error": f"An error occurred: {e}"})
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class AnalysisServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, request_timeout=300):
+        super().__init__(address, AnalysisRequestHandler)
+        self.service = service
+        self.request_timeout = request_timeout
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Sous-Chef.ai as a headless HTTP analysis service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--queue-size", type=int, default=32, help="Requests in flight beyond this get a 429.")
+    parser.add_argument("--nutrition-workers", type=int, default=4)
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Most prompts merged into one generate call.")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="How long a prompt waits for others to batch with.")
+    parser.add_argument("--api-key", default=os.environ.get("SPOONACULAR_API_KEY"))
+    parser.add_argument("--api-root", default="https://api.spoonacular.com")
+    parser.add_argument("--stub-llm", action="store_true", help="Use the weight-free stub LLM (for local testing).")
+    args = parser.parse_args()
+
+    if args.stub_llm:
+        from llm.stub import StubLLM
+        llm_factory = StubLLM
+    else:
+        def llm_factory():
+            from llm import LLM
+            return LLM.Gemma_2B_LLM()
+
+    analyzer = RecipeAnalyzer(api_key=args.api_key, api_root=args.api_root)
+    service = AnalysisService(llm_factory, analyzer, queue_size=args.queue_size,
+                              nutrition_workers=args.nutrition_workers, max_batch_size=args.max_batch_size,
+                              max_wait_ms=args.max_wait_ms).start()
+    server = AnalysisServer((args.host, args.port), service)
+    print(f"Sous-Chef.ai service listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
+import argparse
 import os
 import json
 import time
 from pathlib import Path
 from datetime import datetime
 
-import matplotlib.pyplot as plt
 import numpy as np
-import torch
-from llm import LLM, recipe_parser as rp
+from llm import recipe_parser as rp
+from llm.parse_cache import make_key
 
 def ingredient_to_tuple(ingredient):
     """
@@ -82,6 +82,28 @@ def process_single_recipe(llm, recipe_file, gt_path, out_path):
     response = llm.run(prompt)
     elapsed = time.time() - start_time
 
+    return (*score_response(response, gt_path, out_path), elapsed)
+
+def process_recipe_batch(llm, recipe_files, batch_size):
+    """
+    Runs LLM inference for several recipe files through batched `generate` calls.
+    Returns the responses and the average inference time per recipe.
+    """
+    prompts = []
+    for recipe_file in recipe_files:
+        with open(recipe_file, "r", encoding="utf-8") as f:
+            prompts.append(rp.pre_process_input(f.read()))
+
+    start_time = time.time()
+    responses = llm.run_batch(prompts, batch_size=batch_size)
+    elapsed = time.time() - start_time
+
+    return responses, elapsed / len(prompts)
+
+def score_response(response, gt_path, out_path):
+    """
+    Extracts the JSON from a model response, saves it, and scores it against the ground truth.
+    """
     # Extract the JSON object from the model's text output.
     pred_json = rp.extract_json_from_output(response)
 
@@ -89,6 +111,13 @@ def process_single_recipe(llm, recipe_file, gt_path, out_path):
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(pred_json, f, indent=2)
 
+    return score_prediction(pred_json, gt_path)
+
+def score_prediction(pred_json, gt_path):
+    """
+    Scores a parsed ingredient list against a ground-truth JSON file. Returns
+    precision, recall, F1, name-only F1, quantity accuracy and unit accuracy.
+    """
     # Load ground truth and predictions into standardized sets for comparison.
     gt_ings = load_ingredients_from_json(gt_path)
     pred_ings = {ingredient_to_tuple(ing) for ing in pred_json if "ingredient" in ing}
@@ -119,11 +148,37 @@ def process_single_recipe(llm, recipe_file, gt_path, out_path):
     qty_acc = qty_correct / len(common_names) if common_names else 0.0
     unit_acc = unit_correct / len(common_names) if common_names else 0.0
 
-    return p, r, f1, name_f1, qty_acc, unit_acc, elapsed
+    return p, r, f1, name_f1, qty_acc, unit_acc
 
-def evaluate_model(model_class, model_name):
+def load_manifest(manifest_path):
+    """
+    Loads the manifest recording which settings produced each stored output, as
+    {file_index: {"key": ..., "elapsed": ...}}. A missing or unreadable manifest is empty.
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest_path, manifest):
+    # Write to a temporary file first so an interrupted run never leaves a torn manifest.
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def evaluate_model(model_class, model_name, batch_size=1, incremental=False):
     """
     Runs the full evaluation pipeline for a single model across all test recipes.
+    With `batch_size` > 1, recipes are run through the model in batches, and the
+    reported time is the batch time divided evenly across its recipes.
+
+    With `incremental`, a recipe whose stored output was produced from the same
+    prompt, model and generation settings (tracked in `manifest.json` next to the
+    outputs) is re-scored from that output instead of being run again, and the model
+    is only loaded if some recipe needs inference. The manifest is updated after each
+    recipe, so an interrupted run resumes where it stopped.
     """
     print(f"Evaluating {model_name}...")
 
@@ -150,13 +205,17 @@ def evaluate_model(model_class, model_name):
     metrics = {
         "precision": 0.0, "recall": 0.0, "f1": 0.0,
         "name_f1": 0.0, "qty_accuracy": 0.0, "unit_accuracy": 0.0,
-        "time": 0.0, "count": 0
+        "time": 0.0, "count": 0, "skipped": 0
     }
 
-    # Instantiate the LLM. This might load the model into memory/VRAM.
-    llm = model_class()
+    # The same key CachedParser uses: prompt (so template changes count), model and
+    # generation settings.
+    generation_kwargs = dict(model_class.generation_kwargs, constrained=getattr(model_class, "constrained", False))
+    manifest_path = parsed_output_dir / "manifest.json"
+    manifest = load_manifest(manifest_path) if incremental else {}
 
-    # Loop through each recipe file for processing.
+    # Pair each recipe with its ground-truth file, output path and manifest key.
+    jobs = []
     for recipe_file in recipe_files:
         # Extract the unique index from the filename to find the matching ground-truth file.
         file_index = recipe_file.stem.split("_")[-1]
@@ -167,24 +226,78 @@ def evaluate_model(model_class, model_name):
         if not gt_path.exists():
             print(f"Missing ground truth for recipe {file_index}, skipping.")
             continue
-
-        try:
-            # Process the recipe and get the metrics.
-            p, r, f1, name_f1, qty_acc, unit_acc, elapsed = process_single_recipe(llm, recipe_file, gt_path, out_path)
-            
-            # Add the results for this recipe to the aggregate totals.
-            metrics["precision"] += p
-            metrics["recall"] += r
-            metrics["f1"] += f1
-            metrics["name_f1"] += name_f1
-            metrics["qty_accuracy"] += qty_acc
-            metrics["unit_accuracy"] += unit_acc
-            metrics["time"] += elapsed
-            metrics["count"] += 1
+        with open(recipe_file, "r", encoding="utf-8") as f:
+            key = make_key(rp.pre_process_input(f.read()), model_class.model_id, generation_kwargs)
+        jobs.append((file_index, recipe_file, gt_path, out_path, key))
+
+    def record(file_index, scores, reused=False):
+        # Add the results for this recipe to the aggregate totals.
+        p, r, f1, name_f1, qty_acc, unit_acc, elapsed = scores
+        metrics["precision"] += p
+        metrics["recall"] += r
+        metrics["f1"] += f1
+        metrics["name_f1"] += name_f1
+        metrics["qty_accuracy"] += qty_acc
+        metrics["unit_accuracy"] += unit_acc
+        metrics["time"] += elapsed
+        metrics["count"] += 1
+        if reused:
+            metrics["skipped"] += 1
+            print(f"  Reused stored output for recipe {file_index}")
+        else:
             print(f"  Processed recipe {file_index} in {elapsed:.2f}s")
-        except Exception as e:
-            # Catch potential errors during processing of a single file to allow the script to continue.
-            print(f"  Failed on recipe {file_index}: {e}")
+
+    def remember(file_index, key, elapsed):
+        # Record the output just written so later runs can reuse it.
+        if incremental:
+            manifest[file_index] = {"key": key, "elapsed": elapsed}
+            save_manifest(manifest_path, manifest)
+
+    pending = []
+    for job in jobs:
+        file_index, _, gt_path, out_path, key = job
+        entry = manifest.get(file_index)
+        if entry and entry["key"] == key and out_path.exists():
+            try:
+                with open(out_path, "r", encoding="utf-8") as f:
+                    pred_json = json.load(f)
+                # Metrics are cheap, so they are recomputed; the stored time is kept.
+                record(file_index, (*score_prediction(pred_json, gt_path), entry["elapsed"]), reused=True)
+                continue
+            except Exception as e:
+                print(f"  Could not reuse the output for recipe {file_index}, re-running: {e}")
+        pending.append(job)
+
+    # Instantiate the LLM only if something needs inference. This might load the
+    # model into memory/VRAM.
+    llm = model_class() if pending else None
+
+    if batch_size > 1:
+        # Run the recipes through the model a batch at a time.
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                responses, elapsed = process_recipe_batch(llm, [job[1] for job in batch], batch_size)
+            except Exception as e:
+                print(f"  Failed on batch starting at recipe {batch[0][0]}: {e}")
+                continue
+            for (file_index, _, gt_path, out_path, key), response in zip(batch, responses):
+                try:
+                    record(file_index, (*score_response(response, gt_path, out_path), elapsed))
+                    remember(file_index, key, elapsed)
+                except Exception as e:
+                    print(f"  Failed on recipe {file_index}: {e}")
+    else:
+        # Loop through each recipe file for processing.
+        for file_index, recipe_file, gt_path, out_path, key in pending:
+            try:
+                # Process the recipe and get the metrics.
+                scores = process_single_recipe(llm, recipe_file, gt_path, out_path)
+                record(file_index, scores)
+                remember(file_index, key, scores[-1])
+            except Exception as e:
+                # Catch potential errors during processing of a single file to allow the script to continue.
+                print(f"  Failed on recipe {file_index}: {e}")
 
     # After processing all recipes, calculate the average for each metric.
     count = metrics["count"]
@@ -201,6 +314,8 @@ def evaluate_model(model_class, model_name):
         print(f"Qty Accuracy:  {metrics['qty_accuracy']:.4f}")
         print(f"Unit Accuracy: {metrics['unit_accuracy']:.4f}")
         print(f"Avg Time:      {metrics['time']:.2f} sec")
+        if incremental:
+            print(f"Skipped inferences: {metrics['skipped']} of {count} (reused stored outputs)")
     else:
         print(f"No recipes were evaluated successfully for {model_name}.")
 
@@ -218,6 +333,8 @@ def visualize_results(results):
         print("No results to visualize.")
         return
 
+    import matplotlib.pyplot as plt
+
     output_dir = Path("plots")
     output_dir.mkdir(exist_ok=True)
     
@@ -298,6 +415,17 @@ def visualize_results(results):
     plt.show()
 
 def main():
+    # The model stack is imported here so the scoring helpers above can be used
+    # (e.g. by the benchmarks) without torch installed.
+    import torch
+    from llm import LLM
+
+    parser = argparse.ArgumentParser(description="Evaluate the recipe-parsing LLMs against the test set.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Number of recipes per generate call.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse stored outputs whose prompt and model settings are unchanged.")
+    args = parser.parse_args()
+
     # A dictionary mapping model names to their corresponding class constructors.
     # This makes it easy to add or remove models from the evaluation.
     models_to_evaluate = {
@@ -321,7 +449,8 @@ def main():
         llm = None # Initialize llm to None for the finally block.
         try:
             print(f"\n{'='*20} Starting: {model_name} {'='*20}")
-            model_results = evaluate_model(model_class, model_name)
+            model_results = evaluate_model(model_class, model_name, batch_size=args.batch_size,
+                                           incremental=args.incremental)
             
             # Only process and save results if the evaluation was successful.
             if model_results and model_results["count"] > 0:
@@ -0,0 +1,171 @@
+"""
+Lightweight span tracing for finding where an analysis spends its time.
+
+Wrap a block in `with tracing.span("name", key=value):` (or decorate a function with
+`@tracing.traced()`). While tracing is disabled, which is the default, `span` returns
+a shared no-op object, so instrumented code pays for little more than a function
+call. Once enabled, every span records its start, duration and thread:
+
+    tracing.enable()
+    started = tracing.mark()
+    ...
+    tracing.print_summary(since=started)     # slowest spans since the mark, in process
+    tracing.export_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+
+Setting the SOUSCHEF_TRACE environment variable to a file path enables tracing at
+import and writes the Chrome trace there when the process exits.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+_enabled = False
+# Completed spans as (name, start_ns, end_ns, thread id, args). Bounded so that a
+# long-running process with tracing left on doesn't grow without limit.
+_events = deque(maxlen=200000)
+_thread_names = {}
+_origin_ns = time.perf_counter_ns()
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        thread = threading.current_thread()
+        _thread_names[thread.ident] = thread.name
+        if exc_type is not None:
+            self.args = dict(self.args, error=repr(exc))
+        # deque.append is atomic, so spans from several threads need no lock.
+        _events.append((self.name, self.start, end, thread.ident, self.args))
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def clear():
+    """Discards every recorded span."""
+    _events.clear()
+
+def mark():
+    """Returns the current time, to pass as `since` and look only at the spans started after it."""
+    return time.perf_counter_ns()
+
+def span(name, **args):
+    """Returns a context manager that records the enclosed block as a span named `name`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(name=None):
+    """Decorator recording each call of the function as a span (named after it by default)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def spans(since=None):
+    """
+    Returns the recorded spans as dicts with name, start_ms, duration_ms, thread and
+    args; with `since` (from `mark`), only those started after it.
+    """
+    return [
+        {
+            "name": name,
+            "start_ms": (start - _origin_ns) / 1e6,
+            "duration_ms": (end - start) / 1e6,
+            "thread": _thread_names.get(tid, str(tid)),
+            "args": args,
+        }
+        for name, start, end, tid, args in list(_events)
+        if since is None or start >= since
+    ]
+
+def slowest_spans(limit=10, name=None, since=None):
+    """Returns the `limit` longest spans, optionally only those called `name` or started after `since`."""
+    recorded = [s for s in spans(since) if name is None or s["name"] == name]
+    return sorted(recorded, key=lambda s: s["duration_ms"], reverse=True)[:limit]
+
+def print_summary(limit=10, since=None):
+    """
+    Prints the slowest spans, then total time and call count per span name; with
+    `since` (from `mark`), of only the spans started after it.
+    """
+    recorded = spans(since)
+    if not recorded:
+        print("No spans recorded.")
+        return
+    print(f"--- Slowest spans ({min(limit, len(recorded))} of {len(recorded)}) ---")
+    for s in slowest_spans(limit, since=since):
+        details = ", ".join(f"{k}={v}" for k, v in s["args"].items())
+        print(f"{s['duration_ms']:>10.1f} ms  {s['name']}  [{s['thread']}]  {details}")
+
+    totals = {}
+    for s in recorded:
+        total, count = totals.get(s["name"], (0.0, 0))
+        totals[s["name"]] = (total + s["duration_ms"], count + 1)
+    print("--- Total time by span ---")
+    for span_name, (total, count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+        print(f"{total:>10.1f} ms  {span_name}  ({count} calls)")
+
+def export_chrome_trace(path):
+    """Writes the recorded spans in the Chrome trace event format."""
+    pid = os.getpid()
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+        for tid, thread_name in list(_thread_names.items())
+    ]
+    for name, start, end, tid, args in list(_events):
+        events.append({
+            "name": name,
+            "ph": "X",  # A "complete" event: start timestamp plus duration, in microseconds.
+            "ts": (start - _origin_ns) / 1000,
+            "dur": (end - start) / 1000,
+            "pid": pid,
+            "tid": tid,
+            "args": {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in args.items()},
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"Trace with {len(_events)} spans written to {path}")
+
+if os.environ.get("SOUSCHEF_TRACE"):
+    enable()
+    atexit.register(export_chrome_trace, os.environ["SOUSCHEF_TRACE"])